@@ -0,0 +1,170 @@
+"""
+Replay the price predictor over a historic range, e.g.
+
+    python backtest.py --start 2024-06-01 --end 2024-07-01 --output backtests/june.jsonl
+
+The range's documents are read from Firestore once and every timestamp's CryptoData is sliced from them in memory.
+Predictions are appended to the output file as they finish, so rerunning the same command resumes after the last
+completed timestamp. They never go to the live price_predictions collection.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import dspy
+import numpy as np
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+from llm_price_predictor import PricePredictor
+from logger import logger
+from retrievers.document_cache import to_epoch
+from retrievers.historic_data_retriever import DEFAULT_LOOKBACKS, HistoricDataClient, Lookback
+from storage import create_client
+from typess.crypto_data import CryptoData
+
+BACKTEST_COLLECTION = "backtest_predictions"
+
+
+class ReplayDataClient(dspy.Retrieve):
+    """Stands in for HistoricDataClient, answering each query from documents prefetched for the whole range."""
+
+    def __init__(
+        self,
+        documents: Dict[str, List[Tuple[float, dict]]],
+        collections: Dict[str, str],
+        lookbacks: Optional[Dict[str, Lookback]] = None,
+    ):
+        super().__init__(k=0)
+
+        self.collections = collections
+        self.lookbacks = {**DEFAULT_LOOKBACKS, **(lookbacks or {})}
+        self.docs = {name: [doc for _, doc in documents.get(name, [])] for name in collections}
+        self.epochs = {name: np.array([ts for ts, _ in documents.get(name, [])]) for name in collections}
+
+    # pylint: disable=arguments-differ
+    def forward(self, query: datetime, k: Optional[int] = None) -> dspy.Prediction:
+        results = {}
+        for collection_name, data_key in self.collections.items():
+            lookback = self.lookbacks[collection_name]
+            epochs = self.epochs[collection_name]
+            lo = int(np.searchsorted(epochs, to_epoch(query - lookback.window), side="left"))
+            hi = int(np.searchsorted(epochs, to_epoch(query), side="right"))
+            # the newest rows before the query, the same documents HistoricDataClient would read
+            results[data_key] = self.docs[collection_name][max(lo, hi - lookback.rows) : hi]
+
+        return dspy.Prediction(crypto_data=CryptoData(**results))
+
+
+class Backtest:
+    """
+    Runs a predictor over many timestamps with at most `max_workers` in flight. Each finished prediction is
+    checkpointed to the JSONL output straight away, failures are logged and retried on the next run.
+    """
+
+    def __init__(
+        self,
+        predictor: Callable[[datetime], dspy.Prediction],
+        output_path: str,
+        max_workers: int = 4,
+        db: Optional[firestore.Client] = None,
+        run_id: Optional[str] = None,
+    ):
+        self.predictor = predictor
+        self.output_path = output_path
+        self.max_workers = max_workers
+        self.db = db
+        self.run_id = run_id or os.path.splitext(os.path.basename(output_path))[0]
+        self._lock = threading.Lock()
+
+    def run(self, timestamps: List[datetime]) -> int:
+        """Predict every timestamp not already in the output. Returns how many failed."""
+        done = self._completed()
+        pending = [ts for ts in timestamps if ts.isoformat() not in done]
+        logger.log_info(f"Backtest {self.run_id}: {len(pending)} of {len(timestamps)} timestamps left to predict")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            failures = sum(not ok for ok in executor.map(self._predict, pending))
+
+        logger.log_info(
+            f"Backtest {self.run_id}: {len(pending) - failures} predictions in {time.perf_counter() - start:.1f}s, "
+            f"{failures} failed"
+        )
+        return failures
+
+    def _predict(self, ts: datetime) -> bool:
+        try:
+            prediction = self.predictor(ts)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.log_error(f"Backtest prediction for {ts} failed: {e}")
+            return False
+
+        record = {"run_id": self.run_id, "query_ts": ts.isoformat(), **prediction.toDict()}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+            with open(self.output_path, "a", encoding="utf-8") as output:
+                output.write(json.dumps(record, default=str) + "\n")
+
+        if self.db is not None:
+            self.db.collection(BACKTEST_COLLECTION).document(f"{self.run_id}__{ts.isoformat()}").set(record)
+        return True
+
+    def _completed(self) -> Set[str]:
+        if not os.path.exists(self.output_path):
+            return set()
+
+        with open(self.output_path, "r", encoding="utf-8") as output:
+            return {json.loads(line)["query_ts"] for line in output if line.strip()}
+
+
+def replay_timestamps(start: datetime, end: datetime, step: timedelta) -> List[datetime]:
+    timestamps = []
+    ts = start
+    while ts < end:
+        timestamps.append(ts)
+        ts += step
+    return timestamps
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay the price predictor over a historic range.")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True, help="first timestamp (ISO format)")
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True, help="timestamp to stop before")
+    parser.add_argument("--step-minutes", type=int, default=60)
+    parser.add_argument("--target-hours", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4, help="predictions in flight at once")
+    parser.add_argument("--output", required=True, help="JSONL file the predictions are appended to")
+    parser.add_argument("--firestore", action="store_true", help=f"also write to the {BACKTEST_COLLECTION} collection")
+    parsed = parser.parse_args(args)
+
+    if parsed.start >= parsed.end:
+        raise ValueError("--start must be before --end")
+
+    db = create_client()
+    historic_client = HistoricDataClient("-", db=db)
+
+    logger.log_info(f"Prefetching documents from {parsed.start} to {parsed.end}...")
+    documents = historic_client.fetch_range(parsed.start, parsed.end)
+    logger.log_info(", ".join(f"{name}: {len(docs)}" for name, docs in documents.items()))
+
+    predictor = PricePredictor(
+        timedelta(hours=parsed.target_hours),
+        data_retriever=ReplayDataClient(documents, historic_client.collections, historic_client.lookbacks),
+    )
+    backtest = Backtest(predictor, parsed.output, parsed.workers, db=db if parsed.firestore else None)
+    failures = backtest.run(replay_timestamps(parsed.start, parsed.end, timedelta(minutes=parsed.step_minutes)))
+
+    if failures:
+        raise RuntimeError(f"{failures} backtest predictions failed, rerun to retry them")
+
+
+if __name__ == "__main__":
+    load_dotenv(override=True)
+    main()
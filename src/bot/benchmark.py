@@ -0,0 +1,132 @@
+"""
+Offline benchmarks of retrieval, prompt formatting and persistence against an in-memory Firestore filled with
+synthetic history, at multiples of the data volume the bot has today. Both come from the shared test support, and the
+synthetic indicators from the ingestor's engine, so run it from src/bot with those on the path:
+
+    export PYTHONPATH=../../tests/support:../data_ingestor
+    python benchmark.py                      # 1x, 10x and 100x
+    python benchmark.py --scales 1,10 --repeats 50
+    python benchmark.py --scales "" --render-rows 100,1000,10000   # only how prompt rendering scales with rows
+
+100x holds a few hundred thousand documents in memory, so expect it to take a minute and a few GB.
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from data_formatter import LAYOUTS, DataFormatter, RowCache
+from data_retriever import DataRetriever
+from decision_persistance import DecisionPersistance
+from memory_firestore import MemoryFirestore
+from retrievers.historic_data_retriever import HistoricDataClient
+from synthetic_data import generate
+
+# roughly how much history the ingestor has collected so far
+CURRENT_DAYS = 90
+END = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+def timed(operation: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """Median and 95th percentile milliseconds over `repeats` runs."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {"median_ms": statistics.median(durations), "p95_ms": durations[int(0.95 * (len(durations) - 1))]}
+
+
+def run_scale(scale: int, repeats: int, days: int = CURRENT_DAYS, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    db = MemoryFirestore()
+    start = END - timedelta(days=days * scale)
+
+    generate_start = time.perf_counter()
+    counts = generate(db, start, END, seed=seed)
+    generate_seconds = time.perf_counter() - generate_start
+    documents = sum(counts.values())
+
+    rng = random.Random(seed)
+    query_times = [start + timedelta(days=3) + (END - start - timedelta(days=3)) * rng.random() for _ in range(repeats)]
+    historic_client = HistoricDataClient("-", db=db)
+    crypto_data = historic_client.forward(END).crypto_data
+    # no row cache, so every repeat times formatting rather than cache lookups
+    formatter = DataFormatter(row_cache=RowCache(0))
+    persistance = DecisionPersistance(db=db)
+    record = {"timestamp": END.isoformat(), "prediction": "up 0.4%", "reasoning": "synthetic " * 50}
+
+    return {
+        "ingest (batched writes)": {"docs": documents, "docs_per_s": documents / generate_seconds},
+        "historic retrieval": timed(lambda: historic_client.forward(query_times.pop()), repeats),
+        "latest retrieval": timed(lambda: DataRetriever(db=db).get_latest(10), repeats),
+        "format hourly": timed(lambda: formatter.format_hourly_data(crypto_data.taapi_1h), repeats),
+        "format daily": timed(
+            lambda: formatter.format_daily_data(crypto_data.taapi_1d, crypto_data.alternative_me), repeats
+        ),
+        "format news": timed(lambda: formatter.format_news(crypto_data.google_feed), repeats),
+        "persist prediction": timed(lambda: persistance.store_prediction_data(record), repeats),
+    }
+
+
+def run_rendering(rows: int, repeats: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Time rendering a window of `rows` hourly documents in each layout, per call and per row: from scratch, and as a
+    window sliding forward an hour per call so all but the newest row come from the row cache.
+    """
+    db = MemoryFirestore()
+    generate(db, END - timedelta(hours=rows + repeats), END, seed=seed)
+    docs = [
+        {**doc.to_dict(), "id": doc.id}
+        for doc in db.collection("indicators__taapi__1h").order_by("extraction_timestamp").get()
+    ]
+
+    results = {}
+    for layout in LAYOUTS:
+        formatter = DataFormatter(layout, row_cache=RowCache(0))
+        stats = timed(lambda: formatter.format_hourly_data(docs[:rows]), repeats)
+        results[f"render {layout}"] = {**stats, "us_per_row": stats["median_ms"] * 1000 / rows}
+
+        formatter = DataFormatter(layout, row_cache=RowCache(rows + 1))
+        formatter.format_hourly_data(docs[:rows])
+        starts = iter(range(1, repeats + 1))
+        stats = timed(lambda: formatter.format_hourly_data(docs[next(starts) :][:rows]), repeats)
+        results[f"slide {layout}"] = {**stats, "us_per_row": stats["median_ms"] * 1000 / rows}
+    return results
+
+
+def _print(name: str, stats: Dict[str, float]) -> None:
+    print(
+        f"  {name:<24} "
+        + "  ".join(f"{key} {value:,.{2 if isinstance(value, float) else 0}f}" for key, value in stats.items())
+    )
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark retrieval, formatting and persistence offline.")
+    parser.add_argument("--scales", default="1,10,100", help="comma separated multiples of the current data volume")
+    parser.add_argument("--days", type=int, default=CURRENT_DAYS, help="days of history at 1x")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--render-rows", default="100,1000,10000", help="window sizes to time prompt rendering at")
+    parsed = parser.parse_args(args)
+
+    # the clients log every call, which would swamp the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for scale in (int(scale) for scale in parsed.scales.split(",") if scale):
+        print(f"\n{scale}x ({parsed.days * scale} days of history)")
+        for name, stats in run_scale(scale, parsed.repeats, parsed.days).items():
+            _print(name, stats)
+
+    for rows in (int(rows) for rows in parsed.render_rows.split(",") if rows):
+        print(f"\nrendering {rows} rows")
+        for name, stats in run_rendering(rows, parsed.repeats).items():
+            _print(name, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 from coinbase.rest import RESTClient
 
 from logger import logger
-from util import five_sig_fig
+from util import five_sig_fig, five_sig_fig_array
 from typess.portfolio_breakdown import PortfolioBreakdown
 
 SMALLEST_TRADE_SIZE_PERCENTAGE = 10
@@ -109,14 +109,17 @@ class CoinbaseInterface:
             "orders"
         ]
 
+        filled_sizes = five_sig_fig_array([order["filled_size"] for order in orders])
+        average_filled_prices = five_sig_fig_array([order["average_filled_price"] for order in orders])
+
         succinct_orders = []
-        for order in orders:
+        for order, filled_size, average_filled_price in zip(orders, filled_sizes, average_filled_prices):
             succinct_orders.append(
                 {
                     "created_time": order["created_time"][:-8],
                     "side": order["side"],
-                    "filled_size": five_sig_fig(order["filled_size"]),
-                    "average_filled_price": five_sig_fig(order["average_filled_price"]),
+                    "filled_size": filled_size,
+                    "average_filled_price": average_filled_price,
                 }
             )
 
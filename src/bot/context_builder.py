@@ -0,0 +1,163 @@
+"""
+Fits the formatted data sections of a prompt into the model's context window.
+
+Each section gets a share of the tokens left once the completion and dspy's own prompt scaffolding are reserved.
+Hourly history keeps full resolution for the most recent hours and is aggregated into multi-hour candles before
+that, then every section drops its oldest rows until it fits its quota. However long the lookbacks get, the prompt
+stays the same size.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from data_formatter import DataFormatter, FearGreedIndex
+from logger import logger
+from typess.crypto_data import CryptoData
+
+MODEL_CONTEXT_TOKENS = 8192  # llama3-70b-8192
+COMPLETION_TOKENS = 500  # max_tokens the predictor's LMs are created with
+# signature instructions, field labels and the chain of thought scaffold dspy wraps around the context
+PROMPT_OVERHEAD_TOKENS = 700
+# no rendered row costs less than this (a timestamp alone is more), bounding how many rows could ever fit a quota
+MIN_ROW_TOKENS = 10
+
+# roughly how Llama 3's tokenizer splits text: words (long ones in pieces), digits in groups of up to three, runs
+# of newlines and every other symbol on its own
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,8}|\d{1,3}|\n+|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """Local estimate of the prompt tokens `text` costs, without a tokenizer round trip."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    """Tokens available to the data sections, and each section's share of them."""
+
+    total: int = MODEL_CONTEXT_TOKENS - COMPLETION_TOKENS - PROMPT_OVERHEAD_TOKENS
+    shares: Dict[str, float] = field(default_factory=lambda: {"hourly": 0.45, "daily": 0.25, "news": 0.3})
+
+    def quota(self, section: str) -> int:
+        return int(self.total * self.shares[section])
+
+
+@dataclass
+class ContextSections:
+    hourly: str
+    daily: str
+    news: str
+    tokens: Dict[str, int]
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        formatter: DataFormatter,
+        budget: TokenBudget = TokenBudget(),
+        full_resolution_hours: int = 12,
+        aggregate_hours: int = 4,
+    ):
+        self.formatter = formatter
+        self.budget = budget
+        self.full_resolution_hours = full_resolution_hours
+        self.aggregate_hours = aggregate_hours
+
+    def build(self, crypto_data: CryptoData) -> ContextSections:
+        # rows that can't fit are never rendered, so building costs the same however long the history is
+        hourly_rows = self.full_resolution_hours + self.budget.quota("hourly") // MIN_ROW_TOKENS * self.aggregate_hours
+        fear_greed = FearGreedIndex(crypto_data.alternative_me)
+        hourly_docs = downsample_hourly(
+            crypto_data.taapi_1h[-hourly_rows:], self.full_resolution_hours, self.aggregate_hours
+        )
+        sections = {
+            "hourly": self._fit(hourly_docs, self.formatter.format_hourly_data, self.budget.quota("hourly")),
+            "daily": self._fit(
+                crypto_data.taapi_1d,
+                lambda docs: self.formatter.format_daily_data(docs, fear_greed),
+                self.budget.quota("daily"),
+            ),
+            # the feed is stored oldest first, so trimming from the front keeps the most recent news
+            "news": self._fit(crypto_data.google_feed, self.formatter.format_news, self.budget.quota("news")),
+        }
+
+        tokens = {name: count_tokens(text) for name, text in sections.items()}
+        logger.log_info(
+            "Context sections: "
+            + ", ".join(f"{name} {tokens[name]}/{self.budget.quota(name)} tokens" for name in sections)
+        )
+        return ContextSections(**sections, tokens=tokens)
+
+    def _fit(self, docs: List[Dict[str, Any]], render: Callable[[List[Dict[str, Any]]], str], quota: int) -> str:
+        """Render the newest documents that fit in `quota` tokens, dropping the oldest first."""
+        docs = docs[-(quota // MIN_ROW_TOKENS) :] if quota >= MIN_ROW_TOKENS else []
+        text = render(docs)
+        if count_tokens(text) <= quota:
+            return text
+
+        # binary search for the most documents that fit, the token count only grows as more are kept
+        low, high = 0, len(docs) - 1
+        while low < high:
+            keep = (low + high + 1) // 2
+            if count_tokens(render(docs[len(docs) - keep :])) <= quota:
+                low = keep
+            else:
+                high = keep - 1
+
+        logger.log_info(f"Kept the newest {low} of {len(docs)} rows to fit {quota} tokens")
+        return render(docs[len(docs) - low :])
+
+
+def downsample_hourly(
+    docs: List[Dict[str, Any]], full_resolution_hours: int, aggregate_hours: int
+) -> List[Dict[str, Any]]:
+    """
+    Keep the newest `full_resolution_hours` documents as they are and merge older ones into candles spanning
+    `aggregate_hours`, aligned to the clock. Merged candles take the first open, last close, extreme high and low
+    and summed volume, and every other indicator's value at the end of the span.
+    """
+    if len(docs) <= full_resolution_hours:
+        return docs
+
+    older, recent = docs[: len(docs) - full_resolution_hours], docs[len(docs) - full_resolution_hours :]
+    buckets: Dict[int, List[Dict[str, Any]]] = {}
+    for doc in older:
+        hour = int(datetime.fromisoformat(doc["id"][:19]).replace(tzinfo=timezone.utc).timestamp() // 3600)
+        buckets.setdefault(hour // aggregate_hours, []).append(doc)
+
+    return [_aggregate(bucket) for bucket in buckets.values()] + recent
+
+
+def _aggregate(bucket: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if len(bucket) == 1:
+        return bucket[0]
+
+    # every indicator's value at the end of the span
+    indicators = {indicator["id"]: indicator for doc in bucket for indicator in doc["data"]}
+    candles = [
+        indicator["result"]
+        for doc in bucket
+        for indicator in doc["data"]
+        if indicator["id"] == "candle" and isinstance(indicator.get("result"), dict)
+    ]
+    if candles:
+        candle = {
+            "open": candles[0]["open"],
+            "high": max(candle["high"] for candle in candles),
+            "low": min(candle["low"] for candle in candles),
+            "close": candles[-1]["close"],
+            "volume": sum(candle["volume"] for candle in candles),
+        }
+        indicators["candle"] = {**indicators["candle"], "result": candle}
+
+    span = {"id": "candle_span", "result": f"{len(bucket)}h"}
+    # its own ID, so the formatter's row cache never confuses it with the hour it starts at, and the newest extraction
+    # time of the hours it merges, so it is rendered again if any of them is rewritten
+    return {
+        **bucket[0],
+        "id": f"{bucket[0]['id']} {len(bucket)}h",
+        "extraction_timestamp": max((doc.get("extraction_timestamp") or "") for doc in bucket),
+        "data": [span] + list(indicators.values()),
+    }
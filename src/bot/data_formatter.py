@@ -1,24 +1,115 @@
-from typing import Dict, List
-from datetime import datetime
+import csv
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 
-from util import five_sig_fig
+import numpy as np
+
+from util import five_sig_fig_array
 from logger import logger
 
+# compat is the original prompt format, csv prints the field names once as a header, kv is name=value pairs
+LAYOUTS = ("compat", "csv", "kv")
+
+CANDLE_FIELDS = ("volume", "high", "low", "open", "close")
+MACD_FIELDS = (("valueMACD", "MACD"), ("valueMACDSignal", "MACD_signal"), ("valueMACDHist", "MACD_hist"))
+
+# rendered rows kept per formatter, a few thousand covers every window of a backtest's sliding lookbacks
+ROW_CACHE_SIZE = 4096
+
+Row = List[Tuple[str, str]]
+# a row's fields and its rendered line, which csv only uses when the row has every column of the window
+Entry = Tuple[Row, str]
+
+
+class RowCache:
+    """
+    LRU of rendered rows, keyed by document ID and extraction time. The 4h and 1d documents are rewritten under the
+    same ID every hour until their candle closes, and each rewrite gets a new extraction time. So a key always names
+    one version of a document, and a sliding window only has to render the rows it hasn't seen before.
+    """
+
+    def __init__(self, max_rows: int = ROW_CACHE_SIZE):
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._rows: OrderedDict[Hashable, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[Optional[Hashable]]) -> List[Optional[Entry]]:
+        entries: List[Optional[Entry]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._rows.get(key) if key is not None else None
+                if entry is not None:
+                    self._rows.move_to_end(key)
+                entries.append(entry)
+            found = sum(entry is not None for entry in entries)
+            self.hits += found
+            self.misses += len(entries) - found
+        return entries
+
+    def put_many(self, items: List[Tuple[Hashable, Entry]]) -> None:
+        with self._lock:
+            for key, entry in items:
+                self._rows[key] = entry
+                self._rows.move_to_end(key)
+            while len(self._rows) > self.max_rows:
+                self._rows.popitem(last=False)
+
+
+class FearGreedIndex:
+    """
+    Fear & greed classes in date order, joined to daily rows with one binary search over all their dates. Build it
+    once per window and pass it to every `format_daily_data` call rendering that window.
+    """
+
+    def __init__(self, alternative_me: List[Dict[str, Any]]):
+        by_date = {_fear_greed_date(doc["data"]): doc["data"]["value_classification"] for doc in alternative_me}
+        dates = sorted(by_date)
+        self.dates = np.array(dates, dtype="datetime64[D]")
+        self.classes = np.array([by_date[date] for date in dates] + ["Unknown"], dtype=object)
+
+    def classes_on(self, dates: List[str]) -> List[str]:
+        """The class published on each YYYY-MM-DD date, "Unknown" where there is none."""
+        days = np.array(dates, dtype="datetime64[D]")
+        positions = np.searchsorted(self.dates, days)
+        found = positions < len(self.dates)
+        found[found] = self.dates[positions[found]] == days[found]
+        return self.classes[np.where(found, positions, -1)].tolist()
+
+
+def _fear_greed_date(data: Dict[str, Any]) -> str:
+    # documents ingested before `date` was added only have alternative.me's DD-MM-YYYY timestamp
+    if "date" in data:
+        return data["date"]
+    day, month, year = data["timestamp"].split("-")
+    return f"{year}-{month}-{day}"
+
 
 class DataFormatter:
-    def __init__(self):
-        pass
+    def __init__(self, layout: str = "compat", row_cache: Optional[RowCache] = None):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout '{layout}', expected one of {', '.join(LAYOUTS)}")
+        self.layout = layout
+        self.row_cache = row_cache or RowCache()
 
     def format_hourly_data(self, taapi_indicators: list) -> str:
         logger.log_info("Format hourly indicators...")
-        indicators_history = self._restructure_indicators_history(taapi_indicators)
-        return self._stringify_indicators(indicators_history)
+        keys = [("hourly", doc["id"], doc.get("extraction_timestamp")) for doc in taapi_indicators]
+        return self._stringify_indicators(taapi_indicators, keys)
 
-    def format_daily_data(self, taapi_indicators: list, alternative_me: list) -> str:
+    def format_daily_data(self, taapi_indicators: list, alternative_me: Union[list, FearGreedIndex]) -> str:
         logger.log_info("Format daily indicators...")
-        indicators_history = self._restructure_indicators_history(taapi_indicators)
-        indicators_history = self._append_fear_greed_index(indicators_history, alternative_me)
-        return self._stringify_indicators(indicators_history)
+        fear_greed = FearGreedIndex(alternative_me) if isinstance(alternative_me, list) else alternative_me
+        fear_greed_classes = fear_greed.classes_on([doc["id"][:10] for doc in taapi_indicators])
+        keys = [
+            ("daily", doc["id"], doc.get("extraction_timestamp"), fear_greed)
+            for doc, fear_greed in zip(taapi_indicators, fear_greed_classes)
+        ]
+        return self._stringify_indicators(taapi_indicators, keys, fear_greed_classes)
 
     def _restructure_indicators_history(self, taapi_indicators: list) -> list:
         indicators_history = []
@@ -41,58 +132,130 @@ class DataFormatter:
 
         return {"timestamp": ts, "day_of_week": dow}
 
-    def _append_fear_greed_index(self, indicators_history: list, alternative_me: list) -> list:
-        alternative_me_indicators = {}
-        for alt_me_indicator in alternative_me:
-            indicator_key = alt_me_indicator["data"]["timestamp"]
-            indicator_classification = alt_me_indicator["data"]["value_classification"]
-            alternative_me_indicators[indicator_key] = indicator_classification
+    def _stringify_indicators(
+        self, taapi_indicators: list, keys: List[Hashable], fear_greed_classes: Optional[List[str]] = None
+    ) -> str:
+        if not taapi_indicators:
+            return "No data available"
+
+        def render(missing: List[int]) -> List[Row]:
+            indicators_history = self._restructure_indicators_history([taapi_indicators[i] for i in missing])
+            if fear_greed_classes is not None:
+                for indicators, i in zip(indicators_history, missing):
+                    indicators["fear_greed_index_class"] = fear_greed_classes[i]
+
+            numbers: List[Any] = []
+            rows = [self._indicator_row(inds, numbers) for inds in indicators_history]
 
-        for i, indicators in enumerate(indicators_history):
-            alt_me_formatted_date = datetime.strptime(indicators["timestamp"].split(" ")[0], "%Y-%m-%d").strftime(
-                "%d-%m-%Y"
-            )
+            # all new numbers are formatted in one pass, then fill the rows' placeholders in order
+            formatted = iter(five_sig_fig_array(numbers))
+            return [[(name, str(next(formatted)) if value is None else value) for name, value in row] for row in rows]
 
-            if alt_me_formatted_date in alternative_me_indicators:
-                indicators_history[i]["fear_greed_index_class"] = alternative_me_indicators[alt_me_formatted_date]
+        entries = self._cached_rows(keys, render, self._line)
+        if self.layout == "csv":
+            return self._render_table(entries)
+        return "\n".join(line for _, line in entries)
+
+    def _indicator_row(self, inds: Dict, numbers: List[Any]) -> List[Tuple[str, Optional[str]]]:
+        """The row's fields, with None in place of each number to format, which is appended to `numbers`."""
+        row: List[Tuple[str, Optional[str]]] = []
+        for indicator_name, indicator_result in inds.items():
+            if indicator_name == "candle":
+                numbers += [indicator_result[field] for field in CANDLE_FIELDS]
+                row += [(f"candle_{field}", None) for field in CANDLE_FIELDS]
+            elif indicator_name == "MACD":
+                numbers += [indicator_result[key][0] for key, _ in MACD_FIELDS]
+                row += [(label, None) for _, label in MACD_FIELDS]
+            elif isinstance(indicator_result, dict) and "value" in indicator_result:
+                numbers.append(indicator_result["value"][0])
+                row.append((indicator_name, None))
             else:
-                indicators_history[i]["fear_greed_index_class"] = "Unknown"
+                row.append((indicator_name, str(indicator_result)))
+        return row
 
-        return indicators_history
+    def format_news(self, news_items: List[Dict]) -> str:
+        """Format news items into a readable text block."""
+        logger.log_info("Format latest news...")
 
-    def _stringify_indicators(self, indicators_history: list) -> str:
-        formatted_indicators = ""
-        for inds in indicators_history:
-            for indicator_name, indicator_result in inds.items():
-                if indicator_name == "candle":
-                    formatted_indicators += f"candle_volume: {five_sig_fig(indicator_result['volume'])}, "
-                    formatted_indicators += f"candle_high: {five_sig_fig(indicator_result['high'])}, "
-                    formatted_indicators += f"candle_low: {five_sig_fig(indicator_result['low'])}, "
-                    formatted_indicators += f"candle_open: {five_sig_fig(indicator_result['open'])}, "
-                    formatted_indicators += f"candle_close: {five_sig_fig(indicator_result['close'])}, "
+        news_items = _one_per_cluster(news_items)
+        fields = ("published", "title", "summary")
+        keys = [("news", item["id"], item.get("extraction_timestamp")) if "id" in item else None for item in news_items]
 
-                elif indicator_name == "MACD":
-                    formatted_indicators += f"MACD: {five_sig_fig(indicator_result['valueMACD'][0])}, "
-                    formatted_indicators += f"MACD_signal: {five_sig_fig(indicator_result['valueMACDSignal'][0])}, "
-                    formatted_indicators += f"MACD_hist: {five_sig_fig(indicator_result['valueMACDHist'][0])}, "
+        def render(missing: List[int]) -> List[Row]:
+            return [[(field, news_items[i]["data"][field]) for field in fields] for i in missing]
 
-                elif isinstance(indicator_result, dict) and "value" in indicator_result:
-                    formatted_indicators += f"{indicator_name}: {five_sig_fig(indicator_result['value'][0])}, "
-                else:
-                    formatted_indicators += f"{indicator_name}: {indicator_result}, "
+        if self.layout == "compat":
+            # numbering depends on the position in the window, so only the rest of each line is cached
+            entries = self._cached_rows(keys, render, _news_line)
+            return "".join(f"News {i}: {line}" for i, (_, line) in enumerate(entries, 1))
 
-            formatted_indicators = formatted_indicators[:-2] + "\n"
+        entries = self._cached_rows(keys, render, self._line)
+        if self.layout == "csv":
+            return self._render_table(entries)
+        return "\n".join(line for _, line in entries)
 
-        return formatted_indicators[:-1] if len(formatted_indicators) > 1 else "No data available"
+    def _cached_rows(
+        self, keys: List[Optional[Hashable]], render: Callable[[List[int]], List[Row]], line: Callable[[Row], str]
+    ) -> List[Entry]:
+        """Rows for every key, rendering (in one batch) and caching only those not rendered before."""
+        entries = self.row_cache.get_many(keys)
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            new_entries = [(row, line(row)) for row in render(missing)]
+            for i, entry in zip(missing, new_entries):
+                entries[i] = entry
+            self.row_cache.put_many([(keys[i], entries[i]) for i in missing if keys[i] is not None])
+        return entries
+
+    def _line(self, row: Row) -> str:
+        if self.layout == "csv":
+            return _csv_line([value for _, value in row])
+        if self.layout == "kv":
+            return " ".join(f"{name}={_kv_value(value)}" for name, value in row)
+        return ", ".join(f"{name}: {value}" for name, value in row)
+
+    def _render_table(self, entries: List[Entry]) -> str:
+        """CSV with the window's field names as a header, empty where a row lacks a field."""
+        if not entries:
+            return ""
+        columns = list(dict.fromkeys(name for row, _ in entries for name, _ in row))
+        lines = [_csv_line(columns)]
+        for row, line in entries:
+            if [name for name, _ in row] == columns:
+                lines.append(line)
+            else:
+                values = dict(row)
+                lines.append(_csv_line([values.get(column, "") for column in columns]))
+        return "\n".join(lines)
+
+
+def _csv_line(values: List[str]) -> str:
+    output = io.StringIO()
+    csv.writer(output, lineterminator="").writerow(values)
+    return output.getvalue()
+
+
+def _one_per_cluster(news_items: List[Dict]) -> List[Dict]:
+    """
+    The first item of each story, dropping the syndicated copies the ingestor put in the same cluster. Items stored
+    before clustering was added have no cluster and are all kept.
+    """
+    seen = set()
+    kept = []
+    for item in news_items:
+        cluster_id = item["data"].get("cluster_id")
+        if cluster_id is None or cluster_id not in seen:
+            kept.append(item)
+            seen.add(cluster_id)
+    if len(kept) < len(news_items):
+        logger.log_info(f"Dropped {len(news_items) - len(kept)} copies of stories already in the news")
+    return kept
+
+
+def _news_line(row: Row) -> str:
+    values = dict(row)
+    return f"Published: {values['published']} Title: {values['title']} Summary: {values['summary']}\n"
 
-    def format_news(self, news_items: List[Dict]) -> str:
-        """Format news items into a readable text block."""
-        logger.log_info("Format latest news...")
 
-        formatted_text = ""
-        for i, item in enumerate(news_items, 1):
-            formatted_text += f"News {i}: "
-            formatted_text += f"Published: {item['data']['published']} "
-            formatted_text += f"Title: {item['data']['title']} "
-            formatted_text += f"Summary: {item['data']['summary']}\n"
-        return formatted_text
+def _kv_value(value: str) -> str:
+    return json.dumps(value) if any(char in value for char in ' "=\n') else value
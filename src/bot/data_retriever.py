@@ -1,15 +1,19 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, List, Optional
 
 from google.cloud import firestore
 from google.cloud.firestore_v1.field_path import FieldPath
 
 from logger import logger
+from storage import create_client
 from typess.crypto_data import CryptoData
 
 
 class DataRetriever:
-    def __init__(self):
-        self.db = firestore.Client(database="crypto-bot")
+    def __init__(self, db: Optional[firestore.Client] = None):
+        self.db = db or create_client()
         self.collections = {
             "indicators__taapi__1h": "taapi_1h",
             "indicators__taapi__1d": "taapi_1d",
@@ -18,32 +22,47 @@ class DataRetriever:
         }
 
     def get_latest(self, limit: int = 10) -> CryptoData:
-        result = {"taapi_1h": [], "taapi_1d": [], "alternative_me": [], "google_feed": []}
-
-        for collection_name, data_key in self.collections.items():
-            docs = (
-                self.db.collection(collection_name)
-                .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
-                .limit(limit)
-                .get()
-            )
-
-            for doc in docs:
-                doc_dict = doc.to_dict()
-
-                if doc_dict is None:
-                    logger.log_info(f"WARNING Document {doc.id} is empty")
-                    continue
-
-                doc_dict["id"] = doc.id  # Include the document ID in the result
-                # Convert any datetime objects to ISO format strings
-                for key, value in doc_dict.items():
-                    if isinstance(value, datetime):
-                        doc_dict[key] = value.isoformat()
-                result[data_key].append(doc_dict)
+        start = time.perf_counter()
+        # seconds spent reading each collection, kept per call so concurrent calls don't mix them up
+        latencies: Dict[str, float] = {}
+        with ThreadPoolExecutor(max_workers=len(self.collections)) as executor:
+            futures = {
+                data_key: executor.submit(self._fetch_collection, collection_name, limit, latencies)
+                for collection_name, data_key in self.collections.items()
+            }
+            result = {data_key: future.result() for data_key, future in futures.items()}
 
+        timings = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in latencies.items())
+        logger.log_info(f"Retrieved latest data in {time.perf_counter() - start:.3f}s ({timings})")
         return CryptoData(**result)
 
+    def _fetch_collection(self, collection_name: str, limit: int, latencies: Dict[str, float]) -> List[dict]:
+        start = time.perf_counter()
+        docs = (
+            self.db.collection(collection_name)
+            .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+            .limit(limit)
+            .get()
+        )
+        latencies[collection_name] = time.perf_counter() - start
+
+        results = []
+        for doc in docs:
+            doc_dict = doc.to_dict()
+
+            if doc_dict is None:
+                logger.log_info(f"WARNING Document {doc.id} is empty")
+                continue
+
+            doc_dict["id"] = doc.id  # Include the document ID in the result
+            # Convert any datetime objects to ISO format strings
+            for key, value in doc_dict.items():
+                if isinstance(value, datetime):
+                    doc_dict[key] = value.isoformat()
+            results.append(doc_dict)
+
+        return results
+
 
 # Usage example:
 if __name__ == "__main__":
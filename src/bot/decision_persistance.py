@@ -1,4 +1,7 @@
+from typing import Optional
+
 from logger import logger
+from storage import create_client
 
 from google.cloud import firestore
 
@@ -7,8 +10,8 @@ from llm_trader import TraderResponse
 
 
 class DecisionPersistance:
-    def __init__(self):
-        self.db = firestore.Client(database="crypto-bot")
+    def __init__(self, db: Optional[firestore.Client] = None):
+        self.db = db or create_client()
 
         self.price_prediction_collection = self.db.collection("price_predictions")
         self.trades_collection = self.db.collection("trades")
@@ -0,0 +1,88 @@
+"""
+Token usage and latency of each LLM call a module makes.
+
+dspy's clients report every response's usage to their `log_usage` hook, which `watch` taps into. Usage is kept per
+thread, so predictions running concurrently (as in a backtest) each see only their own calls:
+
+    calls = LLMCallLog()
+    calls.watch(lm)
+    with calls.call("price_prediction"):
+        ...  # any dspy calls made here are summed into one record
+    records = calls.take()
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from logger import logger
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+class LLMCallLog:
+    def __init__(self):
+        self._local = threading.local()
+
+    def watch(self, lm) -> None:
+        """Record the usage of every response `lm` receives while a call is open."""
+        log_usage = lm.log_usage
+        model = lm.kwargs.get("model", type(lm).__name__)
+
+        def record_usage(response):
+            log_usage(response)
+            usage = getattr(self._local, "usage", None)
+            if usage is not None:
+                usage.append({"model": model, **_usage(response)})
+
+        lm.log_usage = record_usage
+
+    @contextmanager
+    def call(self, name: str) -> Iterator[None]:
+        """Sum the requests made inside the block (dspy may need more than one to fill every output) into a record."""
+        self._local.usage = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            usage, self._local.usage = self._local.usage, None
+            record: Dict[str, Any] = {
+                "name": name,
+                "model": ",".join(dict.fromkeys(request["model"] for request in usage)),
+                "requests": len(usage),
+                **{field: sum(request[field] for request in usage) for field in USAGE_FIELDS},
+                "seconds": round(seconds, 3),
+            }
+            logger.log_info(
+                f"LLM call {name} ({record['model']}): {record['requests']} requests, {record['prompt_tokens']} prompt "
+                f"tokens ({record['cached_tokens']} cached), {record['completion_tokens']} completion tokens "
+                f"in {seconds:.2f}s"
+            )
+            self._records().append(record)
+
+    def take(self) -> List[Dict[str, Any]]:
+        """This thread's records since the last take."""
+        records = self._records()
+        self._local.records = []
+        return records
+
+    def _records(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "records"):
+            self._local.records = []
+        return self._local.records
+
+
+def _usage(response) -> Dict[str, int]:
+    # the OpenAI client hands over a dict, Groq's a pydantic model
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if usage is not None and not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    usage = usage or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "cached_tokens": details.get("cached_tokens") or 0,
+    }
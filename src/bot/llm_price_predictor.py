@@ -3,18 +3,31 @@
 
 import os
 from datetime import datetime, timedelta
+from typing import Optional
 
 import dspy
+from google.cloud import firestore
 
+from context_builder import ContextBuilder, count_tokens
 from data_formatter import DataFormatter
+from llm_calls import LLMCallLog
 from logger import logger
+from retrievers.document_cache import DocumentCache
+from retrievers.live_cache import LiveCache
 from retrievers.historic_data_retriever import HistoricDataClient
 from typess.prediction_input_data import PredictionInputData
 from typess.crypto_data import CryptoData
 
 
 class PricePredictor(dspy.Module):
-    def __init__(self, target_td: timedelta):
+    def __init__(
+        self,
+        target_td: timedelta,
+        db: Optional[firestore.Client] = None,
+        document_cache: Optional[DocumentCache] = None,
+        live_cache: Optional[LiveCache] = None,
+        data_retriever: Optional[dspy.Retrieve] = None,
+    ):
         super().__init__()
 
         if os.getenv("GROQ_API_KEY") is None:
@@ -25,11 +38,21 @@ class PricePredictor(dspy.Module):
 
         self.llama = dspy.GROQ(model="llama3-70b-8192", max_tokens=500, api_key=os.getenv("GROQ_API_KEY", ""))
         self.gpt3_5 = dspy.OpenAI(model="gpt-3.5-turbo", api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm_calls = LLMCallLog()
+        self.llm_calls.watch(self.llama)
+        self.llm_calls.watch(self.gpt3_5)
 
-        self.data_retriever = HistoricDataClient("-")
+        self.data_retriever = data_retriever or HistoricDataClient(
+            "-", db=db, document_cache=document_cache, live_cache=live_cache
+        )
 
-        self.data_formatter = DataFormatter()
+        self.data_formatter = DataFormatter(os.getenv("PROMPT_LAYOUT", "compat"))
+        self.context_builder = ContextBuilder(self.data_formatter)
 
+        # "combined" answers the prediction and both data questions in one call, so the context is only sent (and
+        # billed) once. "separate" makes a call per question as before, for comparing the two
+        self.combined = os.getenv("PREDICTOR_CALLS", "combined") == "combined"
+        self.prediction_report = dspy.ChainOfThought(PredictionReportSig)
         self.price_prediction = dspy.ChainOfThought(PricePredictionSig)
         self.data_request = dspy.ChainOfThought(DataRequestSig)
         self.data_issue_checker = dspy.ChainOfThought(DataQualityCheckSig)
@@ -39,35 +62,54 @@ class PricePredictor(dspy.Module):
     def forward(self, ts: datetime) -> dspy.Prediction:
         retrieved_data: dspy.Prediction = self.data_retriever(query=ts)
 
-        input_data = self._build_input_data(retrieved_data.crypto_data)
+        input_data = self._build_input_data(retrieved_data.crypto_data, ts)
         context_str = self._build_context(input_data)
-
-        with dspy.context(lm=self.llama):
-            price_prediction = self.price_prediction(context=context_str, timestamp=input_data.target_ts_str)
-            llm_data_requests = self.data_request(context=context_str)
-
-        with dspy.context(lm=self.gpt3_5):
-            llm_data_complaints = self.data_issue_checker(context=context_str)
-
+        context_tokens = count_tokens(context_str)
+        logger.log_info(f"Context is ~{context_tokens} tokens")
+
+        self.llm_calls.take()
+        if self.combined:
+            with dspy.context(lm=self.llama), self.llm_calls.call("prediction_report"):
+                report = self.prediction_report(context=context_str, timestamp=input_data.target_ts_str)
+            mean, std_dev = report.mean, report.std_dev
+            data_requests, data_issues = report.data_requests, report.data_issues
+        else:
+            with dspy.context(lm=self.llama):
+                with self.llm_calls.call("price_prediction"):
+                    price_prediction = self.price_prediction(context=context_str, timestamp=input_data.target_ts_str)
+                with self.llm_calls.call("data_request"):
+                    data_requests = self.data_request(context=context_str).answer
+
+            with dspy.context(lm=self.gpt3_5), self.llm_calls.call("data_issue_checker"):
+                data_issues = self.data_issue_checker(context=context_str).answer
+            mean, std_dev = price_prediction.mean, price_prediction.std_dev
+
+        llm_calls = self.llm_calls.take()
         return dspy.Prediction(
             ts=input_data.ts_str,
             target_ts=input_data.target_ts_str,
             target_td=input_data.target_td_str,
-            prediction_mean=price_prediction.mean,
-            prediction_std_dev=price_prediction.std_dev,
+            prediction_mean=mean,
+            prediction_std_dev=std_dev,
             metadata=dict(
-                llm_data_requests=llm_data_requests.answer,
-                llm_data_complaints=llm_data_complaints.answer,
+                llm_data_requests=data_requests,
+                llm_data_complaints=data_issues,
+                context_tokens=context_tokens,
+                llm_calls=llm_calls,
+                llm_prompt_tokens=sum(call["prompt_tokens"] for call in llm_calls),
+                llm_seconds=round(sum(call["seconds"] for call in llm_calls), 3),
             ),
         )
 
-    def _build_input_data(self, crypto_data: CryptoData) -> PredictionInputData:
+    def _build_input_data(self, crypto_data: CryptoData, ts: datetime) -> PredictionInputData:
+        sections = self.context_builder.build(crypto_data)
         return PredictionInputData(
             crypto_data.latest_product_price,
-            self.data_formatter.format_hourly_data(crypto_data.taapi_1h),
-            self.data_formatter.format_daily_data(crypto_data.taapi_1d, crypto_data.alternative_me),
-            self.data_formatter.format_news(crypto_data.google_feed),
+            sections.hourly,
+            sections.daily,
+            sections.news,
             self.target_td,
+            ts=ts,
         )
 
     def _build_context(self, input_data: PredictionInputData) -> str:
@@ -87,6 +129,32 @@ class PricePredictor(dspy.Module):
         return context
 
 
+class PredictionReportSig(dspy.Signature):
+    """
+    You are an advanced swing trader with a medium-high risk appetite, trading Bitcoin.
+    Your decisions are driven by a blend of technical analysis, market trends, and the latest news, with a strict policy against succumbing to FOMO and FUD.
+
+    Make a prediction for the price of bitcoin in GBP for the given target timestamp.
+    Provide this as a probability distribution, giving a mean and a standard deviation.
+
+    Then, using your knowledge of data and trading in general, answer two questions succinctly:
+    What additional data that isn't included in the context would be helpful for making trade decisions?
+    Are there any issues you can see in the data provided in the context?
+    """
+
+    context = dspy.InputField()
+
+    timestamp = dspy.InputField(desc="The timestamp for which you are predicting the price of Bitcoin.")
+
+    mean = dspy.OutputField(desc="Mean GBP price prediction, as a float.")
+
+    std_dev = dspy.OutputField(desc="Standard deviation of the GBP price prediction, as a float.")
+
+    data_requests = dspy.OutputField(desc="Additional data that would be helpful for making trade decisions.")
+
+    data_issues = dspy.OutputField(desc="Any issues in the data provided in the context.")
+
+
 class PricePredictionSig(dspy.Signature):
     """
     You are an advanced swing trader with a medium-high risk appetite, trading Bitcoin.
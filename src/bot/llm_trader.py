@@ -6,6 +6,8 @@ import time
 
 import dspy
 
+from context_builder import count_tokens
+from llm_calls import LLMCallLog
 from logger import logger
 from typess.trader_input_data import TraderInputData
 from typess.trader_response import TraderResponse
@@ -27,28 +29,18 @@ class TradeDecisionSig(dspy.Signature):
     )
 
 
-class DataRequestSig(dspy.Signature):
+class DataReviewSig(dspy.Signature):
     """
-    You are an advanced swing trader with a medium-high risk appetite, trading Bitcoin. Be succinct in your answer.
+    You are an advanced swing trader with a medium-high risk appetite, trading Bitcoin, and a highly skilled data error checker. Use your knowledge of data and trading in general to answer the following questions. Be succinct in your answers.
 
-    Question: "What additional data that isn't included in the context which would be helpful for making trade decisions?"
+    Questions: What additional data that isn't included in the context would be helpful for making trade decisions? Are there any issues you can see in the data provided in the context?
     """
 
     context = dspy.InputField()
 
-    answer = dspy.OutputField()
+    data_requests = dspy.OutputField(desc="Additional data that would be helpful for making trade decisions.")
 
-
-class DataQualityCheckSig(dspy.Signature):
-    """
-    You are a highly skilled data error checker, use your knowledge of data and trading in general to answer the following question. Be succinct in your answer.
-
-    Question: Are there any issues you can see in the data provided in the context?
-    """
-
-    context = dspy.InputField()
-
-    answer = dspy.OutputField()
+    data_issues = dspy.OutputField(desc="Any issues in the data provided in the context.")
 
 
 class Trader(dspy.Module):
@@ -64,36 +56,46 @@ class Trader(dspy.Module):
         self.llama = dspy.GROQ(model="llama3-70b-8192", max_tokens=500, api_key=os.getenv("GROQ_API_KEY", ""))
         self.gpt3_5 = dspy.OpenAI(model="gpt-3.5-turbo", api_key=os.getenv("OPENAI_API_KEY"))
         dspy.settings.configure(lm=self.llama)
+        self.llm_calls = LLMCallLog()
+        self.llm_calls.watch(self.llama)
+        self.llm_calls.watch(self.gpt3_5)
 
         self.get_trade_decision = dspy.ChainOfThought(TradeDecisionSig)
         self.get_best_trade_decision = dspy.MultiChainComparison(TradeDecisionSig, M=trader_count, temperature=0.5)
-        self.get_data_request = dspy.ChainOfThought(DataRequestSig)
-
-        self.get_data_issue_checker = dspy.ChainOfThought(DataQualityCheckSig)
+        # both data questions in one call, so the context is sent once for them instead of twice
+        self.get_data_review = dspy.ChainOfThought(DataReviewSig)
 
         self.trader_count = trader_count
 
     def forward(self, trading_input_data: TraderInputData) -> TraderResponse:
         context = self.build_context(trading_input_data)
 
-        trade_decisions = [self.get_trade_decision(context=context)]
+        self.llm_calls.take()
+        # every call gets its own name, so the records tell them apart
+        with self.llm_calls.call("trade_decision_groq"):
+            trade_decisions = [self.get_trade_decision(context=context)]
 
         # to prevent request throtteling from Groq
-        with dspy.context(lm=self.gpt3_5):
+        with dspy.context(lm=self.gpt3_5), self.llm_calls.call("trade_decision_openai"):
             trade_decisions.append(self.get_trade_decision(context=context))
 
-        desired_bitcoin_percentage = self.get_best_trade_decision(trade_decisions, context=context)
-        data_request_answer = self.get_data_request(context=context)
+        with self.llm_calls.call("best_trade_decision"):
+            desired_bitcoin_percentage = self.get_best_trade_decision(trade_decisions, context=context)
 
         # to prevent request throtteling from Groq
-        with dspy.context(lm=self.gpt3_5):
-            data_issue_checker_answer = self.get_data_issue_checker(context=context)
+        with dspy.context(lm=self.gpt3_5), self.llm_calls.call("data_review"):
+            data_review = self.get_data_review(context=context)
 
+        llm_calls = self.llm_calls.take()
+        logger.log_info(
+            f"Trader made {len(llm_calls)} LLM calls: {sum(call['prompt_tokens'] for call in llm_calls)} prompt tokens "
+            f"in {sum(call['seconds'] for call in llm_calls):.2f}s"
+        )
         return TraderResponse(
             desired_bitcoin_percentage.answer,
             desired_bitcoin_percentage.rationale,
-            data_request_answer.answer,
-            data_issue_checker_answer.answer,
+            data_review.data_requests,
+            data_review.data_issues,
         )
 
     def build_context(self, trading_input_data: TraderInputData) -> str:
@@ -116,4 +118,5 @@ class Trader(dspy.Module):
         """
 
         logger.log_info("Context to be sent to LLM: " + context)
+        logger.log_info(f"Context is ~{count_tokens(context)} tokens")
         return context
@@ -1,7 +1,11 @@
+import argparse
+import time
+from datetime import datetime
+from typing import Optional
+
 from dotenv import load_dotenv
 
-from coinbase_interface import CoinbaseInterface
-from trading_strategy_v2 import TradingStrategy
+from runtime import runtime
 
 import functions_framework
 from flask import Request
@@ -9,25 +13,32 @@ from flask import Request
 
 @functions_framework.http
 def function_entry_point(_: Request):
-    _load_secrets()
-    main()
+    runtime.load_secrets()
+    with runtime.invocation() as invocation:
+        main(invocation.timestamp)
     return "Data ingestion completed.", 200
 
 
-def _load_secrets():
-    with open("/mnt2/secrets.env", "r", encoding="utf-8") as src_file:
-        with open(".env", "w", encoding="utf-8") as dest_file:
-            dest_file.write(src_file.read())
-
-    load_dotenv()
+def main(ts: Optional[datetime] = None):
+    # the strategy and its clients are built once per instance, warm invocations reuse them
+    runtime.trading_strategy.execute(ts)
 
 
-def main():
-    coinbase_interface = CoinbaseInterface()
-    trading_strategy = TradingStrategy(coinbase_interface)
-    trading_strategy.execute()
+def serve(every_minutes: int):
+    """Run the strategy on a fixed interval in one long-lived process, where LIVE_CACHE=true pays off."""
+    while True:
+        started = time.monotonic()
+        with runtime.invocation() as invocation:
+            main(invocation.timestamp)
+        time.sleep(max(0.0, every_minutes * 60 - (time.monotonic() - started)))
 
 
 if __name__ == "__main__":
     load_dotenv(override=True)
-    main()
+    parser = argparse.ArgumentParser(description="Run the trading strategy once, or repeatedly with --every-minutes.")
+    parser.add_argument("--every-minutes", type=int, help="keep running, executing the strategy on this interval")
+    parsed = parser.parse_args()
+    if parsed.every_minutes:
+        serve(parsed.every_minutes)
+    else:
+        main()
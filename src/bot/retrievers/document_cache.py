@@ -0,0 +1,184 @@
+"""
+Local SQLite copy of the bot's Firestore history.
+
+Indicator and news documents don't change once written, so the retriever keeps every document it reads here
+together with the time range it has completely mirrored per collection. Queries inside that range are answered
+locally, anything past its high-water mark is fetched from Firestore and appended.
+
+    python -m retrievers.document_cache stats
+    python -m retrievers.document_cache invalidate [--collection indicators__taapi__1h]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from logger import logger
+
+DEFAULT_CACHE_PATH = os.environ.get("DOCUMENT_CACHE_PATH", "/tmp/bot-1/document_cache.sqlite3")
+DEFAULT_MAX_BYTES = int(os.environ.get("DOCUMENT_CACHE_MAX_MB", "50")) * 1024 * 1024
+
+# how many of the oldest documents to drop at a time once the cache is over its size limit
+EVICTION_BATCH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    extraction_ts REAL NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (collection, doc_id)
+);
+CREATE INDEX IF NOT EXISTS documents_by_time ON documents (collection, extraction_ts);
+CREATE TABLE IF NOT EXISTS coverage (
+    collection TEXT PRIMARY KEY,
+    low REAL NOT NULL,
+    high REAL NOT NULL
+);
+"""
+
+
+def to_epoch(ts: datetime) -> float:
+    """Unix seconds for a datetime, naive ones being UTC as they are for Firestore."""
+    return (ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)).timestamp()
+
+
+@dataclass
+class Coverage:
+    """Every document of the collection extracted between `low` and `high` (inclusive) is in the cache."""
+
+    low: float
+    high: float
+
+    def contains(self, lower: float, upper: float) -> bool:
+        return self.low <= lower and upper <= self.high
+
+
+class DocumentCache:
+    """
+    Size bounded, the oldest history is evicted first. Evicting from the old end keeps each collection's
+    coverage a single unbroken range, where dropping arbitrary documents would leave holes in it.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def coverage(self, collection: str) -> Optional[Coverage]:
+        with self._lock:
+            row = self._conn.execute("SELECT low, high FROM coverage WHERE collection = ?", (collection,)).fetchone()
+        return Coverage(*row) if row else None
+
+    def query(self, collection: str, lower: float, upper: float, rows: int) -> List[dict]:
+        """The newest `rows` cached documents extracted between the bounds, oldest first."""
+        with self._lock:
+            payloads = self._conn.execute(
+                "SELECT payload FROM documents WHERE collection = ? AND extraction_ts BETWEEN ? AND ? "
+                "ORDER BY extraction_ts DESC LIMIT ?",
+                (collection, lower, upper, rows),
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(payloads)]
+
+    def count(self, collection: str, lower: float, upper: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE collection = ? AND extraction_ts BETWEEN ? AND ?",
+                (collection, lower, upper),
+            ).fetchone()[0]
+
+    def store(self, collection: str, entries: List[Tuple[float, dict]], covered: Optional[Coverage] = None) -> None:
+        """
+        Save (extraction time, document) pairs, and if given, record that the cache now holds everything in the
+        `covered` range. A range touching the existing coverage extends it, a disjoint one replaces it.
+        """
+        rows = []
+        for extraction_ts, doc in entries:
+            payload = json.dumps(doc, default=str)
+            rows.append((collection, doc["id"], extraction_ts, payload, len(payload)))
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", rows)
+
+            if covered is not None:
+                row = self._conn.execute(
+                    "SELECT low, high FROM coverage WHERE collection = ?", (collection,)
+                ).fetchone()
+                if row and row[0] <= covered.high and covered.low <= row[1]:
+                    covered = Coverage(min(row[0], covered.low), max(row[1], covered.high))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?)", (collection, covered.low, covered.high)
+                )
+
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size() > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT collection, doc_id, extraction_ts FROM documents ORDER BY extraction_ts LIMIT ?",
+                (EVICTION_BATCH,),
+            ).fetchall()
+            if not oldest:
+                return
+
+            self._conn.executemany(
+                "DELETE FROM documents WHERE collection = ? AND doc_id = ?", [row[:2] for row in oldest]
+            )
+            for collection in {row[0] for row in oldest}:
+                evicted_until = max(row[2] for row in oldest if row[0] == collection)
+                # anything at or before the last evicted document may now be missing
+                self._conn.execute(
+                    "UPDATE coverage SET low = MAX(low, ?) WHERE collection = ?", (evicted_until + 1e-6, collection)
+                )
+                self._conn.execute("DELETE FROM coverage WHERE collection = ? AND low > high", (collection,))
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+
+    def invalidate(self, collection: Optional[str] = None) -> int:
+        """Drop the cached documents and coverage of one collection, or of all of them. Returns the count removed."""
+        where, params = ("WHERE collection = ?", (collection,)) if collection else ("", ())
+        with self._lock, self._conn:
+            removed = self._conn.execute(f"DELETE FROM documents {where}", params).rowcount
+            self._conn.execute(f"DELETE FROM coverage {where}", params)
+        return removed
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.collection, COUNT(*), SUM(d.size), c.low, c.high FROM documents d "
+                "LEFT JOIN coverage c ON c.collection = d.collection GROUP BY d.collection"
+            ).fetchall()
+        return [
+            {"collection": collection, "documents": count, "bytes": size, "covered_from": low, "covered_to": high}
+            for collection, count, size, low, high in rows
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the local document cache.")
+    parser.add_argument("command", choices=["stats", "invalidate"])
+    parser.add_argument("--collection", help="Only invalidate this collection")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH)
+    args = parser.parse_args(argv)
+
+    cache = DocumentCache(args.path)
+    if args.command == "invalidate":
+        removed = cache.invalidate(args.collection)
+        logger.log_info(f"Removed {removed} cached documents from {args.collection or 'all collections'}")
+    else:
+        for entry in cache.stats():
+            logger.log_info(entry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Which fields of each collection the prompt actually uses.
+
+Firestore field masks (`Query.select`) keep everything else off the wire. A mask can't reach into array elements,
+so the TAAPI `data` array is still downloaded whole and each indicator is trimmed to the result fields the
+formatter reads before the document is kept or cached.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# result fields the data formatter reads for these indicators, every other indicator keeps its whole result
+INDICATOR_RESULT_FIELDS = {
+    "candle": ("open", "high", "low", "close", "volume"),
+    "MACD": ("valueMACD", "valueMACDSignal", "valueMACDHist"),
+}
+
+
+def project_indicators(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop the parts of each TAAPI indicator the prompt never reads (errors, candle timestamps, ...)."""
+    projected = []
+    for indicator in data:
+        result = indicator.get("result")
+        fields = INDICATOR_RESULT_FIELDS.get(indicator.get("id"))
+        if fields is not None and isinstance(result, dict):
+            result = {field: result[field] for field in fields if field in result}
+        projected.append({"id": indicator.get("id"), "result": result})
+    return projected
+
+
+@dataclass(frozen=True)
+class CollectionSchema:
+    """
+    `field_paths` is the mask sent with the query, `timestamp_fields` the top level datetimes converted to ISO
+    strings, and `project_data` an optional trim of the `data` field applied after download.
+    """
+
+    field_paths: Tuple[str, ...]
+    timestamp_fields: Tuple[str, ...] = ("extraction_timestamp",)
+    project_data: Optional[Callable[[Any], Any]] = None
+
+
+FIELD_SCHEMAS = {
+    "indicators__taapi__1h": CollectionSchema(("extraction_timestamp", "data"), project_data=project_indicators),
+    "indicators__taapi__1d": CollectionSchema(("extraction_timestamp", "data"), project_data=project_indicators),
+    "indicators__alternative_me": CollectionSchema(
+        (
+            "extraction_timestamp",
+            "data.timestamp",
+            "data.date",
+            "data.value_classification",
+            "data.time_until_update",
+        )
+    ),
+    "news__google_feed": CollectionSchema(
+        ("extraction_timestamp", "data.published", "data.title", "data.summary", "data.cluster_id")
+    ),
+}
+
+
+def convert_documents(doc_dicts: List[dict], schema: Optional[CollectionSchema]) -> None:
+    """Turn datetimes into ISO strings and trim `data`, in place."""
+    if schema is None:
+        # without a schema any field could be a datetime
+        for doc_dict in doc_dicts:
+            for key, value in doc_dict.items():
+                if isinstance(value, datetime):
+                    doc_dict[key] = value.isoformat(timespec="seconds")
+        return
+
+    for field in schema.timestamp_fields:
+        for doc_dict in doc_dicts:
+            value = doc_dict.get(field)
+            if isinstance(value, datetime):
+                doc_dict[field] = value.isoformat(timespec="seconds")
+
+    if schema.project_data is not None:
+        for doc_dict in doc_dicts:
+            if "data" in doc_dict:
+                doc_dict["data"] = schema.project_data(doc_dict["data"])
+
+
+def document_size(value: Any) -> int:
+    """Approximate stored size in bytes, counted the way Firestore sizes documents."""
+    if isinstance(value, dict):
+        return sum(len(key.encode()) + 1 + document_size(item) for key, item in value.items())
+    if isinstance(value, list):
+        return sum(document_size(item) for item in value)
+    if isinstance(value, str):
+        return len(value.encode()) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    # numbers and timestamps
+    return 8
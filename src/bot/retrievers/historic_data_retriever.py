@@ -1,65 +1,285 @@
-from typing import Optional
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 import dspy
 from google.cloud import firestore
 
 from logger import logger
+from retrievers.document_cache import Coverage, DocumentCache, to_epoch
+from retrievers.field_schema import FIELD_SCHEMAS, convert_documents, document_size
+from retrievers.live_cache import LiveCache
+from storage import create_client
 from typess.crypto_data import CryptoData
 
+# collections the ingestor only refreshes once per upstream publish cycle
+PUBLISH_CYCLE_COLLECTIONS = {"indicators__alternative_me"}
+
+# an ingestor run commits a little after its extraction timestamp, so the most recent stretch is never marked as
+# completely cached and is always checked against Firestore again
+SETTLE_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class Lookback:
+    """
+    How much history to read from a collection: at most `rows` documents extracted within `window` before the
+    query time. The window bounds the range scan, so a query costs the same however long the history grows.
+    """
+
+    rows: int
+    window: timedelta
+
+
+DEFAULT_LOOKBACKS = {
+    "indicators__taapi__1h": Lookback(rows=48, window=timedelta(hours=72)),
+    "indicators__taapi__1d": Lookback(rows=30, window=timedelta(days=45)),
+    "indicators__alternative_me": Lookback(rows=30, window=timedelta(days=45)),
+    "news__google_feed": Lookback(rows=50, window=timedelta(hours=24)),
+}
+
+
+@dataclass
+class CachedDocs:
+    """Documents read for a query at `valid_from`, unchanged for any query before `valid_until`."""
+
+    docs: List[dict]
+    lookback: Lookback
+    valid_from: float
+    valid_until: float
+
+    def covers(self, ts: datetime, lookback: Lookback) -> bool:
+        return lookback == self.lookback and self.valid_from <= ts.timestamp() < self.valid_until
+
+    @classmethod
+    def from_docs(cls, docs: List[dict], ts: datetime, lookback: Lookback) -> "CachedDocs":
+        # the next document only appears once alternative.me publishes, which the latest one counts down to
+        valid_until = ts.timestamp()
+        if docs and "time_until_update" in docs[-1]["data"]:
+            extracted = datetime.fromisoformat(docs[-1]["extraction_timestamp"]).timestamp()
+            valid_until = max(valid_until, extracted + int(docs[-1]["data"]["time_until_update"]))
+        return cls(docs, lookback, ts.timestamp(), valid_until)
+
+
+@dataclass
+class PayloadStats:
+    """What one query downloaded: document count, size in bytes (when measured) and seconds spent decoding it."""
+
+    documents: int
+    size: Optional[int]
+    decode_seconds: float
+
+
+@dataclass
+class RetrievalStats:
+    """Per collection metrics of one retrieval: seconds spent reading it, and what its queries downloaded."""
+
+    latencies: Dict[str, float] = field(default_factory=dict)
+    payloads: Dict[str, PayloadStats] = field(default_factory=dict)
+
 
 class HistoricDataClient(dspy.Retrieve):
-    def __init__(self, _url: str, _port: Optional[int] = None, k: int = 10):
+    def __init__(
+        self,
+        _url: str,
+        _port: Optional[int] = None,
+        k: int = 10,
+        db: Optional[firestore.Client] = None,
+        lookbacks: Optional[Dict[str, Lookback]] = None,
+        document_cache: Optional[DocumentCache] = None,
+        projected: bool = True,
+        measure_payload: bool = False,
+        live_cache: Optional[LiveCache] = None,
+    ):
         super().__init__(k=k)
 
-        self.db = firestore.Client(database="crypto-bot")
+        self.db = db or create_client()
         self.collections = {
             "indicators__taapi__1h": "taapi_1h",
             "indicators__taapi__1d": "taapi_1d",
             "indicators__alternative_me": "alternative_me",
             "news__google_feed": "google_feed",
         }
+        self.lookbacks = {**DEFAULT_LOOKBACKS, **(lookbacks or {})}
+        self._cache: Dict[str, CachedDocs] = {}
+        self.document_cache = document_cache
+        # when set, answers queries inside its window without a round trip
+        self.live_cache = live_cache
+        # only download the fields in FIELD_SCHEMAS, and optionally size what was downloaded
+        self.projected = projected
+        self.measure_payload = measure_payload
 
     # pylint: disable=arguments-differ
     def forward(self, query: datetime, k: Optional[int] = None) -> dspy.Prediction:
-        limit = k if k is not None else self.k
-        results = self._fetch_data(ts=query, limit=limit)
+        lookbacks = self.lookbacks
+        if k is not None:
+            lookbacks = {name: replace(lookback, rows=k) for name, lookback in lookbacks.items()}
+        stats = RetrievalStats()
+        results = self._fetch_data(ts=query, lookbacks=lookbacks, stats=stats)
 
-        return dspy.Prediction(crypto_data=CryptoData(**results))
+        return dspy.Prediction(crypto_data=CryptoData(**results), retrieval_stats=stats)
 
-    def _fetch_data(self, ts: datetime, limit: int) -> dict:
-        results = {data_key: [] for data_key in self.collections.values()}
+    def _fetch_data(self, ts: datetime, lookbacks: Dict[str, Lookback], stats: RetrievalStats) -> dict:
+        """
+        Query every collection concurrently, so retrieval costs one round trip rather than one per collection.
+        Metrics go to this call's `stats`, so concurrent calls on one client (as in a backtest) don't mix them up.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.collections)) as executor:
+            futures = {
+                data_key: executor.submit(self._timed_fetch, collection_name, ts, lookbacks[collection_name], stats)
+                for collection_name, data_key in self.collections.items()
+            }
+            results = {data_key: future.result() for data_key, future in futures.items()}
 
-        for collection_name, data_key in self.collections.items():
-            docs = (
-                self.db.collection(collection_name)
-                .where("extraction_timestamp", "<=", ts)
-                .order_by("extraction_timestamp", direction=firestore.Query.ASCENDING)
-                .limit(limit)
-                .get()
+        timings = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in stats.latencies.items())
+        logger.log_info(f"Retrieved data in {time.perf_counter() - start:.3f}s ({timings})")
+        if stats.payloads:
+            payloads = ", ".join(
+                f"{name} {payload.documents} docs{f' {payload.size} bytes' if payload.size is not None else ''} "
+                f"decoded in {payload.decode_seconds * 1000:.1f}ms"
+                for name, payload in stats.payloads.items()
             )
+            logger.log_info(f"Downloaded {payloads}")
+        return results
 
-            for doc in docs:
-                doc_dict = doc.to_dict()
+    def fetch_range(self, start: datetime, end: datetime) -> Dict[str, List[Tuple[float, dict]]]:
+        """
+        Every document any query between `start` and `end` could see, per collection, as (extraction time, document)
+        pairs oldest first. Lets a backtest read a whole range once and slice it locally.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.collections)) as executor:
+            futures = {
+                collection_name: executor.submit(
+                    self._query, collection_name, start - self.lookbacks[collection_name].window, end, None
+                )
+                for collection_name in self.collections
+            }
+            return {collection_name: future.result() for collection_name, future in futures.items()}
 
-                if doc_dict is None:
-                    logger.log_info(f"WARNING Document {doc.id} is empty")
-                    continue
+    def _timed_fetch(self, collection_name: str, ts: datetime, lookback: Lookback, stats: RetrievalStats) -> List[dict]:
+        start = time.perf_counter()
+        docs = None
+        if self.live_cache is not None:
+            docs = self.live_cache.query(collection_name, to_epoch(ts - lookback.window), to_epoch(ts), lookback.rows)
+        if docs is None and collection_name in PUBLISH_CYCLE_COLLECTIONS:
+            docs = self._fetch_publish_cycle_collection(collection_name, ts, lookback, stats)
+        elif docs is None:
+            docs = self._fetch_collection(collection_name, ts, lookback, stats)
+        stats.latencies[collection_name] = time.perf_counter() - start
+        return docs
 
-                doc_dict["id"] = doc.id  # Include the document ID in the result
+    def _fetch_publish_cycle_collection(
+        self, collection_name: str, ts: datetime, lookback: Lookback, stats: RetrievalStats
+    ) -> List[dict]:
+        cached = self._cache.get(collection_name)
+        if cached is not None and cached.covers(ts, lookback):
+            logger.log_info(f"Using cached {collection_name}, no new document before the next publish")
+            return cached.docs
 
-                # Convert any datetime objects to ISO format strings
-                for key, value in doc_dict.items():
-                    if isinstance(value, datetime):
-                        doc_dict[key] = value.isoformat(timespec="seconds")
-                results[data_key].append(doc_dict)
+        docs = self._fetch_collection(collection_name, ts, lookback, stats)
+        self._cache[collection_name] = CachedDocs.from_docs(docs, ts, lookback)
+        return docs
 
-        return results
+    def _fetch_collection(
+        self, collection_name: str, ts: datetime, lookback: Lookback, stats: RetrievalStats
+    ) -> List[dict]:
+        """The newest `lookback.rows` documents up to `ts`, returned oldest first."""
+        if self.document_cache is None:
+            entries = self._query(collection_name, ts - lookback.window, ts, lookback.rows, stats=stats)
+            return [doc for _, doc in entries]
 
+        lower, upper = to_epoch(ts - lookback.window), to_epoch(ts)
+        coverage = self.document_cache.coverage(collection_name)
+        if not self._cached_through(collection_name, coverage, lower, upper, lookback.rows):
+            # when the query runs past the cached range, which already reaches back far enough, only documents past its
+            # high-water mark are new. Anything else (e.g. a window before the cached range) is queried in full
+            resume = (
+                coverage is not None
+                and upper > coverage.high
+                and self._cached_through(collection_name, coverage, lower, coverage.high, lookback.rows)
+            )
+            fetch_from = coverage.high if resume else lower
+            entries = self._query(
+                collection_name,
+                datetime.fromtimestamp(fetch_from, tz=timezone.utc),
+                ts,
+                lookback.rows,
+                after=resume,
+                stats=stats,
+            )
+            self.document_cache.store(collection_name, entries, _covered(entries, fetch_from, upper, lookback.rows))
 
-# Usage example:
-if __name__ == "__main__":
-    retriever = HistoricDataClient("no-url")
+        return self.document_cache.query(collection_name, lower, upper, lookback.rows)
+
+    def _cached_through(
+        self, collection_name: str, coverage: Optional[Coverage], lower: float, upper: float, rows: int
+    ) -> bool:
+        """Whether the cache alone answers the newest `rows` documents between `lower` and `upper`."""
+        if coverage is None or upper > coverage.high or lower > coverage.high:
+            return False
+        # coverage starting after `lower` is still enough if it holds a full page of documents
+        return coverage.low <= lower or self.document_cache.count(collection_name, coverage.low, upper) >= rows
+
+    def _query(
+        self,
+        collection_name: str,
+        lower: datetime,
+        upper: datetime,
+        rows: Optional[int],
+        after: bool = False,
+        stats: Optional[RetrievalStats] = None,
+    ) -> List[Tuple[float, dict]]:
+        """
+        (extraction time, document) pairs of the newest `rows` documents between the bounds, oldest first. What was
+        downloaded is recorded in `stats`, when given.
+        """
+        schema = FIELD_SCHEMAS.get(collection_name) if self.projected else None
+        query = self.db.collection(collection_name)
+        if schema is not None:
+            query = query.select(schema.field_paths)
+        query = (
+            query.where("extraction_timestamp", ">" if after else ">=", lower)
+            .where("extraction_timestamp", "<=", upper)
+            .order_by("extraction_timestamp", direction=firestore.Query.DESCENDING)
+        )
+        docs = (query.limit(rows) if rows is not None else query).get()
+
+        start = time.perf_counter()
+        doc_dicts = []
+        for doc in docs:
+            doc_dict = doc.to_dict()
 
-    latest_data = retriever.forward(datetime.now())
+            if doc_dict is None:
+                logger.log_info(f"WARNING Document {doc.id} is empty")
+                continue
+
+            doc_dict["id"] = doc.id  # Include the document ID in the result
+            doc_dicts.append(doc_dict)
+
+        size = sum(document_size(doc_dict) for doc_dict in doc_dicts) if self.measure_payload else None
+        epochs = [to_epoch(doc_dict["extraction_timestamp"]) for doc_dict in doc_dicts]
+        convert_documents(doc_dicts, schema)
+        if stats is not None:
+            stats.payloads[collection_name] = PayloadStats(len(doc_dicts), size, time.perf_counter() - start)
+
+        return list(zip(reversed(epochs), reversed(doc_dicts)))
+
+
+def _covered(entries: List[Tuple[float, dict]], fetch_from: float, upper: float, rows: int) -> Optional[Coverage]:
+    """The range a query fetched completely, or None if none of it has settled yet."""
+    # a full page may have cut off older documents, so only the span it returned is complete
+    low = entries[0][0] if len(entries) == rows else fetch_from
+    high = min(upper, time.time() - SETTLE_SECONDS)
+    return Coverage(low, high) if low <= high else None
+
+
+# Usage example, comparing what a full and a projected read download:
+if __name__ == "__main__":
+    db = create_client()
+    for projected in (False, True):
+        retriever = HistoricDataClient("no-url", db=db, projected=projected, measure_payload=True)
+        latest_data = retriever.forward(datetime.now())
     print(latest_data)
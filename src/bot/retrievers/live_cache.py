@@ -0,0 +1,174 @@
+"""
+Rolling in-memory window of the bot's collections, kept current by Firestore snapshot listeners.
+
+Meant for a long-running bot process: the data only changes when the ingestor writes, so instead of querying before
+every decision the listeners push each new document as it is committed and retrieval is answered from memory.
+A supervisor thread replaces listeners that have stopped and periodically resubscribes to move each window's lower
+bound forward. Every (re)subscription starts with a full snapshot of the window, which replaces what was held, so
+anything missed while disconnected is resynced.
+"""
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import logger
+from retrievers.document_cache import to_epoch
+from retrievers.field_schema import FIELD_SCHEMAS, convert_documents
+
+# how often the supervisor checks the listeners
+CHECK_SECONDS = 30
+# listeners are replaced this often so their queries don't keep growing from the original lower bound
+RESUBSCRIBE_SECONDS = 6 * 3600
+# kept beyond each collection's lookback window, so queries a little in the past are still answered
+RETENTION_MARGIN = timedelta(days=1)
+
+
+@dataclass
+class LiveWindow:
+    """Documents of one collection extracted since `covered_from`, and the listener keeping them current."""
+
+    docs: Dict[str, Tuple[float, dict]] = field(default_factory=dict)
+    covered_from: float = 0.0
+    synced: bool = False
+    watch: Any = None
+    subscribed_at: float = 0.0
+    _sorted: Optional[Tuple[List[float], List[dict]]] = None
+
+    def sorted(self) -> Tuple[List[float], List[dict]]:
+        if self._sorted is None:
+            entries = sorted(self.docs.values(), key=lambda entry: entry[0])
+            self._sorted = ([epoch for epoch, _ in entries], [doc for _, doc in entries])
+        return self._sorted
+
+    def replace(self, entries: Dict[str, Tuple[float, dict]], covered_from: float) -> None:
+        self.docs, self.covered_from, self.synced, self._sorted = entries, covered_from, True, None
+
+    def update(self, doc_id: str, entry: Optional[Tuple[float, dict]]) -> None:
+        if entry is None:
+            self.docs.pop(doc_id, None)
+        else:
+            self.docs[doc_id] = entry
+        self._sorted = None
+
+    def trim(self, cutoff: float) -> None:
+        stale = [doc_id for doc_id, (epoch, _) in self.docs.items() if epoch < cutoff]
+        for doc_id in stale:
+            del self.docs[doc_id]
+        self.covered_from = max(self.covered_from, cutoff)
+        if stale:
+            self._sorted = None
+
+
+class LiveCache:
+    """
+    `windows` is how far back each collection's queries reach. `query` returns None whenever the cache can't
+    answer a range on its own (not synced yet, listener down, or the range starts before the window), and callers
+    fall back to Firestore.
+    """
+
+    def __init__(self, db, windows: Dict[str, timedelta]):
+        self.db = db
+        self.retention = {name: window + RETENTION_MARGIN for name, window in windows.items()}
+        self._windows = {name: LiveWindow() for name in windows}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+
+    def start(self) -> "LiveCache":
+        self.check()
+        self._supervisor = threading.Thread(target=self._supervise, name="live-cache", daemon=True)
+        self._supervisor.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for window in self._windows.values():
+            if window.watch is not None:
+                window.watch.unsubscribe()
+
+    def query(self, collection: str, lower: float, upper: float, rows: int) -> Optional[List[dict]]:
+        """The newest `rows` documents extracted between the bounds, oldest first."""
+        with self._lock:
+            window = self._windows.get(collection)
+            if window is None or not window.synced or lower < window.covered_from:
+                return None
+            epochs, docs = window.sorted()
+            lo = bisect.bisect_left(epochs, lower)
+            hi = bisect.bisect_right(epochs, upper)
+            return docs[max(lo, hi - rows) : hi]
+
+    def check(self) -> None:
+        """Resubscribe any listener that has stopped, or that is due to move its window forward."""
+        for collection, window in self._windows.items():
+            active = window.watch is not None and getattr(window.watch, "is_active", True)
+            if active and time.time() - window.subscribed_at < RESUBSCRIBE_SECONDS:
+                continue
+
+            if not active and window.synced:
+                logger.log_info(f"Live cache listener for {collection} stopped, resubscribing")
+                with self._lock:
+                    window.synced = False
+            try:
+                self._subscribe(collection, window)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.log_error(f"Live cache failed to subscribe to {collection}, retrying in {CHECK_SECONDS}s: {e}")
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(CHECK_SECONDS):
+            self.check()
+
+    def _subscribe(self, collection: str, window: LiveWindow) -> None:
+        since = datetime.now(timezone.utc) - self.retention[collection]
+        query = self.db.collection(collection).where("extraction_timestamp", ">=", since)
+        initial = threading.Event()
+
+        def on_snapshot(docs, changes, _read_time):
+            self._on_snapshot(collection, window, docs, changes, to_epoch(since), not initial.is_set())
+            initial.set()
+
+        previous = window.watch
+        window.watch = query.on_snapshot(on_snapshot)
+        window.subscribed_at = time.time()
+        if previous is not None:
+            previous.unsubscribe()
+
+    def _on_snapshot(
+        self, collection: str, window: LiveWindow, docs: List, changes: List, since: float, resync: bool
+    ) -> None:
+        start = time.perf_counter()
+        schema = FIELD_SCHEMAS.get(collection)
+
+        with self._lock:
+            if resync:
+                # a new listener's first snapshot is the whole window
+                window.replace(_entries(docs, schema), since)
+            else:
+                for change in changes:
+                    doc = change.document
+                    removed = change.type.name == "REMOVED"
+                    window.update(doc.id, None if removed else _entries([doc], schema).get(doc.id))
+            window.trim(time.time() - self.retention[collection].total_seconds())
+            held = len(window.docs)
+
+        logger.log_info(
+            f"Live cache {'resynced' if resync else 'updated'} {collection}: {len(docs if resync else changes)} "
+            f"documents in {time.perf_counter() - start:.3f}s, {held} held"
+        )
+
+
+def _entries(snapshots: List, schema) -> Dict[str, Tuple[float, dict]]:
+    doc_dicts = []
+    for snapshot in snapshots:
+        doc_dict = snapshot.to_dict()
+        if doc_dict is None:
+            continue
+        doc_dict["id"] = snapshot.id
+        doc_dicts.append(doc_dict)
+
+    epochs = [to_epoch(doc_dict["extraction_timestamp"]) for doc_dict in doc_dicts]
+    convert_documents(doc_dicts, schema)
+    return {doc_dict["id"]: (epoch, doc_dict) for epoch, doc_dict in zip(epochs, doc_dicts)}
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+from coinbase_interface import CoinbaseInterface
+from logger import logger
+from retrievers.document_cache import DocumentCache
+from retrievers.historic_data_retriever import DEFAULT_LOOKBACKS
+from retrievers.live_cache import LiveCache
+from storage import create_client
+from trading_strategy_v2 import TradingStrategy
+
+SECRETS_PATH = "/mnt2/secrets.env"
+
+T = TypeVar("T")
+
+
+@dataclass
+class Invocation:
+    number: int
+    timestamp: datetime
+
+    @property
+    def cold(self) -> bool:
+        return self.number == 1
+
+
+class Runtime:
+    """
+    Process wide clients for the cloud function. The firestore client, coinbase client and the strategy (with its
+    LMs) are created on first use and reused by later invocations on the same warm instance.
+    """
+
+    def __init__(self):
+        self.process_start = time.perf_counter()
+        self.invocations = 0
+        self.init_duration = 0.0
+        self._clients: Dict[str, object] = {}
+        self._secrets_loaded = False
+        self._lock = threading.RLock()
+
+    def load_secrets(self) -> None:
+        with self._lock:
+            if self._secrets_loaded:
+                return
+            with open(SECRETS_PATH, "r", encoding="utf-8") as src_file:
+                with open(".env", "w", encoding="utf-8") as dest_file:
+                    dest_file.write(src_file.read())
+
+            load_dotenv()
+            self._secrets_loaded = True
+
+    @property
+    def db(self) -> firestore.Client:
+        return self._get("db", lambda: create_client())
+
+    @property
+    def coinbase_interface(self) -> CoinbaseInterface:
+        return self._get("coinbase_interface", CoinbaseInterface)
+
+    @property
+    def document_cache(self) -> DocumentCache:
+        # lives in the instance's /tmp, so it survives warm invocations but starts empty on a cold start
+        return self._get("document_cache", DocumentCache)
+
+    @property
+    def live_cache(self) -> Optional[LiveCache]:
+        # only worth its listeners in a long-running process, see main.serve
+        if os.environ.get("LIVE_CACHE", "false") != "true":
+            return None
+        return self._get(
+            "live_cache",
+            lambda: LiveCache(self.db, {name: lookback.window for name, lookback in DEFAULT_LOOKBACKS.items()}).start(),
+        )
+
+    @property
+    def trading_strategy(self) -> TradingStrategy:
+        return self._get(
+            "trading_strategy",
+            lambda: TradingStrategy(
+                self.coinbase_interface, db=self.db, document_cache=self.document_cache, live_cache=self.live_cache
+            ),
+        )
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        with self._lock:
+            if name not in self._clients:
+                start = time.perf_counter()
+                self._clients[name] = factory()
+                duration = time.perf_counter() - start
+                self.init_duration += duration
+                logger.log_info(f"Initialised {name} in {duration:.2f}s")
+            return self._clients[name]
+
+    @contextmanager
+    def invocation(self) -> Iterator[Invocation]:
+        """Scope one request, giving it its own timestamp and logging whether it paid for client creation."""
+        with self._lock:
+            self.invocations += 1
+            invocation = Invocation(self.invocations, datetime.now())
+
+        start = time.perf_counter()
+        init_before = self.init_duration
+        try:
+            yield invocation
+        finally:
+            logger.log_info(
+                f"{'Cold' if invocation.cold else 'Warm'} start invocation {invocation.number} finished in "
+                f"{time.perf_counter() - start:.2f}s ({self.init_duration - init_before:.2f}s creating clients, "
+                f"process up {time.perf_counter() - self.process_start:.0f}s)"
+            )
+
+
+runtime = Runtime()
@@ -0,0 +1,35 @@
+"""
+The storage backend every Firestore-touching class falls back to when no client is passed in.
+
+    STORAGE_BACKEND=firestore  (default) the crypto-bot Firestore database
+    STORAGE_BACKEND=memory     one in-process MemoryFirestore shared by the whole process, for offline runs
+                               (it lives in tests/support, which must then be on the PYTHONPATH)
+
+Anything passed as `db` only needs the subset of the firestore.Client API that MemoryFirestore implements.
+"""
+
+import os
+import threading
+from typing import Any, Optional
+
+from google.cloud import firestore
+
+_memory_backend: Optional[Any] = None
+_lock = threading.Lock()
+
+
+def create_client():
+    backend = os.environ.get("STORAGE_BACKEND", "firestore")
+    if backend == "firestore":
+        return firestore.Client(database="crypto-bot")
+    if backend != "memory":
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', expected 'firestore' or 'memory'")
+
+    global _memory_backend  # pylint: disable=global-statement
+    with _lock:
+        if _memory_backend is None:
+            # test support rather than part of the deployed function, so only imported when asked for
+            from memory_firestore import MemoryFirestore  # pylint: disable=import-outside-toplevel
+
+            _memory_backend = MemoryFirestore()
+        return _memory_backend
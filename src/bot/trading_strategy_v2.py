@@ -1,23 +1,36 @@
 from datetime import datetime, timedelta
+from typing import Optional
+
+from google.cloud import firestore
 
 from logger import logger
 from coinbase_interface import CoinbaseInterface
 from llm_price_predictor import PricePredictor
+from retrievers.document_cache import DocumentCache
+from retrievers.live_cache import LiveCache
 from decision_persistance import DecisionPersistance
 
 
 class TradingStrategy:
-    def __init__(self, _coinbase_interface: CoinbaseInterface):
+    def __init__(
+        self,
+        _coinbase_interface: CoinbaseInterface,
+        db: Optional[firestore.Client] = None,
+        document_cache: Optional[DocumentCache] = None,
+        live_cache: Optional[LiveCache] = None,
+    ):
 
         self.target_timedelta = timedelta(hours=1)
 
-        self.price_predictor = PricePredictor(self.target_timedelta)
-        self.decision_persistance = DecisionPersistance()
+        self.price_predictor = PricePredictor(
+            self.target_timedelta, db=db, document_cache=document_cache, live_cache=live_cache
+        )
+        self.decision_persistance = DecisionPersistance(db=db)
 
-    def execute(self):
+    def execute(self, ts: Optional[datetime] = None):
         logger.log_info("Starting new trading strategy execution...")
 
-        ts = datetime.now()
+        ts = ts or datetime.now()
 
         price_prediction = self.price_predictor(ts)
         self.decision_persistance.store_prediction_data(price_prediction.toDict())
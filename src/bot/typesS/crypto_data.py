@@ -1,5 +1,7 @@
 from typing import Any, Dict, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from typess.indicator_frame import IndicatorFrame, NewsTable
 
 
 @dataclass
@@ -9,12 +11,19 @@ class CryptoData:
     alternative_me: List[Dict[str, Any]]
     google_feed: List[Dict[str, Any]]
 
+    # columnar views, built once when the data is retrieved
+    hourly: IndicatorFrame = field(init=False, repr=False)
+    daily: IndicatorFrame = field(init=False, repr=False)
+    news: NewsTable = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.hourly = IndicatorFrame.from_documents(self.taapi_1h)
+        self.daily = IndicatorFrame.from_documents(self.taapi_1d)
+        self.news = NewsTable.from_documents(self.google_feed)
+
     @property
     def latest_product_price(self) -> float:
-        latest_taapi_data = self.taapi_1h[-1]["data"]
-        price_data = latest_taapi_data[1]
-
-        if price_data["id"] != "price":
-            raise ValueError(f"Expected price data, but got {price_data['id']}")
+        if "price" not in self.hourly.columns:
+            raise ValueError("Expected price data in the hourly indicators, but found none")
 
-        return price_data["result"]["value"][0]
+        return self.hourly.latest("price")
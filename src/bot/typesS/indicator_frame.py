@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume")
+
+# column names match the labels the data formatter gives these fields
+MACD_COLUMNS = {"valueMACD": "MACD", "valueMACDSignal": "MACD_signal", "valueMACDHist": "MACD_hist"}
+
+
+@dataclass
+class IndicatorFrame:
+    """
+    Indicator documents as columns: one float64 array per indicator field (candle_close, price, 50EMA, RSI,
+    MACD_signal, ...) over a candle-time index, NaN where a document lacks the field. Rows are in index order.
+    """
+
+    index: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def latest(self, name: str) -> float:
+        column = self.columns.get(name)
+        if column is None or len(column) == 0:
+            raise ValueError(f"No '{name}' values available")
+        if np.isnan(column[-1]):
+            raise ValueError(f"The latest row has no '{name}' value")
+        return float(column[-1])
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "IndicatorFrame":
+        """Rows with candle times in [start, end], found by binary search on the index."""
+        lo = 0 if start is None else int(np.searchsorted(self.index, _to_datetime64(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.index, _to_datetime64(end), side="right"))
+        return IndicatorFrame(self.index[lo:hi], {name: column[lo:hi] for name, column in self.columns.items()})
+
+    def tail(self, count: int) -> "IndicatorFrame":
+        return IndicatorFrame(self.index[-count:], {name: column[-count:] for name, column in self.columns.items()})
+
+    @classmethod
+    def from_documents(cls, docs: List[Dict[str, Any]]) -> "IndicatorFrame":
+        """Build from indicator documents, whose IDs are candle times ('2024-06-26 20:00:00 (Wednesday) UTC')."""
+        index = np.array([doc["id"][:19] for doc in docs], dtype="datetime64[s]")
+        columns: Dict[str, np.ndarray] = {}
+
+        for row, doc in enumerate(docs):
+            for name, value in _fields(doc["data"]):
+                if name not in columns:
+                    columns[name] = np.full(len(docs), np.nan)
+                columns[name][row] = value
+
+        order = np.argsort(index, kind="stable")
+        if np.any(order != np.arange(len(order))):
+            index = index[order]
+            columns = {name: column[order] for name, column in columns.items()}
+        return cls(index, columns)
+
+
+@dataclass
+class NewsTable:
+    """News items as parallel columns, with publish times as datetime64 for range filtering."""
+
+    published: np.ndarray
+    titles: List[str]
+    summaries: List[str]
+
+    def __len__(self) -> int:
+        return len(self.published)
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "NewsTable":
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.published >= _to_datetime64(start)
+        if end is not None:
+            mask &= self.published <= _to_datetime64(end)
+        rows = np.flatnonzero(mask)
+        return NewsTable(self.published[rows], [self.titles[i] for i in rows], [self.summaries[i] for i in rows])
+
+    @classmethod
+    def from_documents(cls, docs: List[Dict[str, Any]]) -> "NewsTable":
+        return cls(
+            published=np.array([_parse_published(doc["data"]["published"]) for doc in docs], dtype="datetime64[s]"),
+            titles=[doc["data"]["title"] for doc in docs],
+            summaries=[doc["data"]["summary"] for doc in docs],
+        )
+
+
+def _fields(data: List[Dict[str, Any]]) -> Iterator[Tuple[str, float]]:
+    for indicator in data:
+        result = indicator.get("result")
+        if not isinstance(result, dict):
+            continue
+
+        if indicator["id"] == "candle":
+            for field in CANDLE_FIELDS:
+                if field in result:
+                    yield f"candle_{field}", _to_float(result[field])
+            continue
+
+        for field, value in result.items():
+            if indicator["id"] == "MACD" and field in MACD_COLUMNS:
+                name = MACD_COLUMNS[field]
+            else:
+                name = indicator["id"] if field == "value" else f"{indicator['id']}_{field}"
+
+            value = value[0] if isinstance(value, list) and value else value
+            if value is None or isinstance(value, (int, float)):
+                yield name, _to_float(value)
+
+
+def _to_float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _to_datetime64(ts: datetime) -> np.datetime64:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(ts, "s")
+
+
+def _parse_published(published: str) -> np.datetime64:
+    try:
+        return _to_datetime64(datetime.fromisoformat(published.replace("Z", "+00:00")))
+    except ValueError:
+        return np.datetime64("NaT")
@@ -1,5 +1,7 @@
 from functools import singledispatch
-from typing import Any
+from typing import Any, List, Sequence, Union
+
+import numpy as np
 
 
 @singledispatch
@@ -20,6 +22,36 @@ def _(val: str) -> str:
     return val
 
 
+def five_sig_fig_array(values: Union[np.ndarray, Sequence[Any]]) -> List[Any]:
+    """
+    five_sig_fig over a whole column in one pass, giving the same strings. Numbers and numeric strings are formatted,
+    anything else is returned unchanged.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return _format_floats(values.astype(np.float64).tolist())
+
+    results = list(values)
+    positions, numbers = [], []
+    for i, val in enumerate(results):
+        if isinstance(val, (int, float)):
+            positions.append(i)
+            numbers.append(float(val))
+        elif isinstance(val, str) and val.replace(".", "", 1).isdigit():
+            positions.append(i)
+            numbers.append(float(val))
+
+    for i, formatted in zip(positions, _format_floats(numbers)):
+        results[i] = formatted
+    return results
+
+
+def _format_floats(values: List[float]) -> List[str]:
+    # one comprehension measured faster than np.char.mod, which boxes every element into a numpy scalar
+    formatted = ["%.5g" % val for val in values]
+    # only the rare exponent forms need _format_float's expansion
+    return [_format_float(val) if "e" in num else num for val, num in zip(values, formatted)]
+
+
 def _format_float(val: float) -> str:
     """
     Format a float to 5 significant figures.
@@ -0,0 +1,188 @@
+"""
+Backfill indicator and fear-and-greed history over a date range, e.g.
+
+    python backfill.py --start 2024-01-01 --end 2024-06-01 --intervals 1h 1d
+
+Progress is checkpointed per job, so rerunning the same command after an interruption resumes where it stopped.
+"""
+
+import argparse
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+from candle_fetcher import INTERVAL_SECONDS, CoinbaseCandleFetcher, to_product_id
+from crypto_indicators import LOCAL_CANDLE_COUNT
+from fear_greed_cache import with_iso_date
+from firestore_writer import MAX_BATCH_SIZE, BatchWriter
+from http_client import ApiClient
+from indicator_engine import IndicatorEngine, values_at
+from ingestion_scheduler import DEFAULT_SYMBOL, indicator_collection
+from ingestor_logger import ingestor_logger
+
+CHECKPOINT_COLLECTION = "ingestor__backfill_checkpoints"
+ALTERNATIVE_ME_URL = "https://api.alternative.me/fng/"
+
+Document = Tuple[str, Dict[str, Any]]
+
+
+class Backfill:
+    def __init__(
+        self,
+        db,
+        http: Optional[ApiClient] = None,
+        symbol: str = DEFAULT_SYMBOL,
+        max_workers: int = 4,
+        chunk_size: int = MAX_BATCH_SIZE,
+        overwrite: bool = False,
+    ):
+        self.db = db
+        self.http = http or ApiClient()
+        self.symbol = symbol
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.overwrite = overwrite
+        self.candle_fetcher = CoinbaseCandleFetcher(self.http)
+        self.indicator_engine = IndicatorEngine()
+
+    def backfill_indicators(
+        self, interval: str, start: datetime, end: datetime, now: Optional[datetime] = None
+    ) -> None:
+        """
+        Write one indicator document per candle opening in [start, end) that has closed by `now`. A candle still
+        forming would be written with a close time in the future and then skipped by the checkpoint on a rerun.
+        """
+        now = now or datetime.now(timezone.utc)
+        job_id = _job_id(self.symbol, interval, start, end)
+        granularity = INTERVAL_SECONDS[interval]
+        resume_ts = self._load_checkpoint(job_id)
+
+        # fetch enough earlier candles for the long EMAs to settle before the first backfilled candle
+        warmup = max(LOCAL_CANDLE_COUNT, self.indicator_engine.required_candles) * granularity
+        series = self.candle_fetcher.get_candle_range(
+            to_product_id(self.symbol), interval, int(start.timestamp()) - warmup, int(end.timestamp()) - 1
+        )
+        results = self.indicator_engine.compute(series)
+
+        in_range = (series.timestamps >= start.timestamp()) & (series.timestamps < end.timestamp())
+        in_range &= series.timestamps + granularity <= now.timestamp()
+        if resume_ts is not None:
+            in_range &= series.timestamps > resume_ts
+
+        documents = []
+        for index in np.flatnonzero(in_range):
+            document = self.indicator_engine.build_document(series, int(index), values_at(results, index))
+            closed_at = datetime.fromtimestamp(int(series.timestamps[index]) + granularity, tz=timezone.utc)
+            documents.append((document["id"], dict(extraction_timestamp=closed_at, data=document["data"])))
+
+        checkpoints = [int(ts) for ts in series.timestamps[in_range]]
+        ingestor_logger.info("Backfilling %s %s candles for %s", len(documents), interval, self.symbol)
+        self._write(indicator_collection(self.symbol, interval), documents, checkpoints, job_id)
+
+    def backfill_fear_greed(self, start: datetime, end: datetime) -> None:
+        """Write one fear-and-greed document per day in [start, end)."""
+        job_id = _job_id("alternative_me", "1d", start, end)
+        resume_ts = self._load_checkpoint(job_id)
+
+        response = self.http.get(
+            "alternative_me", ALTERNATIVE_ME_URL, params={"limit": 0, "date_format": "uk"}, timeout=30
+        )
+        response.raise_for_status()
+
+        entries = []
+        for entry in response.json()["data"]:
+            published = datetime.strptime(entry["timestamp"], "%d-%m-%Y").replace(tzinfo=timezone.utc)
+            if start <= published < end and (resume_ts is None or published.timestamp() > resume_ts):
+                entries.append((published, entry))
+        entries.sort(key=lambda item: item[0])
+
+        documents = [
+            (entry["timestamp"], dict(extraction_timestamp=ts, data=with_iso_date(entry))) for ts, entry in entries
+        ]
+        checkpoints = [int(ts.timestamp()) for ts, _ in entries]
+        ingestor_logger.info("Backfilling %s fear and greed days", len(documents))
+        self._write("indicators__alternative_me", documents, checkpoints, job_id)
+
+    def _write(self, collection: str, documents: List[Document], checkpoints: List[int], job_id: str) -> None:
+        """
+        Write chunks in parallel, a wave of `max_workers` chunks at a time, checkpointing after each wave.
+        Documents are written in time order, so the checkpoint is the newest timestamp of the wave.
+        """
+        chunks = [
+            (documents[i : i + self.chunk_size], checkpoints[min(i + self.chunk_size, len(documents)) - 1])
+            for i in range(0, len(documents), self.chunk_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for wave_start in range(0, len(chunks), self.max_workers):
+                wave = chunks[wave_start : wave_start + self.max_workers]
+                list(executor.map(lambda chunk: self._write_chunk(collection, chunk[0]), wave))
+                self._save_checkpoint(job_id, wave[-1][1])
+                ingestor_logger.info(
+                    "%s: %s/%s chunks written", job_id, min(wave_start + self.max_workers, len(chunks)), len(chunks)
+                )
+
+    def _write_chunk(self, collection: str, documents: List[Document]) -> None:
+        writer = BatchWriter(self.db, max_batch_size=self.chunk_size)
+        for doc_id, data in documents:
+            writer.add(collection, doc_id, data, overwrite=self.overwrite)
+        writer.flush()
+
+    def _load_checkpoint(self, job_id: str) -> Optional[int]:
+        snapshot = self.db.collection(CHECKPOINT_COLLECTION).document(job_id).get()
+        if not snapshot.exists:
+            return None
+
+        last_timestamp = snapshot.to_dict()["last_timestamp"]
+        ingestor_logger.info("Resuming %s after %s", job_id, datetime.fromtimestamp(last_timestamp, tz=timezone.utc))
+        return last_timestamp
+
+    def _save_checkpoint(self, job_id: str, last_timestamp: int) -> None:
+        self.db.collection(CHECKPOINT_COLLECTION).document(job_id).set(
+            {"last_timestamp": last_timestamp, "updated_at": datetime.now(timezone.utc)}
+        )
+
+
+def _job_id(source: str, interval: str, start: datetime, end: datetime) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", f"{source}__{interval}__{start:%Y%m%d}__{end:%Y%m%d}")
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backfill historical indicators and fear-and-greed values.")
+    parser.add_argument("--start", type=_parse_date, required=True, help="first day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", type=_parse_date, required=True, help="day to stop before (YYYY-MM-DD)")
+    parser.add_argument("--intervals", nargs="+", default=["1h", "1d"], choices=sorted(INTERVAL_SECONDS))
+    parser.add_argument("--symbol", default=DEFAULT_SYMBOL)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--overwrite", action="store_true", help="replace documents already written by live runs")
+    parser.add_argument("--skip-fear-greed", action="store_true")
+    parsed = parser.parse_args(args)
+
+    if parsed.start >= parsed.end:
+        raise ValueError("--start must be before --end")
+
+    db = firestore.Client(database="crypto-bot")
+    backfill = Backfill(db, symbol=parsed.symbol, max_workers=parsed.workers, overwrite=parsed.overwrite)
+
+    for interval in parsed.intervals:
+        backfill.backfill_indicators(interval, parsed.start, parsed.end)
+
+    if not parsed.skip_fear_greed:
+        backfill.backfill_fear_greed(parsed.start, parsed.end)
+
+    backfill.http.log_latencies()
+    ingestor_logger.info("Backfill completed.")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
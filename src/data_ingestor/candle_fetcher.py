@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from http_client import ApiClient
+
+COINBASE_CANDLES_URL = "https://api.exchange.coinbase.com/products/{product_id}/candles"
+
+# coinbase returns at most 300 candles per request
+MAX_CANDLES_PER_REQUEST = 300
+
+INTERVAL_SECONDS = {"15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+
+# coinbase has no 4h granularity, so those candles are aggregated from hourly ones
+RESAMPLED_FROM = {"4h": "1h"}
+
+
+@dataclass
+class CandleSeries:
+    """OHLCV candles in ascending time order, one NumPy array per field. Timestamps are candle open times."""
+
+    timestamps: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def tail(self, count: int) -> "CandleSeries":
+        return CandleSeries(
+            self.timestamps[-count:],
+            self.open[-count:],
+            self.high[-count:],
+            self.low[-count:],
+            self.close[-count:],
+            self.volume[-count:],
+        )
+
+    def timestamp_human(self, index: int = -1) -> str:
+        """Timestamp in the format TAAPI uses for document IDs, e.g. '2024-06-26 20:00:00 (Wednesday) UTC'."""
+        ts = datetime.fromtimestamp(int(self.timestamps[index]), tz=timezone.utc)
+        return ts.strftime("%Y-%m-%d %H:%M:%S (%A) UTC")
+
+    def resample(self, seconds: int) -> "CandleSeries":
+        """Aggregate into candles of `seconds`, aligned to multiples of it since the epoch."""
+        if len(self) == 0:
+            return self
+
+        buckets = self.timestamps // seconds * seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(self)] - 1
+        return CandleSeries(
+            timestamps=buckets[starts],
+            open=self.open[starts],
+            high=np.maximum.reduceat(self.high, starts),
+            low=np.minimum.reduceat(self.low, starts),
+            close=self.close[ends],
+            volume=np.add.reduceat(self.volume, starts),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "CandleSeries":
+        """Build from rows of [time, low, high, open, close, volume], the coinbase layout."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        return cls(
+            timestamps=rows[:, 0].astype(np.int64),
+            open=rows[:, 3],
+            high=rows[:, 2],
+            low=rows[:, 1],
+            close=rows[:, 4],
+            volume=rows[:, 5],
+        )
+
+
+class CoinbaseCandleFetcher:
+    def __init__(self, http: Optional[ApiClient] = None):
+        self.http = http or ApiClient()
+
+    def get_candles(self, product_id: str, interval: str, count: int, end: Optional[datetime] = None) -> CandleSeries:
+        """Fetch the latest `count` candles up to `end` (now by default), paging back in time."""
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported candle interval '{interval}'")
+
+        granularity = INTERVAL_SECONDS[interval]
+        end_ts = int((end or datetime.now(timezone.utc)).timestamp())
+        start_ts = end_ts - count * granularity
+
+        return self.get_candle_range(product_id, interval, start_ts, end_ts).tail(count)
+
+    def get_candle_range(self, product_id: str, interval: str, start_ts: int, end_ts: int) -> CandleSeries:
+        """Fetch all candles opening between the two unix timestamps."""
+        if interval in RESAMPLED_FROM:
+            seconds = INTERVAL_SECONDS[interval]
+            base = self.get_candle_range(product_id, RESAMPLED_FROM[interval], start_ts // seconds * seconds, end_ts)
+            return base.resample(seconds)
+
+        granularity = INTERVAL_SECONDS[interval]
+        page_span = MAX_CANDLES_PER_REQUEST * granularity
+
+        pages = []
+        page_end = end_ts
+        while page_end > start_ts:
+            page_start = max(start_ts, page_end - page_span)
+            response = self.http.get(
+                "coinbase",
+                COINBASE_CANDLES_URL.format(product_id=product_id),
+                params={
+                    "granularity": granularity,
+                    "start": datetime.fromtimestamp(page_start, tz=timezone.utc).isoformat(),
+                    "end": datetime.fromtimestamp(page_end, tz=timezone.utc).isoformat(),
+                },
+            )
+            response.raise_for_status()
+            pages.extend(response.json())
+            page_end = page_start
+
+        rows = np.asarray(pages, dtype=np.float64).reshape(-1, 6)
+        # neighbouring pages share their boundary candle
+        _, unique_idx = np.unique(rows[:, 0], return_index=True)
+        return CandleSeries.from_rows(rows[unique_idx])
+
+
+def to_product_id(symbol: str) -> str:
+    """Convert a TAAPI style symbol (BTC/GBP) to a coinbase product ID (BTC-GBP)."""
+    return symbol.replace("/", "-")
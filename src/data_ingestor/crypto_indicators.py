@@ -1,25 +1,127 @@
 import os
-from typing import Dict, Any
-import requests
+from typing import Dict, Any, List, Optional, Tuple
 
 
 from ingestor_logger import ingestor_logger
+from http_client import ApiClient
+from firestore_writer import BatchWriter
+from candle_fetcher import CoinbaseCandleFetcher, to_product_id
+from fear_greed_cache import with_iso_date
+from indicator_engine import IndicatorEngine
+from indicator_state import IncrementalIndicators, IndicatorStateStore
+
+INDICATOR_SOURCES = ("local", "taapi")
+
+# enough history for the 400EMA to settle, well past TAAPI's 1000 candle ceiling
+LOCAL_CANDLE_COUNT = 1200
 
 
 class CryptoIndicators:
-    def __init__(self, symbol: str = "BTC/GBP", exchange: str = "coinbase"):
-        if not os.environ.get("TAAPI_API_KEY"):
+    def __init__(
+        self,
+        symbol: str = "BTC/GBP",
+        exchange: str = "coinbase",
+        http: Optional[ApiClient] = None,
+        source: Optional[str] = None,
+        state_store: Optional[IndicatorStateStore] = None,
+        verify_state: bool = False,
+    ):
+        self.source = source or os.environ.get("INDICATOR_SOURCE", "local")
+        if self.source not in INDICATOR_SOURCES:
+            raise ValueError(f"Unknown indicator source '{self.source}', expected one of {INDICATOR_SOURCES}")
+
+        if self.source == "local" and exchange != "coinbase":
+            raise ValueError(f"Local indicators are only supported for coinbase candles, got '{exchange}'")
+
+        if self.source == "taapi" and not os.environ.get("TAAPI_API_KEY"):
             raise EnvironmentError("The TAAPI_API_KEY environment variable is not set.")
 
         self.taapi_api_key = os.environ.get("TAAPI_API_KEY")
         self.symbol = symbol
         self.exchange = exchange
+        self.http = http or ApiClient()
+        self.candle_fetcher = CoinbaseCandleFetcher(self.http)
+        self.indicator_engine = IndicatorEngine()
+        self.verify_state = verify_state
+        self.incremental_indicators = (
+            IncrementalIndicators(self.indicator_engine, self.candle_fetcher, state_store, self._local_candle_count)
+            if state_store is not None
+            else None
+        )
+
+    @property
+    def _local_candle_count(self) -> int:
+        return max(LOCAL_CANDLE_COUNT, self.indicator_engine.required_candles)
+
+    def get_indicators(
+        self, interval: str, symbol: Optional[str] = None, writer: Optional[BatchWriter] = None
+    ) -> Dict[str, Any]:
+        if self.source == "taapi":
+            return self.get_taapi_indicators(interval, symbol)
+        return self.get_local_indicators(interval, symbol, writer)
+
+    def get_local_indicators(
+        self, interval: str, symbol: Optional[str] = None, writer: Optional[BatchWriter] = None
+    ) -> Dict[str, Any]:
+        """
+        Compute the TAAPI bulk indicators (plus the 400EMA) in process from coinbase candles.
+        With a state store only the candles closed since the last run are processed, and the advanced state is
+        queued on `writer` to be committed with the document.
+        """
+        symbol = symbol or self.symbol
+        if self.incremental_indicators is not None:
+            if writer is None:
+                raise ValueError("Incremental indicators need the run's writer to save their state")
+            return self.incremental_indicators.get_document(symbol, interval, writer, verify=self.verify_state)
+
+        series = self.candle_fetcher.get_candles(to_product_id(symbol), interval, self._local_candle_count)
+        return self.indicator_engine.to_document(series)
+
+    def get_taapi_indicators(self, interval: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        return self.get_taapi_bulk_indicators([(symbol or self.symbol, interval)])[0]
+
+    def get_taapi_bulk_indicators(self, pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Fetch several (symbol, interval) constructs in a single bulk request, one document per construct.
+        Indicator IDs are prefixed with the construct's index so the flat response can be split back up.
+        """
+        constructs = [self._taapi_construct(symbol, interval, f"{i}:") for i, (symbol, interval) in enumerate(pairs)]
+
+        data = {"secret": self.taapi_api_key, "construct": constructs[0] if len(constructs) == 1 else constructs}
+        response = self.http.post(
+            "taapi",
+            "https://api.taapi.io/bulk",
+            json=data,
+            headers={"Content-Type": "application/json"},
+        )
+        if response.status_code != 200:
+            ingestor_logger.info(response.text)
+            response.raise_for_status()
+            raise ValueError(f"Unexpected TAAPI response status {response.status_code}")
 
-    def get_taapi_indicators(self, interval: str) -> Dict[str, Any]:
-        # Define the construct
+        grouped: List[List[Dict[str, Any]]] = [[] for _ in pairs]
+        for indicator in response.json()["data"]:
+            index, _, indicator_id = indicator["id"].partition(":")
+            grouped[int(index)].append({**indicator, "id": indicator_id})
+
+        return [self._taapi_document(indicators) for indicators in grouped]
+
+    def _taapi_document(self, indicators: List[Dict[str, Any]]) -> Dict[str, Any]:
+        ts = None
+        for indicator in indicators:
+            if indicator["id"] == "candle":
+                ts = indicator["result"]["timestampHuman"]
+                break
+        # if ts missing fail here
+        if ts is None:
+            raise ValueError("Failed to get timestamp from TAAPI response.")
+
+        return {"id": ts, "data": indicators}
+
+    def _taapi_construct(self, symbol: str, interval: str, id_prefix: str) -> Dict[str, Any]:
         construct = {
             "exchange": self.exchange,
-            "symbol": self.symbol,
+            "symbol": symbol,
             "interval": interval,
             "indicators": [
                 {
@@ -73,41 +175,21 @@ class CryptoIndicators:
             ],
         }
 
-        data = {"secret": self.taapi_api_key, "construct": construct}
-        response = requests.post(
-            "https://api.taapi.io/bulk",
-            json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=60,
-        )
-        if response.status_code == 200:
-            ts = None
-            for indicator in response.json()["data"]:
-                if indicator["id"] == "candle":
-                    ts = indicator["result"]["timestampHuman"]
-                    break
-            # if ts missing fail here
-            if ts is None:
-                raise ValueError("Failed to get timestamp from TAAPI response.")
-
-            return {"id": ts, "data": response.json()["data"]}
-
-        else:
-            ingestor_logger.info(response.text)
-            response.raise_for_status()
-            return {}  # TODO: why linter compains if not included?
+        for indicator in construct["indicators"]:
+            indicator["id"] = id_prefix + indicator["id"]
+        return construct
 
     def get_alternative_me_indicators(self, result_count: int = 1) -> Dict[str, Any]:
         # note: the greed index is only updated once a day
-        response = requests.get(
+        response = self.http.get(
+            "alternative_me",
             "https://api.alternative.me/fng/",
             params={"limit": result_count, "date_format": "uk"},
-            timeout=5,
         )
         resp = response.json()
 
         ts = resp["data"][0]["timestamp"]
-        return {"id": ts, "data": resp["data"][0]}
+        return {"id": ts, "data": with_iso_date(resp["data"][0])}
 
 
 if __name__ == "__main__":
@@ -116,11 +198,11 @@ if __name__ == "__main__":
     load_dotenv()
     crypto_indicators = CryptoIndicators()
 
-    hourly_taapi_indicators = crypto_indicators.get_taapi_indicators(interval="1h")
+    hourly_taapi_indicators = crypto_indicators.get_indicators(interval="1h")
     print("TAAPI Indicators:")
     print(hourly_taapi_indicators)
 
-    daily_taapi_indicators = crypto_indicators.get_taapi_indicators(interval="1d")
+    daily_taapi_indicators = crypto_indicators.get_indicators(interval="1d")
     print("TAAPI Indicators daily:")
     print(daily_taapi_indicators)
 
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+FEAR_GREED_STATE_KEY = "indicators__alternative_me"
+
+# floor on the wait, so a missing or already elapsed countdown can't pin every run to the API
+MIN_TTL_SECONDS = 300
+
+
+def with_iso_date(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The entry with its day added as `date` (YYYY-MM-DD), the format the bot's indicator IDs start with, so readers
+    can join on it as is. alternative.me's own `timestamp` is "DD-MM-YYYY" with date_format=uk.
+    """
+    day, month, year = data["timestamp"].split("-")
+    return {**data, "date": f"{year}-{month}-{day}"}
+
+
+@dataclass
+class FearGreedCacheEntry:
+    """
+    The last Fear & Greed index fetched and when alternative.me will publish the next one. The index only
+    changes once a day, so until `next_update` the stored document is still current and the call is skipped.
+    """
+
+    timestamp: str
+    next_update: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.next_update
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any], fetched_at: float) -> "FearGreedCacheEntry":
+        ttl = max(int(data.get("time_until_update") or 0), MIN_TTL_SECONDS)
+        return cls(timestamp=data["timestamp"], next_update=fetched_at + ttl)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"timestamp": self.timestamp, "next_update": self.next_update}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["FearGreedCacheEntry"]:
+        if not data:
+            return None
+        return cls(timestamp=data["timestamp"], next_update=float(data["next_update"]))
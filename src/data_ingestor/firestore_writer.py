@@ -0,0 +1,62 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+from ingestor_logger import ingestor_logger
+
+# firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+
+@dataclass
+class WriteStats:
+    written: int = 0
+    skipped: int = 0
+
+
+class BatchWriter:
+    """
+    Collects the documents of an ingestion run and writes them with batched commits.
+    Documents whose IDs already exist are skipped (found with a single multi-get), unless added with overwrite.
+    """
+
+    def __init__(self, db, max_batch_size: int = MAX_BATCH_SIZE):
+        if not 0 < max_batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"Batch size must be between 1 and {MAX_BATCH_SIZE}, got {max_batch_size}")
+
+        self.db = db
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[Tuple[str, str], Tuple[Dict[str, Any], bool]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any], overwrite: bool = False) -> None:
+        with self._lock:
+            self._pending[(collection, doc_id)] = (data, overwrite)
+
+    def flush(self) -> WriteStats:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return WriteStats()
+
+        refs = {key: self.db.collection(key[0]).document(key[1]) for key in pending}
+        existing = self._existing_paths([ref for key, ref in refs.items() if not pending[key][1]])
+
+        to_write = [(ref, pending[key][0]) for key, ref in refs.items() if ref.path not in existing]
+        for i in range(0, len(to_write), self.max_batch_size):
+            batch = self.db.batch()
+            for ref, data in to_write[i : i + self.max_batch_size]:
+                batch.set(ref, data)
+            batch.commit()
+
+        stats = WriteStats(written=len(to_write), skipped=len(pending) - len(to_write))
+        ingestor_logger.info("Wrote %s documents, skipped %s already stored", stats.written, stats.skipped)
+        return stats
+
+    def _existing_paths(self, refs: List) -> Set[str]:
+        if not refs:
+            return set()
+
+        # an empty field mask only returns document existence, not contents
+        return {snapshot.reference.path for snapshot in self.db.get_all(refs, field_paths=[]) if snapshot.exists}
@@ -0,0 +1,249 @@
+import bisect
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ingestor_logger import ingestor_logger
+
+DEFAULT_POOL_SIZE = 10
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create a session whose connection pool is shared by every fetcher in a run."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0 or capacity < 1:
+            raise ValueError(f"Token bucket needs a positive rate and a capacity of at least 1, got {rate}/{capacity}")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until one is available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+
+            self.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast until `reset_timeout` has passed.
+    Then a single trial request is let through, which closes the circuit again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self, name: str) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self.clock() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError(f"Circuit for {name} is open after {self._failures} consecutive failures")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def summary(self) -> str:
+        labels = [f"<={bound}s" for bound in self.buckets] + [f">{self.buckets[-1]}s"]
+        populated = ", ".join(f"{label}: {count}" for label, count in zip(labels, self.counts) if count)
+        mean = self.total / self.count if self.count else 0.0
+        return f"{self.count} requests, mean {mean:.3f}s ({populated})"
+
+
+@dataclass
+class ProviderPolicy:
+    rate_per_second: float
+    burst: int
+    timeout: float
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    failure_threshold: int = 5
+    reset_timeout: float = 60.0
+
+
+def default_policies() -> Dict[str, ProviderPolicy]:
+    # bulk requests need a paid TAAPI plan, the basic one allows 5 requests per 15 seconds
+    taapi_per_15s = float(os.environ.get("TAAPI_REQUESTS_PER_15S", "5"))
+    return {
+        "taapi": ProviderPolicy(rate_per_second=taapi_per_15s / 15, burst=max(1, int(taapi_per_15s)), timeout=60),
+        "coinbase": ProviderPolicy(rate_per_second=10, burst=10, timeout=10),
+        "alternative_me": ProviderPolicy(rate_per_second=1, burst=2, timeout=5),
+        "google_alerts": ProviderPolicy(rate_per_second=1, burst=2, timeout=10),
+    }
+
+
+class ApiClient:
+    """
+    Shared HTTP client for the ingestor's external data providers. Each provider gets its own token bucket,
+    retry policy (jittered exponential backoff on 429, 5xx and connection errors), circuit breaker and latency
+    histogram, while all of them share one pooled session.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        policies: Optional[Dict[str, ProviderPolicy]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.session = session or build_session()
+        self.policies = policies or default_policies()
+        self.sleep = sleep
+        self.buckets = {
+            name: TokenBucket(policy.rate_per_second, policy.burst, clock=clock, sleep=sleep)
+            for name, policy in self.policies.items()
+        }
+        self.breakers = {
+            name: CircuitBreaker(policy.failure_threshold, policy.reset_timeout, clock=clock)
+            for name, policy in self.policies.items()
+        }
+        self.latencies = {name: LatencyHistogram() for name in self.policies}
+
+    def get(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.request(provider, "GET", url, **kwargs)
+
+    def post(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.request(provider, "POST", url, **kwargs)
+
+    def request(self, provider: str, method: str, url: str, **kwargs) -> requests.Response:
+        if provider not in self.policies:
+            raise ValueError(f"Unknown provider '{provider}', expected one of {sorted(self.policies)}")
+
+        policy = self.policies[provider]
+        breaker = self.breakers[provider]
+        breaker.allow(provider)
+        kwargs.setdefault("timeout", policy.timeout)
+
+        attempt = 0
+        while True:
+            self.buckets[provider].acquire()
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.latencies[provider].observe(time.perf_counter() - start)
+                if attempt == policy.max_retries:
+                    breaker.record_failure()
+                    raise
+                response = None
+            except requests.RequestException:
+                # not worth retrying, but still a failure, which also ends a half-open trial so the breaker can close
+                self.latencies[provider].observe(time.perf_counter() - start)
+                breaker.record_failure()
+                raise
+            else:
+                self.latencies[provider].observe(time.perf_counter() - start)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    breaker.record_success()
+                    return response
+                if attempt == policy.max_retries:
+                    breaker.record_failure()
+                    return response
+
+            self._backoff(provider, policy, attempt, response)
+            attempt += 1
+
+    def _backoff(
+        self, provider: str, policy: ProviderPolicy, attempt: int, response: Optional[requests.Response]
+    ) -> None:
+        delay = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2**attempt))
+
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, min(policy.backoff_max, float(retry_after)))
+
+        status = response.status_code if response is not None else "connection error"
+        ingestor_logger.info("%s request failed (%s), retrying in %.2fs", provider, status, delay)
+        self.sleep(delay)
+
+    def log_latencies(self, reset: bool = False) -> None:
+        for provider, histogram in self.latencies.items():
+            if histogram.count:
+                ingestor_logger.info("%s latency: %s", provider, histogram.summary())
+        if reset:
+            self.latencies = {name: LatencyHistogram() for name in self.policies}
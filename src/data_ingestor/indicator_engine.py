@@ -0,0 +1,190 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from candle_fetcher import CandleSeries
+
+RSI_PERIOD = 14
+MACD_FAST_PERIOD = 12
+MACD_SLOW_PERIOD = 26
+MACD_SIGNAL_PERIOD = 9
+
+NOT_ENOUGH_CANDLES_ERROR = "Not enough candles to calculate this indicator."
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    id: str
+    indicator: str
+    period: Optional[int] = None
+
+
+DEFAULT_INDICATORS = [
+    IndicatorSpec("50EMA", "ema", 50),
+    IndicatorSpec("200EMA", "ema", 200),
+    IndicatorSpec("400EMA", "ema", 400),
+    IndicatorSpec("RSI", "rsi", RSI_PERIOD),
+    IndicatorSpec("MACD", "macd"),
+]
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average, seeded with the simple average of the first `period` values. NaN until then."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+
+    seed = values[:period].mean()
+    out[period - 1] = seed
+    out[period:] = _smooth(values[period:], 2 / (period + 1), seed)
+    return out
+
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Relative strength index using Wilder's smoothing. NaN for the first `period` candles."""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+
+    deltas = np.diff(close)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+
+    avg_gain = np.empty(len(deltas) - period + 1)
+    avg_loss = np.empty(len(deltas) - period + 1)
+    avg_gain[0] = gains[:period].mean()
+    avg_loss[0] = losses[:period].mean()
+    avg_gain[1:] = _smooth(gains[period:], 1 / period, avg_gain[0])
+    avg_loss[1:] = _smooth(losses[period:], 1 / period, avg_loss[0])
+
+    out[period:] = rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+
+def macd(
+    close: np.ndarray,
+    fast_period: int = MACD_FAST_PERIOD,
+    slow_period: int = MACD_SLOW_PERIOD,
+    signal_period: int = MACD_SIGNAL_PERIOD,
+) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram, keyed like the TAAPI result."""
+    macd_line = ema(close, fast_period) - ema(close, slow_period)
+
+    signal = np.full(len(macd_line), np.nan)
+    first_valid = slow_period - 1
+    if len(macd_line) > first_valid:
+        signal[first_valid:] = ema(macd_line[first_valid:], signal_period)
+
+    return {"valueMACD": macd_line, "valueMACDSignal": signal, "valueMACDHist": macd_line - signal}
+
+
+def _smooth(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    Vectorised y[t] = (1 - alpha) * y[t-1] + alpha * x[t], starting from y[-1] = initial.
+    Solved in closed form per block, with blocks short enough that the decay powers never underflow.
+    """
+    out = np.empty(len(values))
+    decay = 1 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+
+    block_size = int(min(512, max(1, -100 / math.log10(decay))))
+    prev = initial
+    for start in range(0, len(values), block_size):
+        block = values[start : start + block_size]
+        powers = decay ** np.arange(len(block))
+        out[start : start + len(block)] = powers * (decay * prev + alpha * np.cumsum(block / powers))
+        prev = out[start + len(block) - 1]
+
+    return out
+
+
+class IndicatorEngine:
+    """Computes technical indicators locally from a candle series, in the document layout TAAPI bulk returns."""
+
+    def __init__(self, indicators: Optional[List[IndicatorSpec]] = None):
+        self.indicators = indicators if indicators is not None else DEFAULT_INDICATORS
+
+    @property
+    def required_candles(self) -> int:
+        """Candles needed before every indicator has a value."""
+        periods = [MACD_SLOW_PERIOD + MACD_SIGNAL_PERIOD - 1]
+        for spec in self.indicators:
+            if spec.indicator == "ema":
+                periods.append(spec.period)
+            elif spec.indicator == "rsi":
+                periods.append(spec.period + 1)
+        return max(periods)
+
+    def compute(self, series: CandleSeries) -> Dict[str, Dict[str, np.ndarray]]:
+        """Full history of every indicator, keyed by indicator ID and then result field."""
+        results = {}
+        for spec in self.indicators:
+            if spec.indicator == "ema":
+                results[spec.id] = {"value": ema(series.close, spec.period)}
+            elif spec.indicator == "rsi":
+                results[spec.id] = {"value": rsi(series.close, spec.period)}
+            elif spec.indicator == "macd":
+                results[spec.id] = macd(series.close)
+            else:
+                raise ValueError(f"Unsupported indicator '{spec.indicator}'")
+        return results
+
+    def to_document(self, series: CandleSeries, index: int = -1) -> Dict[str, Any]:
+        """Document for the candle at `index`, shaped like `CryptoIndicators.get_taapi_indicators` output."""
+        if len(series) == 0:
+            raise ValueError("Cannot compute indicators from an empty candle series.")
+
+        return self.build_document(series, index, values_at(self.compute(series), index))
+
+    def build_document(self, series: CandleSeries, index: int, values: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        """Document for the candle at `index` from per-indicator scalar values, NaN where not yet available."""
+        ts_human = series.timestamp_human(index)
+        data = [
+            _entry(
+                "candle",
+                "candle",
+                {
+                    "timestampHuman": ts_human,
+                    "timestamp": int(series.timestamps[index]),
+                    "open": float(series.open[index]),
+                    "high": float(series.high[index]),
+                    "low": float(series.low[index]),
+                    "close": float(series.close[index]),
+                    "volume": float(series.volume[index]),
+                },
+            ),
+            # consumers rely on price being the second entry
+            _entry("price", "price", {"value": [float(series.close[index])]}),
+        ]
+
+        for spec in self.indicators:
+            fields = values[spec.id]
+            data.append(_entry(spec.id, spec.indicator, {field: [_to_value(v)] for field, v in fields.items()}))
+            if any(math.isnan(v) for v in fields.values()):
+                data[-1]["errors"].append(NOT_ENOUGH_CANDLES_ERROR)
+
+        return {"id": ts_human, "data": data}
+
+
+def values_at(results: Dict[str, Dict[str, np.ndarray]], index: int) -> Dict[str, Dict[str, float]]:
+    """Scalar values of every indicator at one candle, from the full histories `IndicatorEngine.compute` returns."""
+    return {ind_id: {field: history[index] for field, history in fields.items()} for ind_id, fields in results.items()}
+
+
+def _entry(indicator_id: str, indicator: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": indicator_id, "indicator": indicator, "result": result, "errors": []}
+
+
+def _to_value(value: float) -> Optional[float]:
+    return None if math.isnan(value) else float(value)
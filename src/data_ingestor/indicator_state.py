@@ -0,0 +1,263 @@
+import copy
+import math
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from candle_fetcher import INTERVAL_SECONDS, CandleSeries, CoinbaseCandleFetcher, to_product_id
+from firestore_writer import BatchWriter
+from indicator_engine import (
+    MACD_FAST_PERIOD,
+    MACD_SIGNAL_PERIOD,
+    MACD_SLOW_PERIOD,
+    IndicatorEngine,
+    IndicatorSpec,
+)
+from ingestor_logger import ingestor_logger
+
+NAN = float("nan")
+
+# relative tolerance when checking the incremental values against a full recompute
+VERIFY_REL_TOL = 1e-8
+
+
+@dataclass
+class EmaState:
+    period: int
+    value: Optional[float] = None
+    seed_sum: float = 0.0
+    seed_count: int = 0
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.seed_sum += x
+            self.seed_count += 1
+            if self.seed_count == self.period:
+                self.value = self.seed_sum / self.period
+            return NAN if self.value is None else self.value
+
+        alpha = 2 / (self.period + 1)
+        self.value = (1 - alpha) * self.value + alpha * x
+        return self.value
+
+
+@dataclass
+class RsiState:
+    period: int
+    prev_close: Optional[float] = None
+    avg_gain: Optional[float] = None
+    avg_loss: Optional[float] = None
+    seed_gain_sum: float = 0.0
+    seed_loss_sum: float = 0.0
+    seed_count: int = 0
+
+    def update(self, close: float) -> float:
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return NAN
+
+        delta = close - prev_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+
+        if self.avg_gain is None:
+            self.seed_gain_sum += gain
+            self.seed_loss_sum += loss
+            self.seed_count += 1
+            if self.seed_count < self.period:
+                return NAN
+            self.avg_gain = self.seed_gain_sum / self.period
+            self.avg_loss = self.seed_loss_sum / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+
+@dataclass
+class MacdState:
+    fast: EmaState = field(default_factory=lambda: EmaState(MACD_FAST_PERIOD))
+    slow: EmaState = field(default_factory=lambda: EmaState(MACD_SLOW_PERIOD))
+    signal: EmaState = field(default_factory=lambda: EmaState(MACD_SIGNAL_PERIOD))
+
+    def update(self, close: float) -> Dict[str, float]:
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        macd_line = fast - slow
+        signal = NAN if math.isnan(macd_line) else self.signal.update(macd_line)
+        return {"valueMACD": macd_line, "valueMACDSignal": signal, "valueMACDHist": macd_line - signal}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MacdState":
+        return cls(**{key: EmaState(**value) for key, value in data.items()})
+
+
+STATE_TYPES = {"ema": EmaState, "rsi": RsiState, "macd": MacdState}
+
+
+@dataclass
+class IndicatorState:
+    """Rolling indicator accumulators for one symbol and interval, updated in constant time per closed candle."""
+
+    symbol: str
+    interval: str
+    indicators: Dict[str, Any]
+    first_timestamp: Optional[int] = None
+    last_timestamp: Optional[int] = None
+
+    @classmethod
+    def empty(cls, symbol: str, interval: str, specs: List[IndicatorSpec]) -> "IndicatorState":
+        indicators = {}
+        for spec in specs:
+            if spec.indicator not in STATE_TYPES:
+                raise ValueError(f"Unsupported indicator '{spec.indicator}'")
+            indicators[spec.id] = MacdState() if spec.indicator == "macd" else STATE_TYPES[spec.indicator](spec.period)
+        return cls(symbol, interval, indicators)
+
+    def update(self, timestamp: int, close: float) -> Dict[str, Dict[str, float]]:
+        """Fold a closed candle into the state and return every indicator's value for it."""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            raise ValueError(f"Candle {timestamp} is not newer than the last folded candle {self.last_timestamp}")
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+        values = {}
+        for ind_id, state in self.indicators.items():
+            value = state.update(close)
+            values[ind_id] = value if isinstance(value, dict) else {"value": value}
+        return values
+
+    def peek(self, timestamp: int, close: float) -> Dict[str, Dict[str, float]]:
+        """Values for a still forming candle, leaving the state untouched."""
+        return copy.deepcopy(self).update(timestamp, close)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["indicators"] = {
+            ind_id: {"type": _state_type(state), **asdict(state)} for ind_id, state in self.indicators.items()
+        }
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        indicators = {}
+        for ind_id, raw in data["indicators"].items():
+            raw = dict(raw)
+            state_cls = STATE_TYPES[raw.pop("type")]
+            indicators[ind_id] = state_cls.from_dict(raw) if state_cls is MacdState else state_cls(**raw)
+        return cls(data["symbol"], data["interval"], indicators, data["first_timestamp"], data["last_timestamp"])
+
+    def matches(self, specs: List[IndicatorSpec]) -> bool:
+        """Whether the state tracks exactly these indicators, with the same periods."""
+        return {spec.id: (spec.indicator, spec.period) for spec in specs} == {
+            ind_id: (_state_type(state), getattr(state, "period", None)) for ind_id, state in self.indicators.items()
+        }
+
+
+def _state_type(state: Any) -> str:
+    return next(name for name, state_cls in STATE_TYPES.items() if isinstance(state, state_cls))
+
+
+class IndicatorStateStore:
+    """
+    Persists indicator state next to the indicator documents, in `indicators__taapi__{interval}__state`.
+    State is saved through the run's BatchWriter, so it only moves past a candle once that candle's document is written.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def load(self, symbol: str, interval: str) -> Optional[IndicatorState]:
+        snapshot = self.db.collection(_state_collection(interval)).document(to_product_id(symbol)).get()
+        return IndicatorState.from_dict(snapshot.to_dict()) if snapshot.exists else None
+
+    def save(self, state: IndicatorState, writer: BatchWriter) -> None:
+        writer.add(_state_collection(state.interval), to_product_id(state.symbol), state.to_dict(), overwrite=True)
+
+
+def _state_collection(interval: str) -> str:
+    return f"indicators__taapi__{interval}__state"
+
+
+class IncrementalIndicators:
+    """
+    Produces the latest indicator document by folding only the candles closed since the previous run into the
+    persisted state. The first run, or a change in the indicator set, bootstraps the state from candle history.
+    """
+
+    def __init__(
+        self,
+        engine: IndicatorEngine,
+        candle_fetcher: CoinbaseCandleFetcher,
+        store: IndicatorStateStore,
+        bootstrap_candles: int,
+    ):
+        self.engine = engine
+        self.candle_fetcher = candle_fetcher
+        self.store = store
+        self.bootstrap_candles = bootstrap_candles
+
+    def get_document(
+        self, symbol: str, interval: str, writer: BatchWriter, verify: bool = False, now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        now = now or datetime.now(timezone.utc)
+        product_id = to_product_id(symbol)
+
+        state = self.store.load(symbol, interval)
+        if state is None or not state.matches(self.engine.indicators):
+            ingestor_logger.info("Bootstrapping indicator state for %s (%s)", symbol, interval)
+            state = IndicatorState.empty(symbol, interval, self.engine.indicators)
+            series = self.candle_fetcher.get_candles(product_id, interval, self.bootstrap_candles, end=now)
+        else:
+            start_ts = state.last_timestamp + INTERVAL_SECONDS[interval]
+            series = self.candle_fetcher.get_candle_range(product_id, interval, start_ts, int(now.timestamp()))
+
+        if len(series) == 0:
+            raise ValueError(f"No new candles for {symbol} ({interval}) since {state.last_timestamp}")
+
+        values = self._advance(state, series, interval, now)
+        self.store.save(state, writer)
+
+        if verify:
+            self.verify(state, values, series.timestamps[-1], now)
+
+        return self.engine.build_document(series, -1, values)
+
+    def _advance(
+        self, state: IndicatorState, series: CandleSeries, interval: str, now: datetime
+    ) -> Dict[str, Dict[str, float]]:
+        is_closed = series.timestamps + INTERVAL_SECONDS[interval] <= now.timestamp()
+
+        values = {}
+        for i, (timestamp, close) in enumerate(zip(series.timestamps, series.close)):
+            if is_closed[i]:
+                values = state.update(int(timestamp), float(close))
+            else:
+                values = state.peek(int(timestamp), float(close))
+        return values
+
+    def verify(self, state: IndicatorState, values: Dict[str, Dict[str, float]], timestamp: int, now: datetime) -> None:
+        """Recompute from the first folded candle and raise if the incremental values have drifted."""
+        series = self.candle_fetcher.get_candle_range(
+            to_product_id(state.symbol), state.interval, state.first_timestamp, int(now.timestamp())
+        )
+        index = int(np.searchsorted(series.timestamps, timestamp))
+        expected = self.engine.compute(series)
+
+        for ind_id, fields in values.items():
+            for field_name, value in fields.items():
+                recomputed = float(expected[ind_id][field_name][index])
+                if math.isnan(value) and math.isnan(recomputed):
+                    continue
+                if not math.isclose(value, recomputed, rel_tol=VERIFY_REL_TOL, abs_tol=1e-9):
+                    raise AssertionError(
+                        f"Incremental {ind_id}.{field_name} for {state.symbol} ({state.interval}) is {value}, "
+                        f"full recompute gives {recomputed}"
+                    )
+
+        ingestor_logger.info("Incremental indicators for %s (%s) match a full recompute", state.symbol, state.interval)
@@ -0,0 +1,123 @@
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from candle_fetcher import INTERVAL_SECONDS
+from crypto_indicators import CryptoIndicators
+from firestore_writer import BatchWriter
+from ingestor_logger import ingestor_logger
+
+DEFAULT_SYMBOL = "BTC/GBP"
+DEFAULT_INTERVALS = "1h,1d"
+
+# candles longer than the hourly run cadence are still forming between runs, so their documents are refreshed
+OVERWRITE_INTERVALS = {"4h", "1d"}
+
+
+@dataclass(frozen=True)
+class IngestionJob:
+    symbol: str
+    interval: str
+
+    @property
+    def collection(self) -> str:
+        return indicator_collection(self.symbol, self.interval)
+
+    @property
+    def name(self) -> str:
+        return f"indicators_{_slug(self.symbol)}_{self.interval}"
+
+
+def indicator_collection(symbol: str, interval: str) -> str:
+    """
+    Collection holding one symbol's indicators for an interval. The default pair keeps the original collection
+    names the bot reads, every other pair gets its own collection with the same document layout.
+    """
+    base = f"indicators__taapi__{interval}"
+    return base if symbol == DEFAULT_SYMBOL else f"{base}__{_slug(symbol)}"
+
+
+def _slug(symbol: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", symbol.lower())
+
+
+def jobs_from_env() -> List[IngestionJob]:
+    """Jobs for every configured pair and interval, e.g. INGEST_SYMBOLS=BTC/GBP,ETH/GBP INGEST_INTERVALS=1h,4h."""
+    symbols = _split(os.environ.get("INGEST_SYMBOLS", DEFAULT_SYMBOL))
+    intervals = _split(os.environ.get("INGEST_INTERVALS", DEFAULT_INTERVALS))
+
+    unknown = [interval for interval in intervals if interval not in INTERVAL_SECONDS]
+    if unknown:
+        raise ValueError(f"Unsupported intervals {unknown}, expected some of {sorted(INTERVAL_SECONDS)}")
+
+    return [IngestionJob(symbol, interval) for symbol in symbols for interval in intervals]
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def pack_constructs(jobs: List[IngestionJob], max_constructs: int) -> List[List[IngestionJob]]:
+    """
+    Group jobs into as few TAAPI bulk requests as the plan's construct limit allows. Jobs for the same interval
+    are kept together, so a request's candles close at the same time.
+    """
+    if max_constructs < 1:
+        raise ValueError(f"A bulk request needs room for at least one construct, got {max_constructs}")
+
+    ordered = sorted(jobs, key=lambda job: (INTERVAL_SECONDS[job.interval], job.symbol))
+    return [ordered[i : i + max_constructs] for i in range(0, len(ordered), max_constructs)]
+
+
+class IngestionScheduler:
+    """
+    Turns the configured pairs and intervals into independent ingestion stages. With TAAPI as the source the jobs
+    are packed into bulk requests, the shared ApiClient's token bucket spreads those over the plan's rate budget.
+    """
+
+    def __init__(
+        self,
+        crypto_indicators: CryptoIndicators,
+        writer: BatchWriter,
+        jobs: List[IngestionJob],
+        extraction_timestamp: datetime,
+        max_constructs: Optional[int] = None,
+    ):
+        self.crypto_indicators = crypto_indicators
+        self.writer = writer
+        self.jobs = jobs
+        self.extraction_timestamp = extraction_timestamp
+        # the free TAAPI plan allows a single construct per bulk request
+        self.max_constructs = max_constructs or int(os.environ.get("TAAPI_MAX_CONSTRUCTS", "1"))
+
+    def stages(self) -> Dict[str, Callable[[], None]]:
+        if self.crypto_indicators.source != "taapi":
+            return {job.name: self._local_stage(job) for job in self.jobs}
+
+        packed = pack_constructs(self.jobs, self.max_constructs)
+        ingestor_logger.info("Packed %s indicator jobs into %s TAAPI bulk requests", len(self.jobs), len(packed))
+        return {f"taapi_bulk_{i}": self._bulk_stage(group) for i, group in enumerate(packed)}
+
+    def _local_stage(self, job: IngestionJob) -> Callable[[], None]:
+        def stage():
+            self._store(job, self.crypto_indicators.get_local_indicators(job.interval, job.symbol, self.writer))
+
+        return stage
+
+    def _bulk_stage(self, group: List[IngestionJob]) -> Callable[[], None]:
+        def stage():
+            documents = self.crypto_indicators.get_taapi_bulk_indicators([(job.symbol, job.interval) for job in group])
+            for job, document in zip(group, documents):
+                self._store(job, document)
+
+        return stage
+
+    def _store(self, job: IngestionJob, document: Dict[str, Any]) -> None:
+        self.writer.add(
+            job.collection,
+            document["id"],
+            {"extraction_timestamp": self.extraction_timestamp, "data": document["data"]},
+            overwrite=job.interval in OVERWRITE_INTERVALS,
+        )
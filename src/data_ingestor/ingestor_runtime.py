@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, TypeVar
+
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+from crypto_indicators import CryptoIndicators
+from http_client import ApiClient
+from indicator_state import IndicatorStateStore
+from ingestor_logger import ingestor_logger
+
+SECRETS_PATH = "/mnt2/secrets.env"
+
+T = TypeVar("T")
+
+
+@dataclass
+class Invocation:
+    number: int
+    timestamp: datetime
+
+    @property
+    def cold(self) -> bool:
+        return self.number == 1
+
+
+class Runtime:
+    """
+    Process wide clients for the cloud function. Each is created on first use and kept for later invocations
+    served by the same warm instance, while anything tied to a single run (timestamps, write batches, feed state)
+    is created per invocation.
+    """
+
+    def __init__(self):
+        self.process_start = time.perf_counter()
+        self.invocations = 0
+        self.init_duration = 0.0
+        self._clients: Dict[str, object] = {}
+        self._secrets_loaded = False
+        self._lock = threading.RLock()
+
+    def load_secrets(self) -> None:
+        with self._lock:
+            if self._secrets_loaded:
+                return
+            with open(SECRETS_PATH, "r", encoding="utf-8") as src_file:
+                with open(".env", "w", encoding="utf-8") as dest_file:
+                    dest_file.write(src_file.read())
+
+            load_dotenv()
+            self._secrets_loaded = True
+
+    @property
+    def db(self) -> firestore.Client:
+        return self._get("db", lambda: firestore.Client(database="crypto-bot"))
+
+    @property
+    def http(self) -> ApiClient:
+        return self._get("http", ApiClient)
+
+    @property
+    def crypto_indicators(self) -> CryptoIndicators:
+        return self._get(
+            "crypto_indicators",
+            lambda: CryptoIndicators(
+                http=self.http,
+                state_store=IndicatorStateStore(self.db),
+                verify_state=os.environ.get("INDICATOR_VERIFY", "false") == "true",
+            ),
+        )
+
+    def provide(self, name: str, client: object) -> None:
+        """Use `client` instead of creating one, e.g. an in-memory database for offline runs and load tests."""
+        with self._lock:
+            self._clients[name] = client
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        with self._lock:
+            if name not in self._clients:
+                start = time.perf_counter()
+                self._clients[name] = factory()
+                duration = time.perf_counter() - start
+                self.init_duration += duration
+                ingestor_logger.info("Initialised %s in %.2fs", name, duration)
+            return self._clients[name]
+
+    @contextmanager
+    def invocation(self) -> Iterator[Invocation]:
+        """Scope one request, giving it its own timestamp and logging whether it paid for client creation."""
+        with self._lock:
+            self.invocations += 1
+            invocation = Invocation(self.invocations, datetime.now())
+
+        start = time.perf_counter()
+        init_before = self.init_duration
+        try:
+            yield invocation
+        finally:
+            ingestor_logger.info(
+                "%s start invocation %s finished in %.2fs (%.2fs creating clients, process up %.0fs)",
+                "Cold" if invocation.cold else "Warm",
+                invocation.number,
+                time.perf_counter() - start,
+                self.init_duration - init_before,
+                time.perf_counter() - self.process_start,
+            )
+
+
+runtime = Runtime()
@@ -0,0 +1,17 @@
+from typing import Any, Dict, Optional
+
+STATE_COLLECTION = "ingestor__state"
+
+
+class IngestorStateStore:
+    """
+    Small documents the ingestor carries from one run to the next, keyed by source name.
+    They are saved through the run's BatchWriter so they commit together with the data they describe.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        snapshot = self.db.collection(STATE_COLLECTION).document(key).get()
+        return snapshot.to_dict() if snapshot.exists else None
@@ -1,73 +1,105 @@
+import os
+import time
 from datetime import datetime
+from typing import List, Optional
 
-from crypto_indicators import CryptoIndicators
-from news_extractor import NewsExtractor
+from news_extractor import FeedState, NewsExtractor
 from ingestor_logger import ingestor_logger
+from stage_runner import StageResult, run_stages
+from firestore_writer import BatchWriter
+from ingestor_state import STATE_COLLECTION, IngestorStateStore
+from fear_greed_cache import FEAR_GREED_STATE_KEY, FearGreedCacheEntry
+from ingestion_scheduler import IngestionScheduler, jobs_from_env
+from ingestor_runtime import runtime
 
-from google.cloud import firestore
 from dotenv import load_dotenv
 import functions_framework
 from flask import Request
 
-EXTRACTION_TIMESTAMP = datetime.now()
-TS_FIELD = {"extraction_timestamp": EXTRACTION_TIMESTAMP}
+NEWS_STATE_KEY = "news__google_feed"
 
 
 @functions_framework.http
 def function_entry_point(_: Request):
-    _load_secrets()
-    main()
+    runtime.load_secrets()
+    with runtime.invocation() as invocation:
+        main(extraction_timestamp=invocation.timestamp)
     return "Data ingestion completed.", 200
 
 
-def main():
-    ingestor_logger.info("Starting data ingestion...")
-
-    ingestor_logger.info("Initialising firestore connection...")
-    db = firestore.Client(database="crypto-bot")
-
-    ingestor_logger.info("Initialising fetchers...")
-    crypto_indicators = CryptoIndicators()
-    news_extractor = NewsExtractor(limit=10)
-
-    _fetch_and_store_taapi_data(db, crypto_indicators, interval="1h")
-    _fetch_and_store_taapi_data(db, crypto_indicators, interval="1d")
-    _fetch_and_store_alternative_me_data(db, crypto_indicators)
-    _fetch_and_store_news(db, news_extractor)
+def main(concurrent: Optional[bool] = None, extraction_timestamp: Optional[datetime] = None):
+    extraction_timestamp = extraction_timestamp or datetime.now()
+    if concurrent is None:
+        concurrent = os.environ.get("INGESTION_MODE", "concurrent") != "sequential"
+
+    ingestor_logger.info("Starting data ingestion (%s)...", "concurrent" if concurrent else "sequential")
+    start = time.perf_counter()
+
+    # clients are reused across warm invocations, run state is rebuilt every time
+    db, http, crypto_indicators = runtime.db, runtime.http, runtime.crypto_indicators
+    writer = BatchWriter(db)
+    state_store = IngestorStateStore(db)
+    news_state = state_store.load(NEWS_STATE_KEY)
+    fear_greed_cache = FearGreedCacheEntry.from_dict(state_store.load(FEAR_GREED_STATE_KEY))
+    news_extractor = NewsExtractor(limit=10, http=http, state=FeedState.from_dict(news_state) if news_state else None)
+
+    scheduler = IngestionScheduler(crypto_indicators, writer, jobs_from_env(), extraction_timestamp)
+
+    stages = {
+        **scheduler.stages(),
+        "alternative_me": lambda: _fetch_and_store_alternative_me_data(
+            writer, crypto_indicators, fear_greed_cache, extraction_timestamp
+        ),
+        "news": lambda: _fetch_and_store_news(writer, news_extractor, extraction_timestamp),
+    }
+    results = run_stages(stages, concurrent=concurrent)
+    results += run_stages({"firestore_write": writer.flush}, concurrent=False)
+    _log_stage_timings(results, time.perf_counter() - start)
+    http.log_latencies(reset=True)
+
+    failed = [result.name for result in results if not result.ok]
+    if failed:
+        raise RuntimeError(f"Data ingestion failed for stages: {', '.join(failed)}")
 
     ingestor_logger.info("Data ingestion completed.")
 
 
-def _load_secrets():
-    with open("/mnt2/secrets.env", "r", encoding="utf-8") as src_file:
-        with open(".env", "w", encoding="utf-8") as dest_file:
-            dest_file.write(src_file.read())
+def _log_stage_timings(results: List[StageResult], total_duration: float):
+    for result in results:
+        ingestor_logger.info("Stage %s %s in %.2fs", result.name, "done" if result.ok else "FAILED", result.duration)
+    ingestor_logger.info("All stages finished in %.2fs", total_duration)
 
-    load_dotenv()
-
-
-def _fetch_and_store_taapi_data(db, crypto_indicators, interval):
-    ingestor_logger.info("Fetching and storing TAAPI (%s)...", interval)
-    taapi_indicators = crypto_indicators.get_taapi_indicators(interval=interval)
-    doc_ref = db.collection(f"indicators__taapi__{interval}").document(taapi_indicators["id"])
-    doc_ref.set(dict(**TS_FIELD, data=taapi_indicators["data"]))
-    ingestor_logger.info("Done")
 
+def _fetch_and_store_alternative_me_data(writer, crypto_indicators, fear_greed_cache, extraction_timestamp):
+    now = extraction_timestamp.timestamp()
+    if fear_greed_cache is not None and fear_greed_cache.is_fresh(now):
+        ingestor_logger.info(
+            "Fear & Greed index %s is current, next update in %.0fs",
+            fear_greed_cache.timestamp,
+            fear_greed_cache.next_update - now,
+        )
+        return
 
-def _fetch_and_store_alternative_me_data(db, crypto_indicators):
-    ingestor_logger.info("Fetching and storing Alternative.me...")
+    ingestor_logger.info("Fetching Alternative.me...")
     alternative_me_indicators = crypto_indicators.get_alternative_me_indicators()
-    doc_ref = db.collection("indicators__alternative_me").document(alternative_me_indicators["id"])
-    doc_ref.set(dict(**TS_FIELD, data=alternative_me_indicators["data"]))
+    writer.add(
+        "indicators__alternative_me",
+        alternative_me_indicators["id"],
+        dict(extraction_timestamp=extraction_timestamp, data=alternative_me_indicators["data"]),
+    )
+    fear_greed_cache = FearGreedCacheEntry.from_response(alternative_me_indicators["data"], now)
+    writer.add(STATE_COLLECTION, FEAR_GREED_STATE_KEY, fear_greed_cache.to_dict(), overwrite=True)
     ingestor_logger.info("Done")
 
 
-def _fetch_and_store_news(db, news_extractor):
-    ingestor_logger.info("Fetching and storing news...")
+def _fetch_and_store_news(writer, news_extractor, extraction_timestamp):
+    ingestor_logger.info("Fetching news...")
     latest_news = news_extractor.get_news()
     for news_item in latest_news:
-        doc_ref = db.collection("news__google_feed").document(news_item["published"])
-        doc_ref.set(dict(**TS_FIELD, data=news_item))
+        writer.add(
+            "news__google_feed", news_item["published"], dict(extraction_timestamp=extraction_timestamp, data=news_item)
+        )
+    writer.add(STATE_COLLECTION, NEWS_STATE_KEY, news_extractor.state.to_dict(), overwrite=True)
 
     ingestor_logger.info("Done")
 
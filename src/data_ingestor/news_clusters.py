@@ -0,0 +1,170 @@
+"""
+Groups syndicated copies of the same story in the news feed, so the bot's prompt can carry each story once.
+
+Each item's title and summary are reduced to a MinHash signature over 4 character shingles. Signatures are split into
+bands and bucketed (locality sensitive hashing), so an item is only compared with earlier items that share a band
+rather than with all of them. An item joins the cluster of its most similar candidate when their estimated Jaccard
+similarity reaches SIMILARITY_THRESHOLD, otherwise it starts a cluster of its own. Benchmark on a synthetic feed with:
+
+    python news_clusters.py --items 20000
+"""
+
+import argparse
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BANDS = 20
+ROWS_PER_BAND = 3
+NUM_PERMUTATIONS = BANDS * ROWS_PER_BAND
+# copies differ by a source suffix or a reworded snippet, distinct stories on the same topic score well below this
+SIMILARITY_THRESHOLD = 0.5
+# items remembered for matching later ones, the same horizon as the feed's seen IDs
+MAX_CLUSTER_ENTRIES = 200
+# fixed, so signatures stored by one run compare with the next run's
+HASH_SEED = 20240626
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^a-z0-9]+")
+
+# multiply-shift hashing of each 32 bit shingle, one (a, b) pair per permutation
+_HASH_A, _HASH_B = np.random.default_rng(HASH_SEED).integers(1, 2**63, size=(2, NUM_PERMUTATIONS), dtype=np.uint64)
+_HASH_A |= np.uint64(1)
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature of the text's 4 character shingles, after lowercasing and collapsing punctuation."""
+    normalised = NON_ALPHANUMERIC_PATTERN.sub(" ", text.lower()).strip().encode()
+    if len(normalised) < 4:
+        normalised = normalised.ljust(4)
+
+    # every 4 byte window packed into one integer, so shingles are hashed without a Python loop
+    chars = np.frombuffer(normalised, dtype=np.uint8).astype(np.uint64)
+    shingles = np.unique(chars[:-3] << 24 | chars[1:-2] << 16 | chars[2:-1] << 8 | chars[3:])
+    hashes = (_HASH_A[:, None] * shingles[None, :] + _HASH_B[:, None]) >> np.uint64(32)
+    return hashes.min(axis=1)
+
+
+class NewsClusters:
+    """
+    The last `max_entries` items' signatures and clusters, restored from and saved to the feed state as
+    [{"cluster_id": ..., "signature": [...]}, ...] oldest first.
+    """
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None, max_entries: int = MAX_CLUSTER_ENTRIES):
+        self.max_entries = max_entries
+        self._signatures = np.zeros((max_entries, NUM_PERMUTATIONS), dtype=np.uint64)
+        self._cluster_ids: List[Optional[str]] = [None] * max_entries
+        self._added = 0
+        # band key -> the most recent entry (counted from 0 as added) with that band
+        self._buckets: Dict[Tuple[int, bytes], int] = {}
+
+        for entry in (entries or [])[-max_entries:]:
+            self._add(np.array(entry["signature"], dtype=np.uint64), entry["cluster_id"])
+
+    def assign(self, item_id: str, text: str) -> str:
+        """The cluster `text` belongs to, starting a new one with `item_id` as its ID when it matches none."""
+        item_signature = signature(text)
+        cluster_id = self._match(item_signature) or item_id
+        self._add(item_signature, cluster_id)
+        return cluster_id
+
+    def to_state(self) -> List[Dict[str, Any]]:
+        first = max(0, self._added - self.max_entries)
+        return [
+            {
+                "cluster_id": self._cluster_ids[added % self.max_entries],
+                "signature": self._signatures[added % self.max_entries].tolist(),
+            }
+            for added in range(first, self._added)
+        ]
+
+    def _match(self, item_signature: np.ndarray) -> Optional[str]:
+        candidates = {self._buckets[key] for key in _band_keys(item_signature) if key in self._buckets}
+        if not candidates:
+            return None
+
+        slots = [added % self.max_entries for added in candidates]
+        similarities = (self._signatures[slots] == item_signature).mean(axis=1)
+        best = int(similarities.argmax())
+        return self._cluster_ids[slots[best]] if similarities[best] >= SIMILARITY_THRESHOLD else None
+
+    def _add(self, item_signature: np.ndarray, cluster_id: str) -> None:
+        slot = self._added % self.max_entries
+        if self._added >= self.max_entries:
+            # forget the entry being overwritten, unless a newer one has taken its buckets since
+            evicted = self._added - self.max_entries
+            for key in _band_keys(self._signatures[slot]):
+                if self._buckets.get(key) == evicted:
+                    del self._buckets[key]
+
+        self._signatures[slot] = item_signature
+        self._cluster_ids[slot] = cluster_id
+        for key in _band_keys(item_signature):
+            self._buckets[key] = self._added
+        self._added += 1
+
+
+def _band_keys(item_signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    bands = item_signature.reshape(BANDS, ROWS_PER_BAND)
+    return [(band, bands[band].tobytes()) for band in range(BANDS)]
+
+
+SOURCES = ["Reuters", "CoinDesk", "Bloomberg", "Yahoo Finance", "Cointelegraph", "Decrypt"]
+SUBJECTS = ["Bitcoin", "Ethereum", "Crypto markets", "Spot bitcoin ETFs", "Miners", "Stablecoins", "The Fed"]
+VERBS = ["rallies", "slides", "steadies", "surges", "drops", "holds", "rebounds", "stalls"]
+REASONS = ["rate cut bets", "ETF outflows", "a hack", "whale selling", "regulatory news", "strong inflows"]
+
+
+def synthetic_feed(stories: int, seed: int = 0) -> List[Tuple[str, str, int]]:
+    """(id, text, story) items, where each story is syndicated as 1-4 copies with different sources and snippets."""
+    rng = np.random.default_rng(seed)
+    feed = []
+    for story in range(stories):
+        level = int(rng.integers(20_000, 90_000))
+        title = (
+            f"{SUBJECTS[rng.integers(len(SUBJECTS))]} {VERBS[rng.integers(len(VERBS))]} near ${level:,} "
+            f"on {REASONS[rng.integers(len(REASONS))]}"
+        )
+        # each story's own wording, made up of pseudo words
+        words = ["".join(chr(97 + c) for c in rng.integers(0, 26, rng.integers(3, 9))) for _ in range(25)]
+        for copy_number in range(int(rng.integers(1, 5))):
+            source = SOURCES[rng.integers(len(SOURCES))]
+            # outlets trim the snippet differently
+            snippet = " ".join(words[: len(words) - int(rng.integers(0, 5))])
+            feed.append((f"{story}.{copy_number}", f"{title} - {source} {snippet}", story))
+
+    # copies arrive interleaved with other stories
+    window = np.arange(len(feed)) + rng.integers(0, 20, len(feed))
+    return [feed[i] for i in np.argsort(window, kind="stable")]
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate news clustering on a synthetic feed.")
+    parser.add_argument("--items", type=int, default=20_000, help="roughly how many feed items to cluster")
+    parser.add_argument("--max-entries", type=int, default=MAX_CLUSTER_ENTRIES)
+    parsed = parser.parse_args(args)
+
+    feed = synthetic_feed(parsed.items * 2 // 5)
+    clusters = NewsClusters(max_entries=parsed.max_entries)
+
+    start = time.perf_counter()
+    assigned = [clusters.assign(item_id, text) for item_id, text, _ in feed]
+    seconds = time.perf_counter() - start
+
+    # a copy is grouped correctly when it lands in the cluster of its story's first item
+    first_of_story: Dict[int, str] = {}
+    for (item_id, _, story), cluster_id in zip(feed, assigned):
+        first_of_story.setdefault(story, item_id)
+    correct = sum(cluster_id == first_of_story[story] for (_, _, story), cluster_id in zip(feed, assigned))
+
+    print(
+        f"{len(feed):,} items in {seconds:.2f}s ({len(feed) / seconds:,.0f} items/s), "
+        f"{len(first_of_story):,} stories, {len(set(assigned)):,} clusters, "
+        f"{correct / len(feed):.1%} of items in their story's cluster"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,116 @@
-from typing import List, Dict
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, List, Dict, Optional
 import re
 
 import feedparser
 
+from ingestor_logger import ingestor_logger
+from http_client import ApiClient
+from news_clusters import NewsClusters
+
 # see https://www.google.com/alerts# for setup
 RSS_FEED_URL = "https://www.google.com/alerts/feeds/08285277604393949885/9336531935903264427"
 
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# enough to cover the feed's overlap between runs without growing the state document forever
+MAX_SEEN_ENTRIES = 200
+
+
+@dataclass
+class FeedState:
+    """
+    Validators and already ingested entry IDs, carried between runs so unchanged feeds cost almost nothing, and the
+    recent entries' similarity signatures so copies of a story are clustered with it across runs.
+    """
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    seen_ids: List[str] = field(default_factory=list)
+    clusters: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FeedState":
+        return cls(**data)
+
 
 class NewsExtractor:
-    def __init__(self, limit: int = 10):
+    def __init__(self, limit: int = 10, http: Optional[ApiClient] = None, state: Optional[FeedState] = None):
         self.url = RSS_FEED_URL
         self.limit = limit
+        self.http = http or ApiClient()
+        self.state = state or FeedState()
 
     def get_news(self) -> List[Dict]:
+        """Return the feed's entries not returned by a previous run. Empty when the feed has not changed."""
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
         try:
-            feed = feedparser.parse(self.url)
+            response = self.http.get("google_alerts", self.url, headers=self._conditional_headers())
+            if response.status_code == 304:
+                self._log_timing("not modified", start_wall, start_cpu)
+                return []
+
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
 
             if feed.bozo:
                 raise ValueError(f"Failed to parse Google News RSS feed: {feed.bozo_exception}")
 
-            news_items = []
+            seen_ids = set(self.state.seen_ids)
+            clusters = NewsClusters(self.state.clusters)
+            news_items, new_ids = [], []
             for entry in feed.entries[: self.limit]:
+                entry_id = entry.get("id", entry.published)
+                if entry_id in seen_ids:
+                    continue
+
+                new_ids.append(entry_id)
+                title, summary = self._clean_html(entry.title), self._clean_html(entry.summary)
                 news_items.append(
                     {
-                        "title": self._clean_html(entry.title),
+                        "title": title,
                         "published": entry.published,
-                        "summary": self._clean_html(entry.summary),
+                        "summary": summary,
+                        # syndicated copies of a story share the cluster of the first one seen, see news_clusters
+                        "cluster_id": clusters.assign(entry.published, f"{title} {summary}"),
                     }
                 )
 
+            self.state = FeedState(
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                seen_ids=(self.state.seen_ids + new_ids)[-MAX_SEEN_ENTRIES:],
+                clusters=clusters.to_state(),
+            )
+            stories = len({item["cluster_id"] for item in news_items})
+            self._log_timing(f"{len(news_items)} new entries, {stories} distinct stories", start_wall, start_cpu)
             return news_items
         except Exception as e:
             raise ValueError("An error occurred while fetching news") from e
 
+    def _conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.state.etag:
+            headers["If-None-Match"] = self.state.etag
+        if self.state.last_modified:
+            headers["If-Modified-Since"] = self.state.last_modified
+        return headers
+
+    def _log_timing(self, outcome: str, start_wall: float, start_cpu: float) -> None:
+        ingestor_logger.info(
+            "News feed: %s (%.3fs wall, %.3fs cpu)",
+            outcome,
+            time.perf_counter() - start_wall,
+            time.thread_time() - start_cpu,
+        )
+
     def _clean_html(self, html_text: str) -> str:
         """Remove HTML tags from a string."""
-        clean_text = re.sub(r"<[^>]+>", "", html_text)
+        clean_text = HTML_TAG_PATTERN.sub("", html_text)
         return clean_text
 
 
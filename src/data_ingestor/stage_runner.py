@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from ingestor_logger import ingestor_logger
+
+# stages are I/O bound, but every extra pair/interval adds a stage so the pool is capped
+MAX_STAGE_WORKERS = 8
+
+
+@dataclass
+class StageResult:
+    name: str
+    duration: float
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_stages(
+    stages: Dict[str, Callable[[], None]], concurrent: bool = True, max_workers: Optional[int] = None
+) -> List[StageResult]:
+    """
+    Run independent ingestion stages, either on a thread pool or one after another.
+    A failing stage is recorded in its result rather than aborting the others.
+    """
+    if not concurrent:
+        return [_run_stage(name, stage) for name, stage in stages.items()]
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(stages), MAX_STAGE_WORKERS) or 1) as executor:
+        futures = [executor.submit(_run_stage, name, stage) for name, stage in stages.items()]
+        return [future.result() for future in futures]
+
+
+def _run_stage(name: str, stage: Callable[[], None]) -> StageResult:
+    start = time.perf_counter()
+    try:
+        stage()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        ingestor_logger.exception("Stage %s failed", name)
+        return StageResult(name, time.perf_counter() - start, e)
+
+    return StageResult(name, time.perf_counter() - start)
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import dspy
+import pytest
+from src.bot.backtest import Backtest, ReplayDataClient, replay_timestamps
+from src.bot.retrievers.historic_data_retriever import Lookback
+
+START = datetime(2024, 6, 1, tzinfo=timezone.utc)
+COLLECTIONS = {
+    "indicators__taapi__1h": "taapi_1h",
+    "indicators__taapi__1d": "taapi_1d",
+    "indicators__alternative_me": "alternative_me",
+    "news__google_feed": "google_feed",
+}
+
+
+def _hourly(hour: int):
+    ts = START + timedelta(hours=hour)
+    doc = {
+        "id": ts.strftime("%Y-%m-%d %H:%M:%S (%A) UTC"),
+        "data": [{"id": "candle", "result": {"close": hour}}, {"id": "price", "result": {"value": [float(hour)]}}],
+    }
+    return ts.timestamp(), doc
+
+
+@pytest.fixture(name="replay_client")
+def fixture_replay_client():
+    documents = {"indicators__taapi__1h": [_hourly(hour) for hour in range(100)]}
+    lookbacks = {"indicators__taapi__1h": Lookback(rows=3, window=timedelta(hours=12))}
+    return ReplayDataClient(documents, COLLECTIONS, lookbacks)
+
+
+def test_replay_slices_the_newest_rows_before_each_timestamp(replay_client):
+    crypto_data = replay_client(query=START + timedelta(hours=50, minutes=30)).crypto_data
+
+    assert crypto_data.hourly["price"].tolist() == [48.0, 49.0, 50.0]
+    assert crypto_data.latest_product_price == 50.0
+    assert crypto_data.google_feed == []
+
+
+def test_backtest_checkpoints_and_resumes(tmp_path, replay_client):
+    output = tmp_path / "run.jsonl"
+    calls = []
+
+    def predictor(ts):
+        calls.append(ts)
+        if ts.hour == 3:
+            raise RuntimeError("LLM timeout")
+        return dspy.Prediction(price=replay_client(query=ts).crypto_data.latest_product_price)
+
+    timestamps = replay_timestamps(START + timedelta(hours=1), START + timedelta(hours=6), timedelta(hours=1))
+    assert Backtest(predictor, str(output), max_workers=2).run(timestamps) == 1
+
+    calls.clear()
+    assert Backtest(predictor, str(output), max_workers=2).run(timestamps) == 1
+    assert calls == [START + timedelta(hours=3)]
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["price"] for record in records) == [1.0, 2.0, 4.0, 5.0]
+    assert {record["run_id"] for record in records} == {"run"}
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from src.bot.context_builder import ContextBuilder, TokenBudget, count_tokens, downsample_hourly
+from src.bot.data_formatter import DataFormatter
+from typess.crypto_data import CryptoData
+
+START = datetime(2024, 6, 26)
+
+
+def _hour(i):
+    candle_time = START + timedelta(hours=i)
+    candle = {"open": 100 + i, "high": 110 + i, "low": 90 + i, "close": 101 + i, "volume": 1}
+    return {
+        "id": candle_time.strftime("%Y-%m-%d %H:%M:%S (%A) UTC"),
+        "data": [{"id": "candle", "result": candle}, {"id": "RSI", "result": {"value": [i]}}],
+    }
+
+
+def _news(i):
+    return {"id": str(i), "data": {"published": f"item {i}", "title": f"Headline {i}", "summary": "word " * 20}}
+
+
+def test_older_hours_are_merged_into_candles():
+    docs = downsample_hourly([_hour(i) for i in range(10)], full_resolution_hours=2, aggregate_hours=4)
+
+    assert [doc["id"][:19] for doc in docs] == [
+        "2024-06-26 00:00:00",
+        "2024-06-26 04:00:00",
+        "2024-06-26 08:00:00",
+        "2024-06-26 09:00:00",
+    ]
+    span, candle, rsi = docs[0]["data"]
+    assert span == {"id": "candle_span", "result": "4h"}
+    assert candle["result"] == {"open": 100, "high": 113, "low": 90, "close": 104, "volume": 4}
+    assert rsi["result"] == {"value": [3]}
+
+
+def test_sections_fit_their_quotas_keeping_the_newest_rows():
+    crypto_data = CryptoData([_hour(i) for i in range(500)], [], [], [_news(i) for i in range(200)])
+    budget = TokenBudget(total=2000)
+
+    sections = ContextBuilder(DataFormatter(), budget).build(crypto_data)
+
+    assert sections.tokens["hourly"] <= budget.quota("hourly")
+    assert sections.tokens["news"] <= budget.quota("news")
+    assert sections.tokens["news"] == count_tokens(sections.news)
+    assert "Headline 199" in sections.news and "Headline 0 " not in sections.news
+    assert sections.hourly.endswith("RSI: 499")
+    assert sections.daily == "No data available"
+
+
+def test_small_windows_are_left_as_they_are():
+    crypto_data = CryptoData([_hour(i) for i in range(3)], [], [], [_news(0)])
+    formatter = DataFormatter()
+
+    sections = ContextBuilder(formatter).build(crypto_data)
+
+    assert sections.hourly == formatter.format_hourly_data(crypto_data.taapi_1h)
+    assert sections.news == formatter.format_news(crypto_data.google_feed)
@@ -1,5 +1,5 @@
 import pytest
-from src.bot.data_formatter import DataFormatter
+from src.bot.data_formatter import DataFormatter, FearGreedIndex, RowCache
 
 
 @pytest.fixture(name="taapi_indicators_hourly")
@@ -92,3 +92,81 @@ def test_input_list_is_empty(formatter):
     taapi_indicators = []
     expected_output = "No data available"
     assert formatter.format_hourly_data(taapi_indicators) == expected_output
+
+
+def test_csv_layout_prints_the_header_once(taapi_indicators_hourly):
+    expected_output = "timestamp,day_of_week,candle_volume,candle_high,candle_low,candle_open,candle_close,price,50EMA,RSI,MACD,MACD_signal,MACD_hist\n2024-06-26 20:00:00,Wednesday,6.7364,48409,48094,48274,48209,48209,48624,40.897,-53.229,5.3706,-58.6\n2024-06-26 21:00:00,Wednesday,,,,,,1111,1234.2,,,,"
+    assert DataFormatter("csv").format_hourly_data(taapi_indicators_hourly) == expected_output
+
+
+def test_kv_layout_quotes_values_with_spaces(taapi_indicators_daily, alt_me_data):
+    output = DataFormatter("kv").format_daily_data(taapi_indicators_daily[:1], alt_me_data)
+    assert output == 'timestamp="2024-06-26 00:00:00" day_of_week=Wednesday RSI=40 fear_greed_index_class=Fear'
+
+
+def test_news_layouts():
+    news = [{"data": {"published": "Wed, 26 Jun 2024 20:13:00 GMT", "title": "BTC up", "summary": "It rose, a lot"}}]
+
+    assert DataFormatter().format_news(news) == (
+        "News 1: Published: Wed, 26 Jun 2024 20:13:00 GMT Title: BTC up Summary: It rose, a lot\n"
+    )
+    assert DataFormatter("csv").format_news(news) == (
+        'published,title,summary\n"Wed, 26 Jun 2024 20:13:00 GMT",BTC up,"It rose, a lot"'
+    )
+
+
+def test_sliding_window_only_renders_new_rows(formatter, taapi_indicators_hourly):
+    first = formatter.format_hourly_data(taapi_indicators_hourly[:1])
+    assert (formatter.row_cache.hits, formatter.row_cache.misses) == (0, 1)
+
+    window = formatter.format_hourly_data(taapi_indicators_hourly)
+    assert (formatter.row_cache.hits, formatter.row_cache.misses) == (1, 2)
+    assert window.startswith(first + "\n")
+    assert window == DataFormatter(row_cache=RowCache(0)).format_hourly_data(taapi_indicators_hourly)
+
+
+def test_rewritten_documents_are_rendered_again(alt_me_data):
+    def today(close, extracted):
+        candle = {"open": 1.0, "high": 10.0, "low": 1.0, "close": close, "volume": 3.0}
+        data = [{"id": "candle", "result": candle}]
+        return {"id": "2024-06-26 00:00:00 (Wednesday) UTC", "extraction_timestamp": extracted, "data": data}
+
+    formatter = DataFormatter()
+    assert "candle_close: 1.5" in formatter.format_daily_data([today(1.5, "2024-06-26T01:05:00+00:00")], alt_me_data)
+    # the ingestor rewrites the open daily candle under the same ID every hour
+    assert "candle_close: 9.9" in formatter.format_daily_data([today(9.9, "2024-06-26T02:05:00+00:00")], alt_me_data)
+
+
+def test_daily_rows_are_rerendered_when_the_fear_greed_class_arrives(taapi_indicators_daily, alt_me_data):
+    formatter = DataFormatter()
+    assert formatter.format_daily_data(taapi_indicators_daily[:1], []).endswith("fear_greed_index_class: Unknown")
+    assert formatter.format_daily_data(taapi_indicators_daily[:1], alt_me_data).endswith("fear_greed_index_class: Fear")
+
+
+def test_fear_greed_index_joins_on_dates_from_either_format():
+    alternative_me = [
+        {"data": {"timestamp": "26-06-2024", "date": "2024-06-26", "value_classification": "Fear"}},
+        # ingested before documents carried an ISO date
+        {"data": {"timestamp": "24-06-2024", "value_classification": "Greed"}},
+    ]
+
+    index = FearGreedIndex(alternative_me)
+    assert index.classes_on(["2024-06-24", "2024-06-25", "2024-06-26", "2024-06-27"]) == [
+        "Greed",
+        "Unknown",
+        "Fear",
+        "Unknown",
+    ]
+    assert FearGreedIndex([]).classes_on(["2024-06-26"]) == ["Unknown"]
+
+
+def test_news_shows_each_story_once():
+    news = [
+        {"data": {"published": "20:13", "title": "BTC up", "summary": "It rose", "cluster_id": "20:13"}},
+        {"data": {"published": "20:14", "title": "ETH flat", "summary": "It held"}},
+        {"data": {"published": "20:15", "title": "BTC up!", "summary": "It rose", "cluster_id": "20:13"}},
+    ]
+
+    assert DataFormatter().format_news(news) == (
+        "News 1: Published: 20:13 Title: BTC up Summary: It rose\nNews 2: Published: 20:14 Title: ETH flat Summary: It held\n"
+    )
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from src.bot.llm_calls import LLMCallLog
+
+
+class FakeLM:
+    def __init__(self, model):
+        self.kwargs = {"model": model}
+        self.logged = []
+
+    def log_usage(self, response):
+        self.logged.append(response)
+
+    def __call__(self, response):
+        self.log_usage(response)
+
+
+def test_records_each_calls_usage_summed_over_its_requests():
+    groq, openai = FakeLM("llama3-70b-8192"), FakeLM("gpt-3.5-turbo")
+    calls = LLMCallLog()
+    calls.watch(groq)
+    calls.watch(openai)
+
+    groq(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5)))
+    with calls.call("prediction_report"):
+        groq(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=50)))
+        groq(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1100, completion_tokens=20)))
+    with calls.call("data_issue_checker"):
+        openai(
+            {"usage": {"prompt_tokens": 900, "completion_tokens": 30, "prompt_tokens_details": {"cached_tokens": 512}}}
+        )
+
+    records = calls.take()
+    assert [{key: value for key, value in record.items() if key != "seconds"} for record in records] == [
+        {
+            "name": "prediction_report",
+            "model": "llama3-70b-8192",
+            "requests": 2,
+            "prompt_tokens": 2100,
+            "completion_tokens": 70,
+            "cached_tokens": 0,
+        },
+        {
+            "name": "data_issue_checker",
+            "model": "gpt-3.5-turbo",
+            "requests": 1,
+            "prompt_tokens": 900,
+            "completion_tokens": 30,
+            "cached_tokens": 512,
+        },
+    ]
+    # the clients' own logging still happens, and taking clears the records
+    assert len(groq.logged) == 3
+    assert calls.take() == []
@@ -0,0 +1,143 @@
+import operator
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from src.bot.retrievers.document_cache import Coverage, DocumentCache, to_epoch
+from src.bot.retrievers.historic_data_retriever import HistoricDataClient, Lookback
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<=": operator.le}
+
+
+class FakeQuery:
+    """Enough of a Firestore query for the retriever: range filters on one field, descending order and a limit."""
+
+    def __init__(self, name, docs, queries):
+        self.name = name
+        self.docs = docs
+        self.queries = queries
+        self.filters = []
+        self.rows = None
+
+    def select(self, _field_paths):
+        return self
+
+    def where(self, field, op, value):
+        self.filters.append((field, op, value))
+        return self
+
+    def order_by(self, *_, **__):
+        return self
+
+    def limit(self, rows):
+        self.rows = rows
+        return self
+
+    def get(self):
+        self.queries.append((self.name, self.filters))
+        matching = [
+            doc for doc in self.docs if all(OPERATORS[op](doc.data[field], value) for field, op, value in self.filters)
+        ]
+        return sorted(matching, key=lambda doc: doc.data["extraction_timestamp"], reverse=True)[: self.rows]
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+def _candle_id(hour: int) -> str:
+    return (START + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S (%A) UTC")
+
+
+@pytest.fixture(name="queries")
+def fixture_queries():
+    return []
+
+
+@pytest.fixture(name="db")
+def fixture_db(mocker, queries):
+    hourly = [
+        FakeSnapshot(_candle_id(i), {"extraction_timestamp": START + timedelta(hours=i), "data": []})
+        for i in range(24 * 14)
+    ]
+    db = mocker.MagicMock()
+    db.collection.side_effect = lambda name: FakeQuery(name, hourly if name == "indicators__taapi__1h" else [], queries)
+    return db
+
+
+def _client(db, cache):
+    lookback = Lookback(rows=48, window=timedelta(hours=72))
+    return HistoricDataClient("-", db=db, document_cache=cache, lookbacks={"indicators__taapi__1h": lookback})
+
+
+def _hourly_queries(queries):
+    return [filters for name, filters in queries if name == "indicators__taapi__1h"]
+
+
+def test_repeated_history_reads_are_served_from_the_cache(db, queries):
+    cache = DocumentCache(":memory:")
+    client = _client(db, cache)
+    ts = START + timedelta(days=7)
+
+    first = client(query=ts).crypto_data.taapi_1h
+    queries.clear()
+    second = client(query=ts).crypto_data.taapi_1h
+
+    assert [doc["id"] for doc in first] == [_candle_id(i) for i in range(121, 169)]
+    assert second == first
+    assert not _hourly_queries(queries)
+
+
+def test_later_reads_only_fetch_past_the_high_water_mark(db, queries):
+    cache = DocumentCache(":memory:")
+    client = _client(db, cache)
+    client(query=START + timedelta(days=7))
+    high_water = cache.coverage("indicators__taapi__1h").high
+    queries.clear()
+
+    later = client(query=START + timedelta(days=7, hours=3)).crypto_data.taapi_1h
+
+    assert later[-1]["id"] == _candle_id(171)
+    assert len(later) == 48
+    [filters] = _hourly_queries(queries)
+    assert filters[0][1:] == (">", datetime.fromtimestamp(high_water, tz=timezone.utc))
+
+
+def test_reads_before_the_cached_range_query_the_whole_window(db, queries):
+    cache = DocumentCache(":memory:")
+    client = _client(db, cache)
+    client(query=START + timedelta(days=12))
+    queries.clear()
+
+    earlier = client(query=START + timedelta(days=7)).crypto_data.taapi_1h
+
+    assert [doc["id"] for doc in earlier] == [_candle_id(i) for i in range(121, 169)]
+    [filters] = _hourly_queries(queries)
+    assert filters[0][1:] == (">=", START + timedelta(days=4))
+
+
+def test_eviction_drops_oldest_history_and_shrinks_coverage(db, queries):
+    cache = DocumentCache(":memory:", max_bytes=0)
+    cache.store("indicators__taapi__1h", [(100.0, {"id": "a"}), (200.0, {"id": "b"})], Coverage(50.0, 250.0))
+
+    assert cache.coverage("indicators__taapi__1h").low > 200.0
+    assert cache.query("indicators__taapi__1h", 0, 300, 10) == []
+
+
+def test_invalidate_forces_a_fresh_read(db, queries):
+    cache = DocumentCache(":memory:")
+    client = _client(db, cache)
+    ts = START + timedelta(days=7)
+    client(query=ts)
+
+    assert cache.invalidate("indicators__taapi__1h") == 48
+    queries.clear()
+    client(query=ts)
+
+    assert _hourly_queries(queries)[0][0][2] == ts - timedelta(hours=72)
+    assert to_epoch(ts) <= cache.coverage("indicators__taapi__1h").high
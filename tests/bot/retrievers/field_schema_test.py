@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+from src.bot.data_formatter import DataFormatter
+from src.bot.retrievers.field_schema import FIELD_SCHEMAS, document_size, project_indicators
+from src.bot.retrievers.historic_data_retriever import HistoricDataClient, RetrievalStats
+
+EXTRACTED = datetime(2024, 6, 26, 21, 5, tzinfo=timezone.utc)
+
+INDICATORS = [
+    {
+        "result": {
+            "volume": 6.7363608699999915,
+            "low": 48093.72,
+            "close": 48208.92,
+            "high": 48408.58,
+            "open": 48273.58,
+            "timestampHuman": "2024-06-26 20:00:00 (Wednesday) UTC",
+            "timestamp": 1719432000,
+        },
+        "id": "candle",
+        "errors": [],
+        "indicator": "candle",
+    },
+    {"result": {"value": [48208.92]}, "id": "price", "errors": [], "indicator": "price"},
+    {
+        "result": {
+            "valueMACDHist": [-58.59995092755177],
+            "valueMACD": [-53.22936690697679],
+            "valueMACDSignal": [5.3705840205749755],
+        },
+        "id": "MACD",
+        "errors": [],
+        "indicator": "macd",
+    },
+]
+
+
+def _client(mocker, data):
+    snapshot = mocker.MagicMock(id="2024-06-26 20:00:00 (Wednesday) UTC")
+    snapshot.to_dict.side_effect = lambda: {"extraction_timestamp": EXTRACTED, "data": data, "unused": "x" * 100}
+    query = mocker.MagicMock()
+    query.select.return_value = query.where.return_value = query
+    query.order_by.return_value = query.limit.return_value = query
+    query.get.return_value = [snapshot]
+    db = mocker.MagicMock()
+    db.collection.return_value = query
+    return query, db
+
+
+def test_projection_keeps_the_formatted_prompt_identical(mocker):
+    query, db = _client(mocker, INDICATORS)
+    full = HistoricDataClient("-", db=db, projected=False)._query("indicators__taapi__1h", EXTRACTED, EXTRACTED, 1)
+    projected = HistoricDataClient("-", db=db)._query("indicators__taapi__1h", EXTRACTED, EXTRACTED, 1)
+
+    formatter = DataFormatter()
+    assert formatter.format_hourly_data([projected[0][1]]) == formatter.format_hourly_data([full[0][1]])
+    assert projected[0][1]["extraction_timestamp"] == "2024-06-26T21:05:00+00:00"
+    assert document_size(projected[0][1]) < document_size(full[0][1])
+    query.select.assert_called_once_with(FIELD_SCHEMAS["indicators__taapi__1h"].field_paths)
+
+
+def test_unused_indicator_fields_are_dropped():
+    candle, price, macd = project_indicators(INDICATORS)
+
+    assert candle == {
+        "id": "candle",
+        "result": {k: INDICATORS[0]["result"][k] for k in ("open", "high", "low", "close", "volume")},
+    }
+    assert price == {"id": "price", "result": {"value": [48208.92]}}
+    assert set(macd["result"]) == {"valueMACD", "valueMACDSignal", "valueMACDHist"}
+
+
+def test_payload_is_sized_only_when_measured(mocker):
+    _, db = _client(mocker, INDICATORS)
+
+    stats = RetrievalStats()
+    HistoricDataClient("-", db=db)._query("indicators__taapi__1h", EXTRACTED, EXTRACTED, 1, stats=stats)
+    assert stats.payloads["indicators__taapi__1h"].size is None
+
+    stats = RetrievalStats()
+    client = HistoricDataClient("-", db=db, measure_payload=True)
+    client._query("indicators__taapi__1h", EXTRACTED, EXTRACTED, 1, stats=stats)
+    assert stats.payloads["indicators__taapi__1h"].documents == 1
+    assert stats.payloads["indicators__taapi__1h"].size > 0
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from src.bot.retrievers.historic_data_retriever import DEFAULT_LOOKBACKS, HistoricDataClient
+
+EXTRACTED = datetime(2024, 6, 26, 1, 5, tzinfo=timezone.utc)
+
+
+def _candle_id(hours_before: int) -> str:
+    return (EXTRACTED - timedelta(hours=hours_before)).strftime("%Y-%m-%d %H:00:00 (%A) UTC")
+
+
+def _snapshot(mocker, doc_id, data):
+    return mocker.MagicMock(id=doc_id, to_dict=lambda: dict(data))
+
+
+@pytest.fixture(name="db")
+def fixture_db(mocker):
+    db = mocker.MagicMock()
+    fear_greed = {
+        "extraction_timestamp": EXTRACTED,
+        "data": {"timestamp": "26-06-2024", "value_classification": "Fear", "time_until_update": "82500"},
+    }
+
+    hourly = [
+        _snapshot(mocker, _candle_id(i), {"extraction_timestamp": EXTRACTED - timedelta(hours=i), "data": []})
+        for i in range(3)
+    ]
+
+    def collection(name):
+        query = mocker.MagicMock()
+        # select, where, order_by and limit all return the same query so the chain can be inspected afterwards
+        query.select.return_value = query.where.return_value = query
+        query.order_by.return_value = query.limit.return_value = query
+        if name == "indicators__alternative_me":
+            query.get.return_value = [_snapshot(mocker, "26-06-2024", fear_greed)]
+        else:
+            query.get.return_value = hourly if name == "indicators__taapi__1h" else []
+        db.queries[name] = query
+        return query
+
+    db.queries = {}
+
+    db.collection.side_effect = collection
+    return db
+
+
+def _reads(db, collection_name):
+    return sum(1 for call in db.collection.call_args_list if call.args[0] == collection_name)
+
+
+def test_fear_greed_is_read_once_per_publish_cycle(db):
+    client = HistoricDataClient("-", db=db)
+
+    first = client(query=EXTRACTED + timedelta(hours=1)).crypto_data
+    client(query=EXTRACTED + timedelta(hours=2))
+
+    assert first.alternative_me[0]["data"]["value_classification"] == "Fear"
+    assert _reads(db, "indicators__alternative_me") == 1
+    assert _reads(db, "indicators__taapi__1h") == 2
+
+
+def test_fear_greed_is_read_again_once_the_next_index_is_published(db):
+    client = HistoricDataClient("-", db=db)
+
+    client(query=EXTRACTED + timedelta(hours=1))
+    client(query=EXTRACTED + timedelta(days=1))
+    client(query=EXTRACTED - timedelta(hours=1))
+
+    assert _reads(db, "indicators__alternative_me") == 3
+
+
+def test_collections_are_queried_concurrently(mocker, db):
+    # every query waits for the other three, so a sequential fetch would break the barrier
+    barrier = threading.Barrier(4, timeout=5)
+    query = db.collection.side_effect
+
+    def collection(name):
+        result = query(name)
+        get = result.get
+        docs = get.return_value
+
+        def wait_for_others():
+            barrier.wait()
+            return docs
+
+        get.side_effect = wait_for_others
+        return result
+
+    db.collection.side_effect = collection
+    client = HistoricDataClient("-", db=db)
+
+    prediction = client(query=EXTRACTED + timedelta(hours=1))
+
+    assert len(prediction.crypto_data.alternative_me) == 1
+    assert set(prediction.retrieval_stats.latencies) == set(client.collections)
+
+
+def test_each_call_reports_its_own_metrics(db):
+    client = HistoricDataClient("-", db=db)
+
+    first = client(query=EXTRACTED + timedelta(hours=1)).retrieval_stats
+    # fear & greed is answered from the publish cycle cache this time, so nothing of it is downloaded
+    second = client(query=EXTRACTED + timedelta(hours=2)).retrieval_stats
+
+    assert first is not second
+    assert "indicators__alternative_me" in first.payloads
+    assert "indicators__alternative_me" not in second.payloads
+    assert first.payloads["indicators__taapi__1h"].documents == 3
+
+
+def test_reads_newest_rows_within_window_in_chronological_order(db):
+    client = HistoricDataClient("-", db=db)
+    ts = EXTRACTED + timedelta(minutes=30)
+
+    crypto_data = client(query=ts).crypto_data
+
+    assert [doc["id"] for doc in crypto_data.taapi_1h] == [_candle_id(2), _candle_id(1), _candle_id(0)]
+    query = db.queries["indicators__taapi__1h"]
+    lookback = DEFAULT_LOOKBACKS["indicators__taapi__1h"]
+    assert [call.args for call in query.where.call_args_list] == [
+        ("extraction_timestamp", ">=", ts - lookback.window),
+        ("extraction_timestamp", "<=", ts),
+    ]
+    assert query.order_by.call_args.kwargs["direction"] == "DESCENDING"
+    assert query.limit.call_args.args == (lookback.rows,)
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from src.bot.retrievers.document_cache import to_epoch
+from src.bot.retrievers.historic_data_retriever import HistoricDataClient, Lookback, RetrievalStats
+from src.bot.retrievers.live_cache import LiveCache
+
+COLLECTION = "indicators__taapi__1h"
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class FakeWatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+
+class FakeSnapshot:
+    def __init__(self, hours_ago):
+        self.id = f"hour -{hours_ago}"
+        self.data = {"extraction_timestamp": NOW - timedelta(hours=hours_ago), "data": []}
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+def _change(kind, snapshot):
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=snapshot)
+
+
+@pytest.fixture(name="db")
+def fixture_db(mocker):
+    db = mocker.MagicMock()
+    db.watches = []
+
+    def on_snapshot(callback):
+        db.watches.append(FakeWatch(callback))
+        return db.watches[-1]
+
+    db.collection.return_value.where.return_value.on_snapshot.side_effect = on_snapshot
+    return db
+
+
+def _query(cache, hours=4, rows=10):
+    return cache.query(COLLECTION, to_epoch(NOW - timedelta(hours=hours)), to_epoch(NOW), rows)
+
+
+def test_serves_the_listened_window_and_applies_changes(db):
+    cache = LiveCache(db, {COLLECTION: timedelta(hours=4)})
+    cache.check()
+    assert _query(cache) is None
+
+    db.watches[0].callback([FakeSnapshot(2), FakeSnapshot(1)], [], NOW)
+    new = FakeSnapshot(0)
+    db.watches[0].callback([], [_change("ADDED", new), _change("REMOVED", FakeSnapshot(2))], NOW)
+
+    assert [doc["id"] for doc in _query(cache)] == ["hour -1", "hour -0"]
+    assert _query(cache)[-1]["extraction_timestamp"] == new.data["extraction_timestamp"].isoformat()
+    # earlier than the window the listener covers, so Firestore has to answer it
+    assert _query(cache, hours=48) is None
+
+
+def test_stopped_listener_is_replaced_and_resynced(db):
+    cache = LiveCache(db, {COLLECTION: timedelta(hours=4)})
+    cache.check()
+    db.watches[0].callback([FakeSnapshot(2)], [], NOW)
+
+    db.watches[0].is_active = False
+    cache.check()
+    assert len(db.watches) == 2
+    assert _query(cache) is None
+
+    db.watches[1].callback([FakeSnapshot(1), FakeSnapshot(0)], [], NOW)
+    assert [doc["id"] for doc in _query(cache)] == ["hour -1", "hour -0"]
+
+
+def test_retriever_skips_firestore_for_collections_the_live_cache_answers(mocker, db):
+    cache = LiveCache(db, {COLLECTION: timedelta(hours=4)})
+    cache.check()
+    db.watches[0].callback([FakeSnapshot(1)], [], NOW)
+    query = mocker.patch.object(HistoricDataClient, "_query", return_value=[])
+
+    client = HistoricDataClient(
+        "-", db=db, live_cache=cache, lookbacks={COLLECTION: Lookback(rows=10, window=timedelta(hours=3))}
+    )
+    crypto_data = client._fetch_data(NOW, client.lookbacks, RetrievalStats())
+
+    assert [doc["id"] for doc in crypto_data["taapi_1h"]] == ["hour -1"]
+    assert COLLECTION not in [call.args[0] for call in query.call_args_list]
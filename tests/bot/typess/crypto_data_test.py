@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from typess.crypto_data import CryptoData
+
+
+def _indicators(hour: int, price: float, with_macd: bool = True):
+    data = [
+        {
+            "id": "candle",
+            "result": {"open": price - 1, "high": price + 2, "low": price - 2, "close": price, "volume": 3},
+        },
+        {"id": "price", "result": {"value": [price]}},
+        {"id": "RSI", "result": {"value": [None]}},
+    ]
+    if with_macd:
+        data.append({"id": "MACD", "result": {"valueMACD": [1.5], "valueMACDSignal": [0.5], "valueMACDHist": [1.0]}})
+    return {"id": f"2024-06-26 {hour:02d}:00:00 (Wednesday) UTC", "data": data}
+
+
+@pytest.fixture(name="crypto_data")
+def fixture_crypto_data():
+    news = [
+        {"data": {"published": f"2024-06-26T{hour:02d}:30:00Z", "title": f"story {hour}", "summary": "..."}}
+        for hour in (10, 12)
+    ]
+    hourly = [_indicators(12, 101.0), _indicators(10, 99.0, with_macd=False), _indicators(11, 100.0)]
+    return CryptoData(taapi_1h=hourly, taapi_1d=[], alternative_me=[], google_feed=news)
+
+
+def test_indicators_become_time_ordered_columns(crypto_data):
+    hourly = crypto_data.hourly
+
+    assert hourly.index.astype(str).tolist() == ["2024-06-26T10:00:00", "2024-06-26T11:00:00", "2024-06-26T12:00:00"]
+    assert hourly["candle_close"].tolist() == [99.0, 100.0, 101.0]
+    assert np.isnan(hourly["MACD_signal"][0]) and hourly["MACD_signal"][1] == 0.5
+    assert np.isnan(hourly["RSI"]).all()
+    assert crypto_data.latest_product_price == 101.0
+
+
+def test_frames_slice_by_time_range(crypto_data):
+    window = crypto_data.hourly.between(datetime(2024, 6, 26, 10, 30), datetime(2024, 6, 26, 11))
+
+    assert window["price"].tolist() == [100.0]
+    assert crypto_data.news.between(end=datetime(2024, 6, 26, 11)).titles == ["story 10"]
+
+
+def test_missing_price_is_an_error():
+    crypto_data = CryptoData(taapi_1h=[], taapi_1d=[], alternative_me=[], google_feed=[])
+
+    with pytest.raises(ValueError):
+        _ = crypto_data.latest_product_price
+
+
+def test_latest_row_without_a_price_is_an_error(crypto_data):
+    latest = crypto_data.taapi_1h[0]
+    latest["data"] = [indicator for indicator in latest["data"] if indicator["id"] != "price"]
+    crypto_data = CryptoData(taapi_1h=crypto_data.taapi_1h, taapi_1d=[], alternative_me=[], google_feed=[])
+
+    with pytest.raises(ValueError):
+        _ = crypto_data.latest_product_price
@@ -1,5 +1,6 @@
+import numpy as np
 import pytest
-from src.bot.util import five_sig_fig
+from src.bot.util import five_sig_fig, five_sig_fig_array
 
 def test_valid_input_float():
     input_val = 123.456789
@@ -39,4 +40,19 @@ def test_invalid_input():
 ])
 def test_various_inputs(input_val, expected_output):
     result = five_sig_fig(input_val)
-    assert result == expected_output
\ No newline at end of file
+    assert result == expected_output
+
+
+def test_array_matches_scalar_formatting():
+    values = [123.456789, float("nan"), 123456, -0.0001234, 1234567, 0.00001234, "123.456789", "not a number", None]
+    expected_output = [five_sig_fig(value) for value in values]
+    result = five_sig_fig_array(values)
+    assert result == expected_output
+
+
+def test_array_formats_numpy_columns():
+    column = np.array([48208.92, 1.5e-7, 2.5e12, np.nan])
+    expected_output = [five_sig_fig(float(value)) for value in column]
+    result = five_sig_fig_array(column)
+    assert result == expected_output
+    assert not any("e" in value for value in result if value != "nan")
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from backfill import CHECKPOINT_COLLECTION, Backfill, _job_id
+from candle_fetcher import CandleSeries
+from memory_firestore import MemoryFirestore
+
+START = datetime(2024, 6, 26, tzinfo=timezone.utc)
+END = START + timedelta(hours=7)
+
+
+def _series(first: datetime, last: datetime) -> CandleSeries:
+    timestamps = np.arange(int(first.timestamp()), int(last.timestamp()) + 1, 3600)
+    close = 40000 + np.cumsum(np.random.default_rng(1).normal(0, 100, len(timestamps)))
+    return CandleSeries(timestamps, close - 10, close + 50, close - 50, close, np.full(len(timestamps), 5.0))
+
+
+@pytest.fixture(name="db")
+def fixture_db():
+    return MemoryFirestore()
+
+
+@pytest.fixture(name="backfill")
+def fixture_backfill(mocker, db):
+    backfill = Backfill(db, http=mocker.MagicMock(), max_workers=2, chunk_size=2)
+    # candles from well before the warmup to past the end, so the range filter decides what is written
+    backfill.candle_fetcher = mocker.MagicMock()
+    backfill.candle_fetcher.get_candle_range.return_value = _series(
+        START - timedelta(days=60), END + timedelta(hours=3)
+    )
+    return backfill
+
+
+def _written(db, collection="indicators__taapi__1h"):
+    return [doc.id[:19] for doc in db.collection(collection).order_by("extraction_timestamp").get()]
+
+
+def test_writes_candles_opening_within_the_window(db, backfill):
+    backfill.backfill_indicators("1h", START, END)
+
+    assert _written(db) == [(START + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(7)]
+    first = db.collection("indicators__taapi__1h").order_by("extraction_timestamp").limit(1).get()[0].to_dict()
+    assert first["extraction_timestamp"] == START + timedelta(hours=1)
+
+
+def test_other_symbols_are_written_to_their_own_collection(db, backfill):
+    backfill.symbol = "ETH/GBP"
+
+    backfill.backfill_indicators("1h", START, END)
+
+    assert len(_written(db, "indicators__taapi__1h__eth_gbp")) == 7
+    assert not _written(db)
+
+
+def test_writes_chunks_in_waves_checkpointing_after_each(mocker, db, backfill):
+    write_chunk = mocker.spy(backfill, "_write_chunk")
+    save_checkpoint = mocker.spy(backfill, "_save_checkpoint")
+
+    backfill.backfill_indicators("1h", START, END)
+
+    # 7 documents in chunks of 2, two chunks per wave
+    assert [len(call.args[1]) for call in write_chunk.call_args_list] == [2, 2, 2, 1]
+    job_id = _job_id("BTC/GBP", "1h", START, END)
+    assert [call.args for call in save_checkpoint.call_args_list] == [
+        (job_id, int((START + timedelta(hours=3)).timestamp())),
+        (job_id, int((START + timedelta(hours=6)).timestamp())),
+    ]
+
+
+def test_resumes_after_the_checkpoint(db, backfill):
+    job_id = _job_id("BTC/GBP", "1h", START, END)
+    db.collection(CHECKPOINT_COLLECTION).document(job_id).set(
+        {"last_timestamp": int((START + timedelta(hours=4)).timestamp())}
+    )
+
+    backfill.backfill_indicators("1h", START, END)
+
+    assert _written(db) == [(START + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S") for i in (5, 6)]
+
+
+def test_skips_candles_that_have_not_closed(db, backfill):
+    job_id = _job_id("BTC/GBP", "1h", START, END)
+
+    backfill.backfill_indicators("1h", START, END, now=START + timedelta(hours=5, minutes=30))
+
+    assert _written(db) == [(START + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(5)]
+    checkpoint = db.collection(CHECKPOINT_COLLECTION).document(job_id).get().to_dict()
+    assert checkpoint["last_timestamp"] == int((START + timedelta(hours=4)).timestamp())
+
+
+def test_fear_greed_days_within_the_window(mocker, db, backfill):
+    days = [START + timedelta(days=i) for i in range(-1, 3)]
+    entries = [{"timestamp": day.strftime("%d-%m-%Y"), "value_classification": "Fear"} for day in reversed(days)]
+    backfill.http.get.return_value = mocker.MagicMock(json=lambda: {"data": entries})
+
+    backfill.backfill_fear_greed(START, START + timedelta(days=2))
+
+    docs = db.collection("indicators__alternative_me").order_by("extraction_timestamp").get()
+    assert [doc.id for doc in docs] == ["26-06-2024", "27-06-2024"]
+    assert docs[0].to_dict()["data"]["date"] == "2024-06-26"
@@ -0,0 +1,82 @@
+import json
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeApiServer:
+    """
+    Local stand-in for the external data APIs. Responses are queued per path and served in order,
+    the last one repeating once the queue is down to it. Received requests are recorded for assertions.
+
+        with FakeApiServer() as server:
+            server.enqueue("/fng/", 429, headers={"Retry-After": "1"})
+            server.enqueue("/fng/", 200, {"data": [...]})
+            client.get("alternative_me", server.url("/fng/"))
+    """
+
+    def __init__(self):
+        self.responses: Dict[str, deque] = defaultdict(deque)
+        self.requests: List[Dict[str, Any]] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeApiServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def enqueue(
+        self, path: str, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None, delay: float = 0
+    ) -> None:
+        self.responses[path].append((status, body, headers or {}, delay))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                path = self.path.split("?")[0]
+                length = int(self.headers.get("Content-Length", 0))
+                server.requests.append(
+                    {
+                        "method": self.command,
+                        "path": path,
+                        "headers": dict(self.headers),
+                        "body": self.rfile.read(length),
+                    }
+                )
+
+                queue = server.responses[path]
+                if not queue:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                status, body, headers, delay = queue.popleft() if len(queue) > 1 else queue[0]
+                if delay:
+                    threading.Event().wait(delay)
+
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *_):
+                pass
+
+        return Handler
@@ -0,0 +1,22 @@
+from fear_greed_cache import MIN_TTL_SECONDS, FearGreedCacheEntry, with_iso_date
+
+
+def test_entry_stays_fresh_until_the_next_publish():
+    entry = FearGreedCacheEntry.from_response({"timestamp": "26-06-2024", "time_until_update": "3600"}, 1000.0)
+
+    assert entry.is_fresh(4599.0)
+    assert not entry.is_fresh(4600.0)
+    assert FearGreedCacheEntry.from_dict(entry.to_dict()) == entry
+
+
+def test_missing_countdown_falls_back_to_minimum_ttl():
+    entry = FearGreedCacheEntry.from_response({"timestamp": "26-06-2024"}, 1000.0)
+
+    assert entry.next_update == 1000.0 + MIN_TTL_SECONDS
+    assert FearGreedCacheEntry.from_dict(None) is None
+
+
+def test_entries_are_keyed_by_iso_date():
+    data = {"timestamp": "26-06-2024", "value_classification": "Fear"}
+
+    assert with_iso_date(data) == {**data, "date": "2024-06-26"}
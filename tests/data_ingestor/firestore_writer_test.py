@@ -0,0 +1,61 @@
+import pytest
+
+from firestore_writer import BatchWriter
+
+
+class FakeRef:
+    def __init__(self, path: str):
+        self.path = path
+
+
+class FakeSnapshot:
+    def __init__(self, path: str, exists: bool):
+        self.reference = FakeRef(path)
+        self.exists = exists
+
+
+@pytest.fixture(name="db")
+def fixture_db(mocker):
+    db = mocker.MagicMock()
+    db.collection.side_effect = lambda name: mocker.MagicMock(
+        document=lambda doc_id: FakeRef(f"{name}/{doc_id}"),
+    )
+    db.get_all.return_value = [FakeSnapshot("news__google_feed/a", True)]
+    return db
+
+
+def test_skips_existing_documents_and_commits_the_rest(db):
+    writer = BatchWriter(db)
+    writer.add("news__google_feed", "a", {"x": 1})
+    writer.add("news__google_feed", "b", {"x": 2})
+
+    stats = writer.flush()
+
+    assert (stats.written, stats.skipped) == (1, 1)
+    db.get_all.assert_called_once()
+    assert db.get_all.call_args.kwargs["field_paths"] == []
+    batch = db.batch.return_value
+    batch.set.assert_called_once()
+    assert batch.set.call_args.args[0].path == "news__google_feed/b"
+    batch.commit.assert_called_once()
+
+
+def test_overwrite_documents_are_not_looked_up(db):
+    writer = BatchWriter(db)
+    writer.add("indicators__taapi__1d", "a", {"x": 1}, overwrite=True)
+
+    stats = writer.flush()
+
+    assert stats.written == 1
+    db.get_all.assert_not_called()
+
+
+def test_splits_writes_into_batches(db):
+    db.get_all.return_value = []
+    writer = BatchWriter(db, max_batch_size=2)
+    for i in range(5):
+        writer.add("news__google_feed", str(i), {"x": i})
+
+    writer.flush()
+
+    assert db.batch.return_value.commit.call_count == 3
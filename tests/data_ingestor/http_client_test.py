@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+from fake_api_server import FakeApiServer
+from http_client import ApiClient, CircuitOpenError, ProviderPolicy, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture(name="clock")
+def fixture_clock():
+    return FakeClock()
+
+
+@pytest.fixture(name="client")
+def fixture_client(clock):
+    policies = {"test": ProviderPolicy(rate_per_second=100, burst=100, timeout=2, max_retries=2, failure_threshold=2)}
+    return ApiClient(policies=policies, sleep=clock.sleep, clock=clock)
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    with FakeApiServer() as server:
+        yield server
+
+
+def test_retries_rate_limited_requests_honouring_retry_after(client, server, clock):
+    server.enqueue("/bulk", 429, headers={"Retry-After": "3"})
+    server.enqueue("/bulk", 200, {"data": []})
+
+    response = client.post("test", server.url("/bulk"), json={"construct": {}})
+
+    assert response.status_code == 200
+    assert len(server.requests) == 2
+    assert clock.now >= 3
+    assert client.latencies["test"].count == 2
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers(client, server, clock):
+    server.enqueue("/fng/", 503)
+
+    for _ in range(2):
+        assert client.get("test", server.url("/fng/")).status_code == 503
+    requests_before = len(server.requests)
+
+    with pytest.raises(CircuitOpenError):
+        client.get("test", server.url("/fng/"))
+    assert len(server.requests) == requests_before
+
+    clock.now += 61
+    server.responses["/fng/"].clear()
+    server.enqueue("/fng/", 200, {"data": []})
+    assert client.get("test", server.url("/fng/")).status_code == 200
+    assert not client.breakers["test"].is_open
+
+
+def test_failed_half_open_trial_lets_a_later_one_through(mocker, client, server, clock):
+    server.enqueue("/fng/", 503)
+    for _ in range(2):
+        client.get("test", server.url("/fng/"))
+
+    clock.now += 61
+    mocker.patch.object(client.session, "request", side_effect=requests.exceptions.ChunkedEncodingError("cut off"))
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get("test", server.url("/fng/"))
+
+    clock.now += 61
+    mocker.stopall()
+    server.responses["/fng/"].clear()
+    server.enqueue("/fng/", 200, {"data": []})
+    assert client.get("test", server.url("/fng/")).status_code == 200
+    assert not client.breakers["test"].is_open
+
+
+def test_client_errors_are_returned_without_retrying(client, server):
+    server.enqueue("/fng/", 400, {"error": "bad request"})
+
+    assert client.get("test", server.url("/fng/")).status_code == 400
+    assert len(server.requests) == 1
+
+
+def test_token_bucket_spreads_requests_at_configured_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(6)]
+
+    assert waits[:2] == [0, 0]
+    assert clock.now == pytest.approx(2.0)
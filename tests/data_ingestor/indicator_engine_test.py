@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from candle_fetcher import CandleSeries
+from indicator_engine import IndicatorEngine, IndicatorSpec, ema, macd, rsi
+
+
+def _naive_ema(values, period):
+    out = [np.nan] * (period - 1) + [sum(values[:period]) / period]
+    alpha = 2 / (period + 1)
+    for value in values[period:]:
+        out.append(alpha * value + (1 - alpha) * out[-1])
+    return np.array(out)
+
+
+@pytest.fixture(name="close")
+def fixture_close():
+    rng = np.random.default_rng(7)
+    return 40000 + np.cumsum(rng.normal(0, 150, 1500))
+
+
+@pytest.fixture(name="series")
+def fixture_series(close):
+    timestamps = 1719432000 + 3600 * np.arange(len(close))
+    return CandleSeries(timestamps, close - 10, close + 50, close - 50, close, np.full(len(close), 5.0))
+
+
+@pytest.mark.parametrize("period", [2, 12, 50, 400])
+def test_ema_matches_recursive_definition(close, period):
+    np.testing.assert_allclose(ema(close, period), _naive_ema(list(close), period), rtol=1e-10)
+
+
+def test_ema_is_nan_without_enough_values():
+    assert np.isnan(ema(np.array([1.0, 2.0]), 3)).all()
+
+
+def test_rsi_is_bounded_and_saturates_on_rising_prices(close):
+    values = rsi(close)
+
+    assert np.isnan(values[:14]).all()
+    assert ((values[14:] >= 0) & (values[14:] <= 100)).all()
+    assert rsi(np.arange(30, dtype=float))[-1] == 100
+
+
+def test_macd_histogram_is_line_minus_signal(close):
+    result = macd(close)
+
+    np.testing.assert_allclose(result["valueMACD"][-1], ema(close, 12)[-1] - ema(close, 26)[-1])
+    np.testing.assert_allclose(result["valueMACDHist"], result["valueMACD"] - result["valueMACDSignal"])
+    assert np.isnan(result["valueMACDSignal"][:33]).all()
+    assert not np.isnan(result["valueMACDSignal"][33])
+
+
+def test_document_is_shaped_like_taapi_bulk_response(series):
+    document = IndicatorEngine().to_document(series)
+
+    assert document["id"] == series.timestamp_human()
+    assert document["id"].endswith("UTC") and "(" in document["id"]
+    assert [entry["id"] for entry in document["data"]] == [
+        "candle",
+        "price",
+        "50EMA",
+        "200EMA",
+        "400EMA",
+        "RSI",
+        "MACD",
+    ]
+    assert document["data"][1]["result"]["value"] == [series.close[-1]]
+    assert document["data"][0]["result"]["close"] == series.close[-1]
+    assert set(document["data"][6]["result"]) == {"valueMACD", "valueMACDSignal", "valueMACDHist"}
+    assert all(not entry["errors"] for entry in document["data"])
+
+
+def test_short_series_reports_missing_indicators(series):
+    engine = IndicatorEngine([IndicatorSpec("400EMA", "ema", 400)])
+
+    document = engine.to_document(series.tail(100))
+
+    assert document["data"][2]["result"]["value"] == [None]
+    assert document["data"][2]["errors"]
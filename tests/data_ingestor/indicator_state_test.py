@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from candle_fetcher import CandleSeries
+from firestore_writer import BatchWriter
+from indicator_engine import IndicatorEngine
+from indicator_state import IncrementalIndicators, IndicatorState, IndicatorStateStore
+from memory_firestore import MemoryFirestore
+
+HOUR = 3600
+START_TS = 1719432000
+
+
+class FakeCandleFetcher:
+    def __init__(self, series: CandleSeries):
+        self.series = series
+        self.fetched = 0
+
+    def _select(self, mask) -> CandleSeries:
+        self.fetched += int(mask.sum())
+        s = self.series
+        return CandleSeries(s.timestamps[mask], s.open[mask], s.high[mask], s.low[mask], s.close[mask], s.volume[mask])
+
+    def get_candles(self, _product_id, _interval, count, end=None):
+        return self._select(self.series.timestamps <= end.timestamp()).tail(count)
+
+    def get_candle_range(self, _product_id, _interval, start_ts, end_ts):
+        return self._select((self.series.timestamps >= start_ts) & (self.series.timestamps <= end_ts))
+
+
+@pytest.fixture(name="series")
+def fixture_series():
+    close = 40000 + np.cumsum(np.random.default_rng(3).normal(0, 120, 1000))
+    timestamps = START_TS + HOUR * np.arange(len(close))
+    return CandleSeries(timestamps, close, close + 30, close - 30, close, np.ones(len(close)))
+
+
+@pytest.fixture(name="store")
+def fixture_store():
+    return IndicatorStateStore(MemoryFirestore())
+
+
+def _at(candle_index: int, minutes: int = 5) -> datetime:
+    return datetime.fromtimestamp(START_TS + candle_index * HOUR + minutes * 60, tz=timezone.utc)
+
+
+def _run(incremental: IncrementalIndicators, now: datetime, verify: bool = False):
+    """One ingestion run: compute the document, then commit the queued state with the run's writes."""
+    writer = BatchWriter(incremental.store.db)
+    document = incremental.get_document("BTC/GBP", "1h", writer, verify=verify, now=now)
+    writer.flush()
+    return document
+
+
+def test_incremental_runs_match_full_recompute(series, store):
+    fetcher = FakeCandleFetcher(series)
+    incremental = IncrementalIndicators(IndicatorEngine(), fetcher, store, bootstrap_candles=600)
+
+    _run(incremental, _at(700))
+    fetcher.fetched = 0
+    for i in range(701, 720):
+        _run(incremental, _at(i))
+
+    # after bootstrapping, each hourly run only pulls the previously forming candle and the new one
+    assert fetcher.fetched == 19 * 2
+
+    document = _run(incremental, _at(719, minutes=30), verify=True)
+    assert document["id"] == series.timestamp_human(719)
+    assert document["data"][1]["result"]["value"] == [series.close[719]]
+
+
+def test_verify_raises_when_state_has_drifted(series, store):
+    incremental = IncrementalIndicators(IndicatorEngine(), FakeCandleFetcher(series), store, bootstrap_candles=600)
+    _run(incremental, _at(700))
+
+    state = store.load("BTC/GBP", "1h")
+    state.indicators["50EMA"].value *= 1.01
+    writer = BatchWriter(store.db)
+    store.save(state, writer)
+    writer.flush()
+
+    with pytest.raises(AssertionError, match="50EMA"):
+        _run(incremental, _at(701), verify=True)
+
+
+def test_state_only_advances_when_the_run_is_written(series, store):
+    incremental = IncrementalIndicators(IndicatorEngine(), FakeCandleFetcher(series), store, bootstrap_candles=600)
+    _run(incremental, _at(700))
+    saved = store.load("BTC/GBP", "1h")
+
+    # the run's flush fails, so neither its document nor its state is committed
+    incremental.get_document("BTC/GBP", "1h", BatchWriter(store.db), now=_at(701))
+    assert store.load("BTC/GBP", "1h") == saved
+
+    document = _run(incremental, _at(702), verify=True)
+    assert document["id"] == series.timestamp_human(702)
+    assert store.load("BTC/GBP", "1h").last_timestamp == series.timestamps[701]
+
+
+def test_state_round_trips_through_dict(series):
+    state = IndicatorState.empty("BTC/GBP", "1h", IndicatorEngine().indicators)
+    for ts, close in zip(series.timestamps[:100], series.close[:100]):
+        state.update(int(ts), float(close))
+
+    restored = IndicatorState.from_dict(state.to_dict())
+
+    assert restored == state
+    assert restored.peek(int(series.timestamps[100]), 1.0) == state.peek(int(series.timestamps[100]), 1.0)
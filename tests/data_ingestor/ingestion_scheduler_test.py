@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from candle_fetcher import CandleSeries
+from crypto_indicators import CryptoIndicators
+from ingestion_scheduler import IngestionJob, IngestionScheduler, indicator_collection, pack_constructs
+
+
+def _taapi_response(constructs):
+    data = []
+    for construct in constructs:
+        for indicator in construct["indicators"]:
+            result = {"timestampHuman": construct["interval"]} if indicator["id"].endswith("candle") else {"value": 1.0}
+            data.append({"id": indicator["id"], "result": result, "errors": []})
+    return {"data": data}
+
+
+@pytest.fixture(name="crypto_indicators")
+def fixture_crypto_indicators(mocker, monkeypatch):
+    monkeypatch.setenv("TAAPI_API_KEY", "secret")
+    http = mocker.MagicMock()
+
+    def post(_provider, _url, json, **_):
+        constructs = json["construct"] if isinstance(json["construct"], list) else [json["construct"]]
+        return mocker.MagicMock(status_code=200, json=lambda: _taapi_response(constructs))
+
+    http.post.side_effect = post
+    return CryptoIndicators(http=http, source="taapi")
+
+
+def test_collections_keep_legacy_names_for_default_symbol():
+    assert indicator_collection("BTC/GBP", "1h") == "indicators__taapi__1h"
+    assert indicator_collection("ETH/USD", "4h") == "indicators__taapi__4h__eth_usd"
+
+
+def test_pack_constructs_groups_by_interval_within_limit():
+    jobs = [IngestionJob(symbol, interval) for symbol in ("BTC/GBP", "ETH/GBP") for interval in ("1d", "1h")]
+
+    packed = pack_constructs(jobs, max_constructs=3)
+
+    assert [[(job.symbol, job.interval) for job in group] for group in packed] == [
+        [("BTC/GBP", "1h"), ("ETH/GBP", "1h"), ("BTC/GBP", "1d")],
+        [("ETH/GBP", "1d")],
+    ]
+    with pytest.raises(ValueError):
+        pack_constructs(jobs, max_constructs=0)
+
+
+def test_bulk_request_is_split_back_into_per_construct_documents(crypto_indicators):
+    documents = crypto_indicators.get_taapi_bulk_indicators([("BTC/GBP", "1h"), ("ETH/GBP", "4h")])
+
+    assert crypto_indicators.http.post.call_count == 1
+    assert [document["id"] for document in documents] == ["1h", "4h"]
+    assert [indicator["id"] for indicator in documents[1]["data"]][:2] == ["candle", "price"]
+
+
+def test_scheduler_writes_every_job_with_one_stage_per_bulk_request(mocker, crypto_indicators):
+    writer = mocker.MagicMock()
+    jobs = [IngestionJob("BTC/GBP", "1h"), IngestionJob("BTC/GBP", "1d"), IngestionJob("ETH/GBP", "1h")]
+    extraction_timestamp = datetime(2024, 6, 26, 20)
+    scheduler = IngestionScheduler(crypto_indicators, writer, jobs, extraction_timestamp, max_constructs=2)
+
+    stages = scheduler.stages()
+    for stage in stages.values():
+        stage()
+
+    assert len(stages) == crypto_indicators.http.post.call_count == 2
+    written = {(call.args[0], call.args[1], call.kwargs["overwrite"]) for call in writer.add.call_args_list}
+    assert written == {
+        ("indicators__taapi__1h", "1h", False),
+        ("indicators__taapi__1h__eth_gbp", "1h", False),
+        ("indicators__taapi__1d", "1d", True),
+    }
+    assert writer.add.call_args.args[2]["extraction_timestamp"] == extraction_timestamp
+
+
+def test_resample_aggregates_hourly_candles_into_four_hour_buckets():
+    hours = np.arange(8)
+    series = CandleSeries(
+        timestamps=hours * 3600 + 14400,
+        open=hours + 1.0,
+        high=hours + 2.0,
+        low=hours + 0.5,
+        close=hours + 1.5,
+        volume=np.ones(8),
+    )
+
+    resampled = series.resample(14400)
+
+    assert resampled.timestamps.tolist() == [14400, 28800]
+    assert resampled.open.tolist() == [1.0, 5.0]
+    assert resampled.high.tolist() == [5.0, 9.0]
+    assert resampled.low.tolist() == [0.5, 4.5]
+    assert resampled.close.tolist() == [4.5, 8.5]
+    assert resampled.volume.tolist() == [4.0, 4.0]
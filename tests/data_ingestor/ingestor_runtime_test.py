@@ -0,0 +1,42 @@
+import ingestor_runtime as runtime_module
+from ingestor_runtime import Runtime
+
+
+def test_clients_are_created_once_and_reused_by_warm_invocations(mocker):
+    client = mocker.patch.object(runtime_module.firestore, "Client")
+    runtime = Runtime()
+
+    with runtime.invocation() as first:
+        db = runtime.db
+    with runtime.invocation() as second:
+        assert runtime.db is db
+
+    assert client.call_count == 1
+    assert first.cold and not second.cold
+    assert second.timestamp >= first.timestamp
+
+
+def test_secrets_are_copied_once_per_process(mocker, tmp_path, monkeypatch):
+    secrets = tmp_path / "secrets.env"
+    secrets.write_text("TAAPI_API_KEY=secret\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runtime_module, "SECRETS_PATH", str(secrets))
+    load_dotenv = mocker.patch.object(runtime_module, "load_dotenv")
+    runtime = Runtime()
+
+    runtime.load_secrets()
+    runtime.load_secrets()
+
+    assert (tmp_path / ".env").read_text() == "TAAPI_API_KEY=secret\n"
+    assert load_dotenv.call_count == 1
+
+
+def test_provided_clients_replace_the_real_ones(mocker):
+    client = mocker.patch.object(runtime_module.firestore, "Client")
+    db = mocker.MagicMock()
+    runtime = Runtime()
+
+    runtime.provide("db", db)
+
+    assert runtime.db is db
+    assert client.call_count == 0
@@ -0,0 +1,34 @@
+from news_clusters import NewsClusters, synthetic_feed
+
+STORY = "Bitcoin falls below $60,000 as ETF outflows mount Spot bitcoin funds saw their largest outflows since May"
+OTHER_STORY = "Ethereum rises above $3,500 as staking demand returns Validators queued at a record pace this week"
+
+
+def test_copies_of_a_story_share_the_first_ones_cluster():
+    clusters = NewsClusters()
+
+    assert clusters.assign("a", STORY) == "a"
+    assert clusters.assign("b", OTHER_STORY) == "b"
+    assert clusters.assign("c", STORY.replace("$60,000", "$60000") + ", data showed") == "a"
+
+
+def test_clusters_carry_over_between_runs_within_the_horizon():
+    first_run = NewsClusters(max_entries=2)
+    first_run.assign("a", STORY)
+    first_run.assign("b", OTHER_STORY)
+
+    assert NewsClusters(first_run.to_state(), max_entries=2).assign("c", STORY) == "a"
+
+    # a third story pushes the first out of the horizon, so its next copy starts a new cluster
+    first_run.assign("d", "Miners sell reserves after the halving " * 3)
+    assert len(first_run.to_state()) == 2
+    assert NewsClusters(first_run.to_state(), max_entries=2).assign("e", STORY) == "e"
+
+
+def test_synthetic_feed_is_clustered_by_story():
+    feed = synthetic_feed(300)
+    clusters = NewsClusters()
+
+    first_of_story = {}
+    for item_id, text, story in feed:
+        assert clusters.assign(item_id, text) == first_of_story.setdefault(story, item_id)
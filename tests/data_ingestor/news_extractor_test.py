@@ -0,0 +1,82 @@
+import pytest
+
+from http_client import ApiClient
+from news_extractor import FeedState, NewsExtractor
+
+FEED_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Google Alert - bitcoin</title>
+  {entries}
+</feed>"""
+
+ENTRY_TEMPLATE = """<entry>
+    <id>tag:google.com,2013:googlealerts/feed:{id}</id>
+    <title type="html">&lt;b&gt;Bitcoin&lt;/b&gt; story {id}</title>
+    <published>2024-06-26T20:0{id}:00Z</published>
+    <content type="html">Summary with &lt;b&gt;tags&lt;/b&gt; {id}</content>
+  </entry>"""
+
+
+def _feed(*entry_ids: int) -> bytes:
+    return FEED_TEMPLATE.format(entries="".join(ENTRY_TEMPLATE.format(id=i) for i in entry_ids)).encode()
+
+
+@pytest.fixture(name="session")
+def fixture_session(mocker):
+    return mocker.MagicMock()
+
+
+@pytest.fixture(name="http")
+def fixture_http(session):
+    return ApiClient(session=session)
+
+
+def _response(mocker, status_code: int, content: bytes = b"", etag: str = None):
+    return mocker.MagicMock(status_code=status_code, content=content, headers={"ETag": etag} if etag else {})
+
+
+def test_first_run_returns_cleaned_entries_and_stores_validators(mocker, session, http):
+    session.request.return_value = _response(mocker, 200, _feed(1, 2), etag='"v1"')
+    extractor = NewsExtractor(http=http)
+
+    news = extractor.get_news()
+
+    assert [item["title"] for item in news] == ["Bitcoin story 1", "Bitcoin story 2"]
+    assert news[0]["summary"] == "Summary with tags 1"
+    assert extractor.state.etag == '"v1"'
+    assert session.request.call_args.kwargs["headers"] == {}
+
+
+def test_unchanged_feed_short_circuits(mocker, session, http):
+    session.request.return_value = _response(mocker, 304)
+    state = FeedState(etag='"v1"', seen_ids=["a"])
+    extractor = NewsExtractor(http=http, state=state)
+
+    assert not extractor.get_news()
+    assert session.request.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert extractor.state == state
+
+
+def test_only_unseen_entries_are_returned(mocker, session, http):
+    session.request.return_value = _response(mocker, 200, _feed(1, 2), etag='"v1"')
+    extractor = NewsExtractor(http=http)
+    extractor.get_news()
+
+    session.request.return_value = _response(mocker, 200, _feed(2, 3), etag='"v2"')
+    news = extractor.get_news()
+
+    assert [item["title"] for item in news] == ["Bitcoin story 3"]
+    assert len(extractor.state.seen_ids) == 3
+
+
+def test_near_identical_entries_share_a_cluster_across_runs(mocker, session, http):
+    session.request.return_value = _response(mocker, 200, _feed(1), etag='"v1"')
+    extractor = NewsExtractor(http=http)
+    first = extractor.get_news()
+
+    # "Bitcoin story 2" only differs from story 1 by a character, so it is treated as a copy
+    session.request.return_value = _response(mocker, 200, _feed(1, 2), etag='"v2"')
+    news = NewsExtractor(http=http, state=FeedState.from_dict(extractor.state.to_dict())).get_news()
+
+    assert first[0]["cluster_id"] == first[0]["published"]
+    assert [item["cluster_id"] for item in news] == [first[0]["published"]]
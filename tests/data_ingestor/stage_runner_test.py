@@ -0,0 +1,38 @@
+import time
+
+from stage_runner import run_stages
+
+
+def _sleep_stage():
+    time.sleep(0.2)
+
+
+def _failing_stage():
+    raise ValueError("bad feed")
+
+
+def test_concurrent_run_takes_as_long_as_slowest_stage():
+    stages = {f"stage_{i}": _sleep_stage for i in range(4)}
+
+    start = time.perf_counter()
+    results = run_stages(stages, concurrent=True)
+    elapsed = time.perf_counter() - start
+
+    assert [r.name for r in results] == list(stages)
+    assert all(r.ok for r in results)
+    assert elapsed < 0.6
+
+
+def test_failing_stage_does_not_abort_others():
+    calls = []
+    stages = {
+        "first": lambda: calls.append("first"),
+        "broken": _failing_stage,
+        "last": lambda: calls.append("last"),
+    }
+
+    results = run_stages(stages, concurrent=False)
+
+    assert calls == ["first", "last"]
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1].error, ValueError)
@@ -0,0 +1,279 @@
+"""
+In-process stand-in for the parts of `firestore.Client` the bot and ingestor use: collections, document refs,
+`where` / `order_by` / `limit` / `select` queries, `get_all` and batched writes.
+
+Range queries are answered from a sorted index on the ordered field, kept per collection and rebuilt after writes,
+so a query costs roughly what Firestore's would (the rows returned) instead of a scan of the whole collection.
+That keeps offline benchmarks of the retrievers meaningful as the synthetic history grows.
+
+Shared test support for both deploy units, and the bot's STORAGE_BACKEND=memory backend for offline runs.
+"""
+
+import bisect
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DOCUMENT_ID = "__name__"
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+# firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+_MISSING = object()
+
+
+class MemoryFirestore:
+    """Thread safe. Documents are copied on the way in and out, as they would be serialised over the wire."""
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._indexes: Dict[Tuple[str, str], Tuple[int, List[Any], List[str]]] = {}
+        self._lock = threading.RLock()
+
+    def collection(self, name: str) -> "MemoryCollection":
+        return MemoryCollection(self, name)
+
+    def batch(self) -> "MemoryBatch":
+        return MemoryBatch(self)
+
+    def get_all(self, refs: List["MemoryDocumentReference"], field_paths: Optional[List[str]] = None):
+        for ref in refs:
+            snapshot = ref.get()
+            if field_paths is not None and snapshot.exists:
+                snapshot = MemoryDocumentSnapshot(ref, _project(snapshot._data, field_paths))
+            yield snapshot
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return len(self._collections.get(collection, {}))
+
+    def _read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._collections.get(collection, {}).get(doc_id)
+
+    def _write(self, writes: List[Tuple[str, str, Optional[Dict[str, Any]], bool]]) -> None:
+        """Apply (collection, id, data, merge) writes atomically, data None deleting the document."""
+        with self._lock:
+            for collection, doc_id, data, merge in writes:
+                docs = self._collections.setdefault(collection, {})
+                if data is None:
+                    docs.pop(doc_id, None)
+                elif merge and doc_id in docs:
+                    docs[doc_id] = {**docs[doc_id], **_normalise(data)}
+                else:
+                    docs[doc_id] = _normalise(data)
+                self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def _index(self, collection: str, field: str) -> Tuple[List[Any], List[str]]:
+        """Values of `field` in ascending order with their document IDs, skipping documents without it."""
+        with self._lock:
+            version = self._versions.get(collection, 0)
+            cached = self._indexes.get((collection, field))
+            if cached is not None and cached[0] == version:
+                return cached[1], cached[2]
+
+            entries = []
+            for doc_id, data in self._collections.get(collection, {}).items():
+                value = doc_id if field == DOCUMENT_ID else _lookup(data, field)
+                if value is not _MISSING:
+                    entries.append((value, doc_id))
+            entries.sort(key=lambda entry: entry[0])
+
+            keys, ids = [value for value, _ in entries], [doc_id for _, doc_id in entries]
+            self._indexes[(collection, field)] = (version, keys, ids)
+            return keys, ids
+
+
+class MemoryDocumentSnapshot:
+    def __init__(self, reference: "MemoryDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value = _lookup(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference:
+    def __init__(self, db: MemoryFirestore, collection: str, doc_id: str):
+        self._db = db
+        self.collection_name = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._db._write([(self.collection_name, self.id, data, merge)])
+
+    def delete(self) -> None:
+        self._db._write([(self.collection_name, self.id, None, False)])
+
+    def get(self) -> MemoryDocumentSnapshot:
+        return MemoryDocumentSnapshot(self, self._db._read(self.collection_name, self.id))
+
+
+class MemoryQuery:
+    """Immutable like Firestore's: every refinement returns a new query."""
+
+    def __init__(
+        self,
+        db: MemoryFirestore,
+        collection: str,
+        filters: Tuple[Tuple[str, str, Any], ...] = (),
+        order: Optional[Tuple[str, str]] = None,
+        rows: Optional[int] = None,
+        field_paths: Optional[Tuple[str, ...]] = None,
+    ):
+        self._db = db
+        self._collection = collection
+        self._filters = filters
+        self._order = order
+        self._rows = rows
+        self._field_paths = field_paths
+
+    def _refine(self, **changes) -> "MemoryQuery":
+        state = dict(filters=self._filters, order=self._order, rows=self._rows, field_paths=self._field_paths)
+        state.update(changes)
+        return MemoryQuery(self._db, self._collection, **state)
+
+    def where(self, field_path: str, op_string: str, value: Any) -> "MemoryQuery":
+        if op_string not in OPERATORS:
+            raise ValueError(f"Unsupported operator {op_string}")
+        return self._refine(filters=self._filters + ((field_path, op_string, _normalise(value)),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "MemoryQuery":
+        # only one ordering is supported, which is all the retrievers use
+        return self._refine(order=(field_path, direction))
+
+    def limit(self, count: int) -> "MemoryQuery":
+        return self._refine(rows=count)
+
+    def select(self, field_paths: List[str]) -> "MemoryQuery":
+        return self._refine(field_paths=tuple(field_paths))
+
+    def get(self) -> List[MemoryDocumentSnapshot]:
+        return list(self.stream())
+
+    def stream(self) -> Iterator[MemoryDocumentSnapshot]:
+        field, direction = self._order or (DOCUMENT_ID, ASCENDING)
+        keys, ids = self._db._index(self._collection, field)
+
+        # filters on the ordered field narrow the index range, any others are checked per document
+        lo, hi = 0, len(keys)
+        remaining = []
+        for filter_field, op, value in self._filters:
+            if filter_field == field and op in (">", ">=", "<", "<=", "=="):
+                if op in (">", ">=", "=="):
+                    lo = max(lo, (bisect.bisect_right if op == ">" else bisect.bisect_left)(keys, value))
+                if op in ("<", "<=", "=="):
+                    hi = min(hi, (bisect.bisect_left if op == "<" else bisect.bisect_right)(keys, value))
+            else:
+                remaining.append((filter_field, op, value))
+
+        candidates = ids[lo:hi] if direction == ASCENDING else reversed(ids[lo:hi])
+        returned = 0
+        for doc_id in candidates:
+            if self._rows is not None and returned >= self._rows:
+                return
+            data = self._db._read(self._collection, doc_id)
+            if data is None or not all(_matches(data, doc_id, *condition) for condition in remaining):
+                continue
+
+            returned += 1
+            ref = MemoryDocumentReference(self._db, self._collection, doc_id)
+            yield MemoryDocumentSnapshot(ref, _project(data, self._field_paths) if self._field_paths else data)
+
+
+class MemoryCollection(MemoryQuery):
+    def __init__(self, db: MemoryFirestore, name: str):
+        super().__init__(db, name)
+        self.id = name
+
+    def document(self, document_id: Optional[str] = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self._db, self._collection, document_id or uuid.uuid4().hex[:20])
+
+
+class MemoryBatch:
+    def __init__(self, db: MemoryFirestore):
+        self._db = db
+        self._writes: List[Tuple[str, str, Optional[Dict[str, Any]], bool]] = []
+
+    def set(self, reference: MemoryDocumentReference, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append((reference.collection_name, reference.id, document_data, merge))
+
+    def delete(self, reference: MemoryDocumentReference) -> None:
+        self._writes.append((reference.collection_name, reference.id, None, False))
+
+    def commit(self) -> None:
+        if len(self._writes) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch can hold at most {MAX_BATCH_SIZE} writes, got {len(self._writes)}")
+        self._db._write(self._writes)
+        self._writes = []
+
+
+def _normalise(value: Any) -> Any:
+    """Deep copy, with naive datetimes made UTC as Firestore stores them."""
+    if isinstance(value, dict):
+        return {key: _normalise(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(item) for item in value]
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _lookup(data: Dict[str, Any], field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _matches(data: Dict[str, Any], doc_id: str, field_path: str, op: str, value: Any) -> bool:
+    actual = doc_id if field_path == DOCUMENT_ID else _lookup(data, field_path)
+    if actual is _MISSING:
+        return False
+    try:
+        return OPERATORS[op](actual, value)
+    except TypeError:
+        return False
+
+
+def _project(data: Dict[str, Any], field_paths: List[str]) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for field_path in field_paths:
+        value = _lookup(data, field_path)
+        if value is _MISSING:
+            continue
+        parts = field_path.split(".")
+        target = projected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return projected
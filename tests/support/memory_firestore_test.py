@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from memory_firestore import DESCENDING, MemoryFirestore
+from src.bot.retrievers.historic_data_retriever import HistoricDataClient
+from synthetic_data import generate
+
+START = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(name="db")
+def fixture_db():
+    db = MemoryFirestore()
+    batch = db.batch()
+    for hour in range(10):
+        ref = db.collection("readings").document(f"doc-{hour}")
+        batch.set(ref, {"extraction_timestamp": START + timedelta(hours=hour), "data": {"value": hour, "extra": "x"}})
+    batch.commit()
+    return db
+
+
+def test_range_queries_follow_firestore_semantics(db):
+    docs = (
+        db.collection("readings")
+        .where("extraction_timestamp", ">", START + timedelta(hours=2))
+        .where("extraction_timestamp", "<=", START + timedelta(hours=8))
+        .order_by("extraction_timestamp", direction=DESCENDING)
+        .limit(3)
+        .get()
+    )
+
+    assert [doc.id for doc in docs] == ["doc-8", "doc-7", "doc-6"]
+
+
+def test_select_masks_nested_fields_and_results_are_copies(db):
+    doc = db.collection("readings").select(["data.value"]).limit(1).get()[0]
+    data = doc.to_dict()
+    data["data"]["value"] = 100
+
+    assert data == {"data": {"value": 100}}
+    assert db.collection("readings").document("doc-0").get().to_dict()["data"]["value"] == 0
+
+
+def test_queries_see_writes_made_after_an_earlier_query(db):
+    db.collection("readings").order_by("extraction_timestamp").get()
+    db.collection("readings").document("doc-10").set({"extraction_timestamp": datetime(2024, 6, 2)})
+
+    docs = db.collection("readings").order_by("extraction_timestamp", direction=DESCENDING).limit(1).get()
+
+    # naive datetimes are stored as UTC, as Firestore does
+    assert docs[0].to_dict()["extraction_timestamp"] == datetime(2024, 6, 2, tzinfo=timezone.utc)
+
+
+def test_batches_are_limited_to_500_writes(db):
+    batch = db.batch()
+    for i in range(501):
+        batch.set(db.collection("readings").document(str(i)), {})
+
+    with pytest.raises(ValueError):
+        batch.commit()
+    assert db.count("readings") == 10
+
+
+def test_retriever_reads_synthetic_history():
+    db = MemoryFirestore()
+    counts = generate(db, START, START + timedelta(days=5))
+
+    crypto_data = HistoricDataClient("-", db=db).forward(START + timedelta(days=4)).crypto_data
+
+    assert counts["indicators__taapi__1h"] == 5 * 24
+    assert len(crypto_data.taapi_1h) == 48
+    assert len(crypto_data.taapi_1d) == 3
+    assert crypto_data.latest_product_price > 0
+    assert crypto_data.alternative_me[-1]["data"]["value_classification"]
+    # shaped like the real feed and the ingestor's indicator engine output
+    assert len(crypto_data.news) and not np.isnat(crypto_data.news.published).any()
+    assert [entry["id"] for entry in crypto_data.taapi_1h[-1]["data"]][-3:] == ["400EMA", "RSI", "MACD"]
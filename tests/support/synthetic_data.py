@@ -0,0 +1,120 @@
+"""
+Synthesises the ingestor's collections for offline runs: hourly and daily TAAPI documents over a random walk price,
+one fear & greed document a day and a steady stream of news, all shaped like the documents the ingestor writes.
+Shared test support for both deploy units. It needs tests/support and src/data_ingestor on the path.
+
+    db = MemoryFirestore()
+    counts = generate(db, start=datetime(2023, 1, 1), end=datetime(2024, 7, 1))
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# the indicators come from the ingestor's own engine, so synthetic documents match what it writes
+from candle_fetcher import CandleSeries
+from indicator_engine import IndicatorEngine, values_at
+
+# the ingestor commits a few minutes after a candle closes
+EXTRACTION_DELAY = timedelta(minutes=5)
+NEWS_PER_HOUR = 2
+BATCH_SIZE = 500
+
+FEAR_GREED_CLASSES = [(25, "Extreme Fear"), (45, "Fear"), (55, "Neutral"), (75, "Greed"), (101, "Extreme Greed")]
+HEADLINE_SUBJECTS = ["Bitcoin", "BTC", "Crypto markets", "Ethereum", "The Fed", "Spot ETFs", "Miners", "Exchanges"]
+HEADLINE_VERBS = ["rallies", "slides", "steadies", "surges", "drops", "holds", "rebounds", "stalls"]
+
+
+def generate(db, start: datetime, end: datetime, seed: int = 0) -> Dict[str, int]:
+    """Write every collection's documents between `start` and `end` to `db` in batches. Returns counts written."""
+    rng = np.random.default_rng(seed)
+    start, end = _utc(start), _utc(end)
+
+    hours = int((end - start) / timedelta(hours=1))
+    prices = _random_walk(rng, hours + 1)
+    hourly = list(_indicator_documents(start, timedelta(hours=1), prices))
+    daily = list(_indicator_documents(start, timedelta(days=1), prices[::24]))
+
+    collections = {
+        "indicators__taapi__1h": hourly,
+        "indicators__taapi__1d": daily,
+        "indicators__alternative_me": list(_fear_greed_documents(rng, start, len(daily))),
+        "news__google_feed": list(_news_documents(rng, start, hours)),
+    }
+    for collection, documents in collections.items():
+        write_batched(db, collection, documents)
+    return {collection: len(documents) for collection, documents in collections.items()}
+
+
+def write_batched(db, collection: str, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+    for i in range(0, len(documents), BATCH_SIZE):
+        batch = db.batch()
+        for doc_id, data in documents[i : i + BATCH_SIZE]:
+            batch.set(db.collection(collection).document(doc_id), data)
+        batch.commit()
+
+
+def _random_walk(rng: np.random.Generator, count: int, initial: float = 50000.0) -> np.ndarray:
+    return initial * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+
+
+def _indicator_documents(
+    start: datetime, interval: timedelta, closes: np.ndarray
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """One document per candle but the last, computed by the ingestor's own indicator engine."""
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    spread = np.abs(closes - opens) * 0.5 + closes * 0.001
+    step = int(interval.total_seconds())
+    series = CandleSeries(
+        timestamps=int(start.timestamp()) + step * np.arange(len(closes)),
+        open=opens,
+        high=np.maximum(opens, closes) + spread,
+        low=np.minimum(opens, closes) - spread,
+        close=closes,
+        volume=5.0 + (np.arange(len(closes)) * 7919) % 13,
+    )
+
+    engine = IndicatorEngine()
+    results = engine.compute(series)
+    for i in range(len(closes) - 1):
+        document = engine.build_document(series, i, values_at(results, i))
+        extracted = start + (i + 1) * interval + EXTRACTION_DELAY
+        yield document["id"], {"extraction_timestamp": extracted, "data": document["data"]}
+
+
+def _fear_greed_documents(rng: np.random.Generator, start: datetime, days: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    values = np.clip(50 + np.cumsum(rng.normal(0, 4, days)), 1, 99).astype(int)
+    for day, value in enumerate(values):
+        published = start + timedelta(days=day)
+        timestamp = published.strftime("%d-%m-%Y")
+        classification = next(label for bound, label in FEAR_GREED_CLASSES if value < bound)
+        data = {
+            "value": str(value),
+            "value_classification": classification,
+            "timestamp": timestamp,
+            "date": published.strftime("%Y-%m-%d"),
+            "time_until_update": str(int(timedelta(days=1).total_seconds() - EXTRACTION_DELAY.total_seconds())),
+        }
+        yield timestamp, {"extraction_timestamp": published + EXTRACTION_DELAY, "data": data}
+
+
+def _news_documents(rng: np.random.Generator, start: datetime, hours: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    offsets = np.sort(rng.integers(0, hours * 3600, hours * NEWS_PER_HOUR))
+    subjects = rng.integers(0, len(HEADLINE_SUBJECTS), len(offsets))
+    verbs = rng.integers(0, len(HEADLINE_VERBS), len(offsets))
+
+    for i, offset in enumerate(offsets):
+        published_at = start + timedelta(seconds=int(offset))
+        # the Google Alerts feed publishes ISO timestamps
+        published = published_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+        title = f"{HEADLINE_SUBJECTS[subjects[i]]} {HEADLINE_VERBS[verbs[i]]} as traders weigh item {i}"
+        # the feed's publish time is its document ID, so keep them unique
+        doc_id = f"{published} #{i}"
+        # every headline is a different story, so each is its own cluster
+        data = {"title": title, "published": published, "summary": f"{title}. " * 3, "cluster_id": doc_id}
+        yield doc_id, {"extraction_timestamp": published_at + EXTRACTION_DELAY, "data": data}
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)